@@ -94,24 +94,57 @@ def step1_get_real_xml() -> tuple[str, bool]:
         return _direct_appium_connection()
 
 
+def _checkout_device() -> dict:
+    """
+    Device reserve a cet agent (mcp_servers/device_leases.py) : capabilities
+    validees + bail a liberer. Leve RuntimeError si aucun device n'est libre.
+    """
+    try:
+        sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "mcp_servers"))
+        from device_leases import checkout
+    except ImportError:
+        return {"capabilities": {"deviceName": DEVICE_NAME, "platformVersion": PLATFORM_VER},
+                "lease": None}
+
+    check = checkout("agent_quality", DEVICE_NAME, PLATFORM_VER)
+    if not check["ok"]:
+        raise RuntimeError(check["error"])
+    for correction in check["corrections"]:
+        print(f"  Preflight : {correction}")
+    return check
+
+
 def _direct_appium_connection() -> tuple[str, bool]:
     """Connexion directe a Appium sans passer par le MCP Server."""
     try:
         from appium import webdriver
         from appium.options import AndroidOptions
 
+        check        = _checkout_device()
+        capabilities = check["capabilities"]
+        lease        = check["lease"] or {}
         options = AndroidOptions()
-        options.platform_version       = PLATFORM_VER
-        options.device_name            = DEVICE_NAME
+        if capabilities["platformVersion"]:
+            options.platform_version   = capabilities["platformVersion"]
+        options.device_name            = capabilities["deviceName"]
+        if capabilities.get("systemPort"):
+            options.udid               = capabilities["udid"]
+            options.system_port        = capabilities["systemPort"]
         options.app_package            = APP_PACKAGE
         options.app_activity           = APP_ACTIVITY
         options.no_reset               = True
         options.auto_grant_permissions = True
 
-        print(f"  Connexion a {APPIUM_URL}...")
-        driver = webdriver.Remote(APPIUM_URL, options=options)
-        xml    = driver.page_source
-        driver.quit()
+        url = lease.get("appium_url") or APPIUM_URL
+        print(f"  Connexion a {url}...")
+        try:
+            driver = webdriver.Remote(url, options=options)
+            xml    = driver.page_source
+            driver.quit()
+        finally:
+            if lease:
+                from device_leases import release
+                release(lease["lease_id"])
 
         print(f"  XML recupere : {len(xml)} caracteres")
         print("  Source       : DEVICE REEL")
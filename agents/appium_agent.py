@@ -13,6 +13,9 @@ Usage:
   python appium_agent.py --workflow analyze
   python appium_agent.py --workflow self-healing --locator btn_login_old
   python appium_agent.py --workflow validate --test-file tests/suites/login/test_login.robot
+  python appium_agent.py --workflow validate --changed HOME_SEARCH_BAR tests/resources/pages/HomePage.robot
+  python appium_agent.py --workflow validate --test-file tests/suites --retries 2
+  python appium_agent.py --workflow validate --rerun-failed results/20250101-120000-ab12cd/output.xml
   python appium_agent.py --diagnose
 """
 
@@ -28,6 +31,8 @@ from datetime import datetime
 from pathlib import Path
 from typing import Optional
 
+from postprocess import postprocess_robot_file
+
 # ============================================================================
 # CHARGEMENT .ENV
 # ============================================================================
@@ -91,6 +96,13 @@ APP_PACKAGE     = os.getenv("APP_PACKAGE", "com.example.mybiat")
 TESTS_DIR       = os.getenv("TESTS_DIR", "tests")
 RESULTS_DIR     = os.getenv("RESULTS_DIR", "agent_results")
 TESTS_SUITES_DIR = os.getenv("TESTS_SUITES_DIR", "tests/suites")
+ROBOT_JOB_TIMEOUT       = int(os.getenv("ROBOT_JOB_TIMEOUT", "300"))
+ROBOT_JOB_POLL_INTERVAL = float(os.getenv("ROBOT_JOB_POLL_INTERVAL", "5"))
+ROBOT_JOB_WATCH_SECONDS = float(os.getenv("ROBOT_JOB_WATCH_SECONDS", "20"))
+ROBOT_RERUN_FAILED      = int(os.getenv("ROBOT_RERUN_FAILED", "0"))
+ROBOT_PRIORITIZE        = os.getenv("ROBOT_PRIORITIZE", "true").lower() == "true"
+# Passes de rejeu automatiques quand tous les échecs sont flaky / infrastructure
+ROBOT_NOISE_RETRIES     = int(os.getenv("ROBOT_NOISE_RETRIES", "1"))
 
 # ── Résolution du chemin du serveur MCP ───────────────────────────────────
 def _resolve_mcp_server_path() -> str:
@@ -175,7 +187,8 @@ class AppiumAgent:
     # APPEL MCP
     # ──────────────────────────────────────────────────────────────────────
 
-    async def _call_mcp_tool(self, tool_name: str, arguments: dict = None) -> dict:
+    async def _call_mcp_tool(self, tool_name: str, arguments: dict = None,
+                             progress_callback=None) -> dict:
         """
         Appelle un outil exposé par le MCP Appium Server.
         Fallback automatique vers la simulation si le serveur est indisponible.
@@ -184,6 +197,7 @@ class AppiumAgent:
           • Timeout 30s (asyncio.timeout)
           • Gestion ExceptionGroup (Python 3.11+)
           • Utilisation du même interpréteur Python (respect du venv)
+          • Notifications de progression relayées à `progress_callback`
         """
         if not MCP_AVAILABLE:
             print(f"⚠️  MCP non disponible — simulation de {tool_name}")
@@ -204,7 +218,10 @@ class AppiumAgent:
                 async with stdio_client(server_params) as (read, write):
                     async with ClientSession(read, write) as session:
                         await session.initialize()
-                        result = await session.call_tool(tool_name, arguments=arguments or {})
+                        result = await session.call_tool(
+                            tool_name, arguments=arguments or {},
+                            progress_callback=progress_callback,
+                        )
 
                         if result.content:
                             for content in result.content:
@@ -227,6 +244,71 @@ class AppiumAgent:
             print("   → Mode simulation activé")
             return self._simulate_mcp_call(tool_name, arguments or {})
 
+    async def _run_robot_job(self, arguments: dict, on_first_failure=None) -> dict:
+        """
+        Lance execute_robot_test (job en arrière-plan) puis suit le job via
+        watch_robot_job : chaque début/fin de test arrive en notification de
+        progression MCP. Chaque appel reste sous le timeout de 30s.
+
+        `on_first_failure(failure)` (coroutine) est appelé dès le premier test
+        en échec, pendant que le reste de la suite continue de tourner.
+        Annule le job si l'agent abandonne.
+        """
+        result = await self._call_mcp_tool(
+            "execute_robot_test", {**arguments, "timeout": ROBOT_JOB_TIMEOUT}
+        )
+        job_id = result.get("job_id")
+        if not job_id:
+            return result  # erreur immédiate ou simulation
+
+        async def show_progress(progress: float, total: Optional[float], message: Optional[str]):
+            print(f"   [{int(progress)}/{int(total) if total else '?'}] {message or ''}")
+
+        print(f"   ⏳ Job Robot {job_id} lancé")
+        loop          = asyncio.get_running_loop()
+        deadline      = loop.time() + ROBOT_JOB_TIMEOUT + 30
+        offset        = 0
+        first_failure = None
+        try:
+            while not result.get("done") and loop.time() < deadline:
+                status = await self._call_mcp_tool(
+                    "watch_robot_job",
+                    {"job_id": job_id, "max_wait": ROBOT_JOB_WATCH_SECONDS, "since": offset,
+                     "return_on_failure": on_first_failure is not None and first_failure is None},
+                    progress_callback=show_progress,
+                )
+                if not status.get("job_id"):
+                    await asyncio.sleep(ROBOT_JOB_POLL_INTERVAL)
+                    continue  # appel MCP en échec → on réessaie au prochain tour
+                result = status
+                offset = status.get("events_offset", offset)
+                if status.get("first_failure") and first_failure is None:
+                    first_failure = status["first_failure"]
+                    print(f"   ⚠️  Premier échec : {first_failure['longname']}")
+                    if on_first_failure is not None:
+                        await on_first_failure(first_failure)
+        except asyncio.CancelledError:
+            await self._call_mcp_tool("cancel_robot_job", {"job_id": job_id})
+            raise
+
+        if not result.get("done"):
+            await self._call_mcp_tool("cancel_robot_job", {"job_id": job_id})
+            result = {**result, "success": False,
+                      "error": f"Job {job_id} non terminé après {ROBOT_JOB_TIMEOUT}s — annulé"}
+        return {**result, "first_failure": first_failure}
+
+    async def _triage_failures(self, result: dict) -> Optional[dict]:
+        """Classe les échecs d'un job (flaky / infrastructure / réel) ; None si non classables."""
+        if not result.get("job_id") or not (result.get("failed") or result.get("retries")):
+            return None
+        triage = await self._call_mcp_tool("classify_failures", {"job_id": result["job_id"]})
+        if not triage.get("success"):
+            return None
+        counts = triage["by_category"]
+        print(f"   🔎 Tri des échecs : {counts['real']} réel(s), {counts['flaky']} flaky, "
+              f"{counts['infrastructure']} infrastructure")
+        return triage
+
     async def _diagnose_server(self) -> None:
         """Diagnostic complet du serveur MCP (crash, imports manquants, etc.)."""
         print("\n" + "=" * 60)
@@ -361,7 +443,7 @@ class AppiumAgent:
             }
 
         if tool_name == "execute_robot_test":
-            return {"success": True, "total": 3, "passed": 2, "failed": 1,
+            return {"success": True, "total": 3, "passed": 2, "failed": 1, "skipped": 0,
                     "all_passed": False, "simulation": True}
 
         return {"success": False, "error": f"Outil {tool_name} non simulé"}
@@ -487,6 +569,10 @@ ${{LOC_CAT_ALL}}      accessibility id=All
 
 # xpath seulement → format xpath=
 ${{LOC_SEARCH}}       xpath=//android.widget.EditText
+
+# ni id ni accessibility id uniques → reprendre `locators.recommended` tel quel
+${{LOC_FIRST_NAME}}   xpath=//*[@content-desc='First Name']/following-sibling::android.widget.EditText[1]
+${{LOC_BTN_ADD}}      android=new UiSelector().text("Ajouter")
 ```
 
 ### RÈGLE 2 — Utilisation dans Keywords (CRITIQUE)
@@ -517,6 +603,30 @@ ${{APP_PACKAGE}}      {APP_PACKAGE}    # ceci casse la variable
 Utilise UNIQUEMENT les noms de variables définis dans `*** Variables ***`.
 Ne jamais référencer une variable non déclarée.
 
+### RÈGLE 5 — Locators uniques uniquement
+`locator_matches` donne pour chaque locator le nombre exact d'éléments correspondants
+à l'écran. Choisis toujours un locator avec `"unique": true` ; un locator ambigu
+(`count` > 1) clique sur le mauvais élément.
+`locators.recommended` est le locator unique le MOINS COÛTEUX déjà calculé
+(id → accessibility id → UiSelector → XPath ancré court) : utilise-le en priorité,
+et n'écris jamais d'XPath positionnel global (`//android.widget.EditText[2]`).
+
+### RÈGLE 6 — Jamais de `Sleep`
+Une pause fixe est trop longue sur un device rapide et trop courte sur un device lent.
+Pour attendre un élément : `Wait Until Page Contains Element    ${{LOC_...}}    timeout=10s`.
+Pour attendre la fin d'une transition sans élément cible : `Wait For UI Idle`
+(librairie UiSyncLibrary, importée automatiquement à l'enregistrement).
+
+### RÈGLE 7 — Une session Appium par suite
+Ouvrir une session coûte ~5 s : `Suite Setup    Open Application For Tests` et
+`Suite Teardown    Close Application`, jamais `Test Setup` / `Test Teardown` ni
+d'ouverture dans les tests. Entre les tests, `Test Setup    Reset App State` relance
+l'application dans la même session (librairie AppSessionLibrary, importée
+automatiquement à l'enregistrement). Si l'écran testé est déclaré dans
+`tests/resources/screens.json`, l'enregistrement remplace ce Test Setup par
+`Start On Screen    {page}` : chaque test démarre directement sur son écran, ne
+génère donc pas de clics de navigation depuis l'écran d'accueil.
+
 ---
 ## FORMAT OBLIGATOIRE DES DEUX FICHIERS
 
@@ -552,12 +662,14 @@ Type In Search Field
 *** Settings ***
 Library           AppiumLibrary
 Resource          {page}_page.robot
-Test Setup        Open Application For Tests
-Test Teardown     Close Application
+Suite Setup       Open Application For Tests
+Suite Teardown    Close Application
+Test Setup        Reset App State
 
 *** Variables ***
 ${{APPIUM_URL}}         {appium_url}
 ${{DEVICE_NAME}}        {device_name}
+${{UDID}}               ${{DEVICE_NAME}}
 ${{APP_PACKAGE}}        {APP_PACKAGE}
 ${{APP_ACTIVITY}}       {app_activity}
 ${{PLATFORM_VERSION}}   {platform_version}
@@ -590,6 +702,7 @@ Open Application For Tests
     ...    platformName=Android
     ...    platformVersion=${{PLATFORM_VERSION}}
     ...    deviceName=${{DEVICE_NAME}}
+    ...    udid=${{UDID}}
     ...    appPackage=${{APP_PACKAGE}}
     ...    appActivity=${{APP_ACTIVITY}}
     ...    automationName=UiAutomator2
@@ -600,7 +713,7 @@ Open Application For Tests
 RAPPELS FINAUX :
 - DEUX blocs ```robot obligatoires (un par fichier)
 - [Tags] obligatoire sur chaque Test Case
-- Test Setup / Test Teardown dans Settings (pas dans chaque test)
+- Suite Setup / Suite Teardown pour la session, Test Setup    Reset App State (pas d'ouverture dans les tests)
 - Aucun commentaire # après une valeur de variable
 - Aucune variable inventée non déclarée dans *** Variables ***
 """
@@ -738,10 +851,12 @@ Liste les autres tests potentiellement impactés par ce changement.
 
         validation_result = None
         if test_file and auto_apply:
-            print(f"\n🧪 Étape 3/3 — Validation : {test_file} ...")
-            validation_result = await self._call_mcp_tool(
-                "execute_robot_test", {"test_file": test_file}
-            )
+            print(f"\n🧪 Étape 3/3 — Validation des tests impactés : {test_file} ...")
+            validation_result = await self._run_robot_job(
+                {"test_file": test_file, "impacted_by": [broken_locator_id]})
+            if validation_result.get("impacted_tests") == []:
+                print("   Aucun test relié au locator → fichier complet")
+                validation_result = await self._run_robot_job({"test_file": test_file})
         else:
             print("\n⏭️  Étape 3/3 — Validation ignorée (auto_apply=False)")
 
@@ -762,23 +877,92 @@ Liste les autres tests potentiellement impactés par ce changement.
         }
 
     async def workflow_validate_test(
-        self, test_file: str, test_tags: Optional[str] = None
+        self, test_file: str, test_tags: Optional[str] = None,
+        changed: Optional[list[str]] = None,
+        rerun_failed: Optional[str] = None,
+        retries: int = ROBOT_RERUN_FAILED,
     ) -> dict:
-        """WORKFLOW 3 — Ré-exécute un test Robot Framework et retourne les résultats."""
+        """
+        WORKFLOW 3 — Ré-exécute un test Robot Framework et retourne les résultats.
+        Avec `changed` (locators ou fichiers page object modifiés), seuls les
+        tests qui en dépendent sont exécutés.
+        `rerun_failed` (job_id / output.xml) rejoue uniquement les échecs d'une
+        exécution précédente ; `retries` enchaîne jusqu'à N passes de rejeu
+        sur les tests encore en échec. Les résultats sont fusionnés.
+
+        Les échecs sont ensuite classés (flaky / infrastructure / réel) : si
+        aucun n'est réel, ils sont rejoués automatiquement au lieu de lancer un
+        self-healing ; seuls les échecs réels sont listés dans `needs_healing`.
+        """
         print("\n" + "=" * 60)
         print("  WORKFLOW : VALIDATE TEST")
         print("=" * 60)
         print(f"   Fichier : {test_file}")
 
-        result = await self._call_mcp_tool(
-            "execute_robot_test", {"test_file": test_file, "test_tags": test_tags or ""}
-        )
-
-        status = "✅ TOUS LES TESTS PASSENT" if result.get("all_passed") else "❌ ÉCHECS DÉTECTÉS"
+        # Ordre fail-fast : tests historiquement instables / locators modifiés d'abord
+        arguments = {"test_file": test_file, "test_tags": test_tags or "",
+                     "prioritize": ROBOT_PRIORITIZE}
+        if changed:
+            arguments["impacted_by"] = changed
+            print(f"   Mode    : tests impactés par {', '.join(changed)}")
+        if rerun_failed:
+            arguments["rerun_failed"] = rerun_failed
+            print(f"   Mode    : rejeu des échecs de {rerun_failed}")
+        result = await self._run_robot_job(arguments)
+        if changed and result.get("impacted_tests") is not None:
+            print(f"   Sélection : {len(result['impacted_tests'])} test(s) impacté(s)")
+
+        for attempt in range(1, retries + 1):
+            if not result.get("failed") or not result.get("job_id"):
+                break
+            print(f"\n🔁 Passe de rejeu {attempt}/{retries} — {result['failed']} test(s) en échec")
+            rerun = await self._run_robot_job({"test_file": test_file,
+                                               "rerun_failed": result["job_id"]})
+            if not rerun.get("job_id"):
+                break
+            result = rerun
+
+        # Tri des échecs : le bruit (flaky, device, session Appium) est rejoué, pas réparé
+        triage = await self._triage_failures(result)
+        for attempt in range(1, ROBOT_NOISE_RETRIES + 1):
+            if (not triage or triage["needs_healing"] or not result.get("failed")
+                    or not any(v["action"] == "retry" for v in triage["verdicts"])):
+                break
+            print(f"\n🔁 Échecs flaky / infrastructure — rejeu automatique "
+                  f"{attempt}/{ROBOT_NOISE_RETRIES}")
+            rerun = await self._run_robot_job({"test_file": test_file,
+                                               "rerun_failed": result["job_id"]})
+            if not rerun.get("job_id"):
+                break
+            result = rerun
+            triage = await self._triage_failures(result)
+        verdicts = {v["test"]: v for v in (triage or {}).get("verdicts", [])}
+
+        status = ("⏭  AUCUN TEST EXÉCUTÉ" if result.get("nothing_to_run") else
+                  "✅ TOUS LES TESTS PASSENT" if result.get("all_passed") else "❌ ÉCHECS DÉTECTÉS")
         print(f"\n{status}")
         print(f"   Total: {result.get('total', 0)} | "
               f"Passés: {result.get('passed', 0)} | "
-              f"Échoués: {result.get('failed', 0)}")
+              f"Échoués: {result.get('failed', 0)} | "
+              f"Ignorés: {result.get('skipped', 0)}")
+
+        # Résultats output.xml : keyword fautif et durée de chaque échec
+        failures = [
+            {"test": t.get("longname", t["name"]), "message": t.get("message", ""),
+             "elapsed_s": t.get("elapsed_s"), "failed_keyword": t.get("failed_keyword"),
+             "attempts": t.get("attempts", 1),
+             "category": verdicts.get(t.get("longname", t["name"]), {}).get("category"),
+             "action":   verdicts.get(t.get("longname", t["name"]), {}).get("action")}
+            for t in result.get("tests", []) if t.get("status") == "FAIL"
+        ]
+        for failure in failures:
+            keyword = failure["failed_keyword"]
+            print(f"   ✗ {failure['test']} ({failure['elapsed_s']}s"
+                  + (f", {failure['attempts']} tentatives" if failure["attempts"] > 1 else "")
+                  + (f", {failure['category']} → {failure['action']})" if failure["category"] else ")"))
+            if keyword:
+                print(f"     ↳ {keyword['path']}  {' | '.join(keyword['args'])}")
+            print(f"     {failure['message'][:200]}")
 
         return {
             "success":    result.get("success", False),
@@ -786,9 +970,18 @@ Liste les autres tests potentiellement impactés par ce changement.
             "test_file":  test_file,
             "passed":     result.get("passed", 0),
             "failed":     result.get("failed", 0),
+            "skipped":    result.get("skipped", 0),
             "total":      result.get("total", 0),
             "all_passed": result.get("all_passed", False),
             "log_file":   result.get("log_file"),
+            "job_id":     result.get("job_id"),
+            "tests":      result.get("tests", []),
+            "impacted_tests": result.get("impacted_tests"),
+            "retries":    result.get("retries", {}),
+            "failures":   failures,
+            "needs_healing": [f["test"] for f in failures if f["action"] in (None, "heal")],
+            "quarantined": sorted((triage or {}).get("quarantined", {})),
+            "first_failure": result.get("first_failure"),
             "error":      result.get("error"),
         }
 
@@ -909,6 +1102,9 @@ def _save_agent_results(
                 target_path.rename(suite_dir / f"{target_name}.bak")
                 print(f"   💾 Backup : {target_name}.bak")
 
+            file_content, notes = postprocess_robot_file(file_content, target_path)
+            for note in notes:
+                print(f"   🔧 {target_name} : {note}")
             target_path.write_text(file_content, encoding="utf-8")
             saved.append(str(target_path))
             icon = "📋" if file_type == "page_object" else "🧪"
@@ -935,6 +1131,9 @@ Exemples :
   python appium_agent.py --workflow analyze
   python appium_agent.py --workflow self-healing --locator btn_login_old --context "bouton connexion"
   python appium_agent.py --workflow validate --test-file tests/suites/login/test_login.robot
+  python appium_agent.py --workflow validate --changed HOME_SEARCH_BAR tests/resources/pages/HomePage.robot
+  python appium_agent.py --workflow validate --test-file tests/suites --retries 2
+  python appium_agent.py --workflow validate --rerun-failed results/20250101-120000-ab12cd/output.xml
   python appium_agent.py --diagnose
 """,
     )
@@ -943,6 +1142,12 @@ Exemples :
     parser.add_argument("--context",        type=str, default=None,    help="Indice sur le rôle de l'élément")
     parser.add_argument("--test-file",      type=str, default=None,    help="Fichier .robot à exécuter")
     parser.add_argument("--tags",           type=str, default=None,    help="Tags Robot Framework à inclure")
+    parser.add_argument("--changed",        nargs="+", default=None,
+                        help="Locators / fichiers modifiés : valide uniquement les tests impactés")
+    parser.add_argument("--rerun-failed",   type=str, default=None,
+                        help="job_id ou output.xml : rejoue uniquement ses tests en échec")
+    parser.add_argument("--retries",        type=int, default=ROBOT_RERUN_FAILED,
+                        help="Passes de rejeu des tests en échec (résultats fusionnés)")
     parser.add_argument("--no-screenshot",  action="store_true",       help="Ne pas inclure le screenshot")
     parser.add_argument("--no-save",        action="store_true",       help="Ne pas sauvegarder les résultats")
     parser.add_argument("--auto-apply",     action="store_true",       help="Appliquer le fix et relancer le test")
@@ -971,12 +1176,15 @@ Exemples :
             auto_apply=args.auto_apply,
         )
     elif args.workflow == "validate":
-        if not args.test_file:
-            print("❌ --test-file requis pour validate")
+        if not args.test_file and not args.changed and not args.rerun_failed:
+            print("❌ --test-file (ou --changed / --rerun-failed) requis pour validate")
             return
         result = await agent.workflow_validate_test(
-            test_file=args.test_file,
+            test_file=args.test_file or "tests/suites",
             test_tags=args.tags,
+            changed=args.changed,
+            rerun_failed=args.rerun_failed,
+            retries=args.retries,
         )
     else:
         print(f"❌ Workflow inconnu : {args.workflow}")
@@ -73,15 +73,43 @@ def get_real_ui_elements(save_xml_path=None):
     print(f"      Device : {DEVICE_NAME}")
     print(f"      Package: {APP_PACKAGE}")
 
+    # Device reserve et capabilities validees (mcp_servers/device_leases.py) :
+    # le bail est libere par driver.quit()
+    capabilities = {"deviceName": DEVICE_NAME, "platformVersion": PLATFORM_VER}
+    lease, leases = None, None
+    try:
+        sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "mcp_servers"))
+        import device_leases as leases
+        check = leases.checkout("generate_from_real_device", DEVICE_NAME, PLATFORM_VER)
+        if not check["ok"]:
+            print(f"      Preflight : {check['error']}")
+            sys.exit(1)
+        for correction in check["corrections"]:
+            print(f"      Preflight : {correction}")
+        capabilities, lease = check["capabilities"], check["lease"]
+    except ImportError:
+        pass
+
     options = AndroidOptions()
-    options.platform_version       = PLATFORM_VER
-    options.device_name            = DEVICE_NAME
+    if capabilities["platformVersion"]:
+        options.platform_version   = capabilities["platformVersion"]
+    options.device_name            = capabilities["deviceName"]
+    if capabilities.get("systemPort"):
+        options.udid               = capabilities["udid"]
+        options.system_port        = capabilities["systemPort"]
     options.app_package            = APP_PACKAGE
     options.app_activity           = APP_ACTIVITY
     options.no_reset               = True
     options.auto_grant_permissions = True
 
-    driver = webdriver.Remote(APPIUM_URL, options=options)
+    try:
+        driver = webdriver.Remote((lease or {}).get("appium_url") or APPIUM_URL, options=options)
+    except Exception:
+        if lease:
+            leases.release(lease["lease_id"])
+        raise
+    if leases:
+        leases.bind(driver, lease)
     print("      Connecte !")
 
     print(f"\n[2/4] Recuperation de la hierarchie UI...")
@@ -115,6 +143,14 @@ def _parse_xml_to_elements(xml_source):
         print(f"Erreur parsing XML : {e}")
         return []
 
+    # Locator unique le moins couteux par element (mcp_servers/locator_synthesizer.py)
+    try:
+        sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "mcp_servers"))
+        from locator_synthesizer import LocatorSynthesizer
+        synthesizer = LocatorSynthesizer(root)
+    except ImportError:
+        synthesizer = None
+
     elements = []
 
     def walk(node):
@@ -136,6 +172,7 @@ def _parse_xml_to_elements(xml_source):
                 "clickable":    clickable,
                 "enabled":      enabled,
                 "bounds":       attrib.get("bounds", ""),
+                "recommended_locator": synthesizer.synthesize(node) if synthesizer else None,
             })
 
         for child in node:
@@ -0,0 +1,30 @@
+"""
+postprocess.py  -  Post-traitement des fichiers .robot generes
+===============================================================
+Point d'entree commun aux agents de generation (appium_agent.py,
+test_generator_agent.py) vers mcp_servers/robot_postprocess.py.
+L'import est fait une seule fois, au chargement du module.
+
+Usage:
+    from postprocess import postprocess_robot_file
+    content, notes = postprocess_robot_file(content, Path("tests/suites/menu/test_menu.robot"))
+"""
+
+import sys
+from pathlib import Path
+
+_MCP_SERVERS = str(Path(__file__).resolve().parent.parent / "mcp_servers")
+if _MCP_SERVERS not in sys.path:
+    sys.path.insert(0, _MCP_SERVERS)
+
+try:
+    from robot_postprocess import postprocess_suite
+except ImportError:
+    postprocess_suite = None
+
+
+def postprocess_robot_file(content: str, path: Path) -> tuple[str, list]:
+    """Corrections automatiques (robot_postprocess) ; contenu inchange si indisponible."""
+    if postprocess_suite is None:
+        return content, []
+    return postprocess_suite(content, path)
@@ -17,12 +17,15 @@ Usage:
 """
 
 import os
+import sys
 import json
 import re
 from pathlib import Path
 from typing import Optional
 from dataclasses import dataclass
 
+from postprocess import postprocess_robot_file
+
 # ---------------------------------------------------------------------------
 # Chargement .env
 # ---------------------------------------------------------------------------
@@ -142,7 +145,8 @@ Suite Setup       Open Application    http://localhost:4723
 ...               appActivity=.MainActivity
 ...               noReset=True
 Suite Teardown    Close Application
-Test Teardown     Capture Page Screenshot
+Test Setup        Reset App State
+Test Teardown     Run Keyword If Test Failed    Capture Page Screenshot
 
 *** Variables ***
 ${VALID_USER}        usertest@biat.com.tn
@@ -174,12 +178,19 @@ Tu generes des fichiers Robot Framework selon le pattern Page Object Model (POM)
 CONVENTIONS OBLIGATOIRES :
 1. Structure POM : fichier Page Object (resources/pages/) SEPARE du fichier de test (tests/mobile/)
 2. Locators : toujours utiliser id=PACKAGE:id/ELEMENT_ID -- package = {APP_PACKAGE}
+   (si un element fournit locator=..., c'est le locator unique le moins couteux : le reprendre tel quel)
 3. Keywords : noms en anglais, verbeux, avec [Documentation] sur chaque keyword
 4. Variables : prefixe ${{LOCATOR_}} pour les locators, ${{VALID_}} pour les donnees de test
 5. Tags : toujours inclure [Tags] avec le module + type (smoke/regression/negative)
-6. Suite Setup : configurer AppiumLibrary avec les capabilities du device
+6. Suite Setup : configurer AppiumLibrary avec les capabilities du device ; une seule
+   session par suite (Suite Setup / Suite Teardown), `Test Setup    Reset App State`
+   (AppSessionLibrary, importee automatiquement) entre les tests ; pour un ecran
+   declare dans tests/resources/screens.json, `Test Setup    Start On Screen    <ecran>`
+   (NavigationLibrary) remplace les clics de navigation depuis l'accueil
 7. Timeouts : timeout=15s pour Wait Until, timeout=10s pour les elements post-action
 8. Data-driven : utiliser [Template] pour les tests parametres quand applicable
+9. Jamais de Sleep : Wait Until ... sur l'element attendu, ou `Wait For UI Idle`
+   (UiSyncLibrary, importee automatiquement) apres une transition sans element cible
 
 FORMAT DE REPONSE :
 Reponds UNIQUEMENT en JSON valide avec cette structure exacte :
@@ -432,8 +443,10 @@ Ecrans/Activities modifies : {json.dumps(activities, indent=2)}
         pom_path.parent.mkdir(parents=True, exist_ok=True)
         test_path.parent.mkdir(parents=True, exist_ok=True)
 
-        pom_path.write_text(generated.page_object_file,  encoding="utf-8")
-        test_path.write_text(generated.test_file,         encoding="utf-8")
+        pom_content,  pom_notes  = postprocess_robot_file(generated.page_object_file, pom_path)
+        test_content, test_notes = postprocess_robot_file(generated.test_file, test_path)
+        pom_path.write_text(pom_content,   encoding="utf-8")
+        test_path.write_text(test_content, encoding="utf-8")
 
         return {
             "success":           True,
@@ -441,6 +454,7 @@ Ecrans/Activities modifies : {json.dumps(activities, indent=2)}
             "test_saved":        str(test_path),
             "screen_name":       generated.screen_name,
             "notes":             generated.generation_notes,
+            "postprocess":       pom_notes + test_notes,
         }
 
     # -----------------------------------------------------------------------
@@ -513,8 +527,10 @@ Ecrans/Activities modifies : {json.dumps(activities, indent=2)}
             cls   = elem.get("class", "").split(".")[-1]
             click = "cliquable" if elem.get("clickable") else ""
             new   = "NOUVEAU"   if elem.get("is_new")   else ""
+            best  = (elem.get("recommended_locator") or {}).get("locator")
+            loc   = f"locator={best!r}" if best else ""
             lines.append(
-                f"  {i}. [{cls}] id={rid!r}  text={text!r}  desc={desc!r}  {click} {new}"
+                f"  {i}. [{cls}] id={rid!r}  text={text!r}  desc={desc!r}  {loc}  {click} {new}"
             )
         return "\n".join(lines)
 
@@ -11,6 +11,7 @@ Usage:
 
 import os
 import re
+import sys
 import json
 import time
 import base64
@@ -153,16 +154,35 @@ def connect_appium() -> Optional[object]:
     if not APPIUM_OK:
         return None
 
-    print(f"\n📱 Connexion Appium → {APPIUM_URL}")
-    print(f"   Device  : {DEVICE_NAME}")
-    print(f"   Android : {PLATFORM_VERSION}")
+    # Device réservé et version Android réelle (mcp_servers/device_leases.py) :
+    # pas de session tentée sans device libre, bail libéré par driver.quit()
+    capabilities = {"deviceName": DEVICE_NAME, "platformVersion": PLATFORM_VERSION}
+    lease, leases = None, None
+    try:
+        sys.path.insert(0, str(Path(__file__).resolve().parent / "mcp_servers"))
+        import device_leases as leases
+        check = leases.checkout("ai_ui_inspector", DEVICE_NAME, PLATFORM_VERSION)
+        if not check["ok"]:
+            print(f"❌ Preflight : {check['error']}")
+            return None
+        for correction in check["corrections"]:
+            print(f"🔧 Preflight : {correction}")
+        capabilities, lease = check["capabilities"], check["lease"]
+    except ImportError:
+        pass
+    device, version = capabilities["deviceName"], capabilities["platformVersion"]
+    url = (lease or {}).get("appium_url") or APPIUM_URL
+
+    print(f"\n📱 Connexion Appium → {url}")
+    print(f"   Device  : {device}")
+    print(f"   Android : {version}")
     print(f"   Package : {APP_PACKAGE}")
 
     # Capabilities universelles (compatibles toutes versions Appium-Python-Client)
     caps = {
         "platformName":           "Android",
-        "appium:platformVersion":  PLATFORM_VERSION,
-        "appium:deviceName":       DEVICE_NAME,
+        "appium:platformVersion":  version,
+        "appium:deviceName":       device,
         "appium:appPackage":       APP_PACKAGE,
         "appium:appActivity":      APP_ACTIVITY,
         "appium:automationName":   "UiAutomator2",
@@ -175,6 +195,9 @@ def connect_appium() -> Optional[object]:
         "appium:disableWindowAnimation":      True,
         "appium:skipUnlock":                  True,
     }
+    if capabilities.get("systemPort"):
+        caps["appium:udid"]       = capabilities["udid"]
+        caps["appium:systemPort"] = capabilities["systemPort"]
     if APP_PATH and Path(APP_PATH).exists():
         caps["appium:app"] = APP_PATH
 
@@ -189,12 +212,14 @@ def connect_appium() -> Optional[object]:
                 return self._caps
 
         driver = webdriver.Remote(
-            command_executor=APPIUM_URL,
+            command_executor=url,
             options=_AppiumCaps(caps)
         )
         print("✅ Connexion Appium établie !")
-        return driver
+        return leases.bind(driver, lease) if leases else driver
     except Exception as e:
+        if lease:
+            leases.release(lease["lease_id"])
         print(f"❌ Connexion Appium échouée : {e}")
         return None
 
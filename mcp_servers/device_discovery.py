@@ -0,0 +1,186 @@
+"""
+Device Discovery — Capabilities validées avant toute session Appium
+====================================================================
+Interroge une fois les devices connectés (`adb devices -l` puis `getprop`)
+et met le résultat en cache (DEVICE_CACHE_FILE, durée DEVICE_CACHE_TTL).
+Avant d'ouvrir une session, `preflight()` confronte les capabilities
+configurées (.env, variables Robot) au device réel :
+
+  • platformVersion différente (`13.0` configuré, device en 12) → corrigée
+  • deviceName absent de `adb devices` → remplacé par le device prêt
+  • aucun device prêt (absent, `unauthorized`, `offline`)     → échec immédiat,
+    aucune session tentée
+  • adb introuvable (Appium distant, CI sans device)           → capabilities
+    configurées conservées, non validées
+
+ADB_PATH permet de pointer vers un autre binaire (ou un script de substitution).
+
+Usage:
+    check = preflight("emulator-5554", "13.0")
+    check["capabilities"]   # {"deviceName": "82403e660602", "udid": ..., "platformVersion": "12"}
+    check["corrections"]    # ["platformVersion 13.0 → 12", ...]
+"""
+
+import os
+import json
+import time
+import subprocess
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Optional
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+ADB_PATH          = os.getenv("ADB_PATH", "adb")
+ADB_TIMEOUT       = float(os.getenv("ADB_TIMEOUT", "10"))
+DEVICE_CACHE_FILE = Path(os.getenv("DEVICE_CACHE_FILE", PROJECT_ROOT / "results" / "devices.json"))
+DEVICE_CACHE_TTL  = float(os.getenv("DEVICE_CACHE_TTL", "600"))
+
+# Propriétés lues en un seul `adb shell` par device
+_PROPS = ("ro.build.version.release", "ro.build.version.sdk", "ro.product.model")
+
+
+@dataclass
+class Device:
+    """Device vu par adb : état (`device`, `unauthorized`, `offline`) et version Android."""
+    serial:           str
+    state:            str
+    platform_version: str = ""
+    sdk:              str = ""
+    model:            str = ""
+
+    @property
+    def ready(self) -> bool:
+        return self.state == "device"
+
+    def capabilities(self) -> dict:
+        return {"deviceName": self.serial, "udid": self.serial,
+                "platformVersion": self.platform_version}
+
+
+def _adb(*args: str, serial: Optional[str] = None) -> str:
+    command = [ADB_PATH] + (["-s", serial] if serial else []) + list(args)
+    return subprocess.run(command, capture_output=True, text=True,
+                           timeout=ADB_TIMEOUT, check=True).stdout
+
+
+def query_devices() -> list[Device]:
+    """Devices listés par adb, propriétés lues pour ceux qui sont prêts."""
+    devices = []
+    for line in _adb("devices", "-l").splitlines()[1:]:
+        fields = line.split()
+        if len(fields) < 2 or line.startswith("*"):
+            continue
+        device = Device(serial=fields[0], state=fields[1])
+        if device.ready:
+            script = "; ".join(f"getprop {prop}" for prop in _PROPS)
+            values = _adb("shell", script, serial=device.serial).splitlines() + [""] * len(_PROPS)
+            device.platform_version, device.sdk, device.model = (v.strip() for v in values[:3])
+        devices.append(device)
+    return devices
+
+
+def discover_devices(refresh: bool = False) -> dict:
+    """
+    Devices connectés, depuis le cache s'il a moins de DEVICE_CACHE_TTL secondes.
+    `source` vaut `cache`, `adb` ou `unavailable` (adb absent ou en erreur).
+    """
+    if not refresh and DEVICE_CACHE_FILE.exists():
+        try:
+            cached = json.loads(DEVICE_CACHE_FILE.read_text(encoding="utf-8"))
+            if time.time() - cached["discovered_at"] < DEVICE_CACHE_TTL:
+                return {**cached, "source": "cache"}
+        except (ValueError, KeyError):
+            pass
+
+    try:
+        devices = query_devices()
+    except FileNotFoundError:
+        return {"devices": [], "source": "unavailable", "error": f"adb introuvable ({ADB_PATH})"}
+    except (OSError, subprocess.CalledProcessError, subprocess.TimeoutExpired) as e:
+        return {"devices": [], "source": "unavailable", "error": f"adb en erreur : {e}"}
+
+    discovery = {"discovered_at": time.time(), "devices": [asdict(d) for d in devices]}
+    DEVICE_CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+    DEVICE_CACHE_FILE.write_text(json.dumps(discovery, indent=2, ensure_ascii=False),
+                                 encoding="utf-8")
+    return {**discovery, "source": "adb"}
+
+
+def _major(version: str) -> str:
+    return str(version).split(".")[0].strip()
+
+
+def preflight(device_name: Optional[str] = None, platform_version: Optional[str] = None,
+              refresh: bool = False) -> dict:
+    """
+    Capabilities à utiliser pour ouvrir une session, validées contre le device réel.
+    `ok` faux : aucun device utilisable, la session échouerait — ne pas la tenter.
+    """
+    configured = {"deviceName": device_name or "", "platformVersion": platform_version or ""}
+    discovery  = discover_devices(refresh)
+    if discovery["source"] == "unavailable":
+        return {"ok": True, "validated": False, "capabilities": configured,
+                "corrections": [], "warning": discovery["error"]}
+
+    devices = [Device(**d) for d in discovery["devices"]]
+    ready   = [d for d in devices if d.ready]
+    known   = any(d.serial == device_name for d in ready)
+    if discovery["source"] == "cache" and (not ready or (device_name and not known)):
+        return preflight(device_name, platform_version, refresh=True)   # cache périmé
+
+    if not ready:
+        states = ", ".join(f"{d.serial} ({d.state})" for d in devices) or "aucun device"
+        return {"ok": False, "validated": True, "capabilities": configured, "corrections": [],
+                "error": f"Aucun device prêt pour Appium — adb devices : {states}"}
+
+    device = next((d for d in ready if d.serial == device_name), ready[0])
+    corrections = []
+    if device_name and device.serial != device_name:
+        corrections.append(f"deviceName {device_name} → {device.serial} (seul device prêt"
+                           + (")" if len(ready) == 1 else f" sur {len(ready)})"))
+    if platform_version and _major(platform_version) != _major(device.platform_version):
+        corrections.append(f"platformVersion {platform_version} → {device.platform_version}")
+    return {"ok": True, "validated": True, "device": asdict(device),
+            "capabilities": device.capabilities(), "corrections": corrections,
+            "source": discovery["source"]}
+
+
+def robot_variables(check: dict) -> list[str]:
+    """Arguments robot `--variable` pour les capabilities validées ([] sinon)."""
+    if not check.get("validated") or not check.get("ok"):
+        return []
+    capabilities = check["capabilities"]
+    return ["--variable", f"DEVICE_NAME:{capabilities['deviceName']}",
+            "--variable", f"UDID:{capabilities['udid']}",
+            "--variable", f"PLATFORM_VERSION:{capabilities['platformVersion']}"]
+
+
+def annotate_devices(devices: list[dict]) -> list[dict]:
+    """Complète `platform_version` des devices de shard connus d'adb."""
+    discovered = {d["serial"]: d for d in discover_devices()["devices"]}
+    for device in devices:
+        found = discovered.get(device.get("device_name"))
+        if found and found["platform_version"] and not device.get("platform_version"):
+            device["platform_version"] = found["platform_version"]
+    return devices
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Découverte des devices et preflight Appium")
+    parser.add_argument("--device", default=os.getenv("DEVICE_NAME"), help="deviceName configuré")
+    parser.add_argument("--platform-version", default=os.getenv("PLATFORM_VERSION"))
+    parser.add_argument("--refresh", action="store_true", help="Ignorer le cache")
+    args = parser.parse_args()
+
+    check = preflight(args.device, args.platform_version, refresh=args.refresh)
+    for device in discover_devices()["devices"]:
+        print(f"  {device['serial']:<20} {device['state']:<13} Android {device['platform_version'] or '?'}"
+              f"  {device['model']}")
+    for correction in check["corrections"]:
+        print(f"🔧 {correction}")
+    if check.get("warning"):
+        print(f"⚠️  {check['warning']} — capabilities non validées")
+    print(("✅ " + json.dumps(check["capabilities"])) if check["ok"] else f"❌ {check['error']}")
@@ -0,0 +1,327 @@
+"""
+Device Leases — Un device par session, réparti entre suites et agents
+=====================================================================
+Registre local des devices (adb via device_discovery + ROBOT_DEVICES) et
+baux exclusifs persistés dans DEVICE_LEASES_FILE, protégé par un verrou de
+fichier : ai_ui_inspector, agent_quality, generate_from_real_device, le
+serveur MCP et les jobs Robot ne se disputent plus le device du .env.
+
+  • Bail exclusif : un device n'est loué qu'à un seul processus à la fois
+  • Expiration : bail libéré à son échéance (ttl) ou à la mort du processus
+  • File d'attente FIFO : sans device libre, le demandeur attend son tour
+    (wait secondes) ; les premiers de la file prennent les premiers libérés
+  • systemPort distinct par device (sessions UiAutomator2 parallèles sur un
+    même serveur Appium)
+
+Sans device dans le registre (adb absent, ROBOT_DEVICES vide), aucun bail
+n'est pris : `acquire` retourne None et l'appelant garde le device configuré.
+
+Usage:
+    with lease("agent_quality") as device:        # None si registre vide
+        ...device["serial"], device["platform_version"], device["system_port"]
+    checkout("ai_ui_inspector", DEVICE_NAME, PLATFORM_VERSION)   # preflight + bail
+    python device_leases.py robot --owner suite -- tests/suites   # job Robot sous bail
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import signal
+import subprocess
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional
+
+import device_discovery
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+DEVICE_LEASES_FILE = Path(os.getenv("DEVICE_LEASES_FILE", PROJECT_ROOT / "results" / "device_leases.json"))
+DEVICE_LEASE_TTL   = float(os.getenv("DEVICE_LEASE_TTL", "1800"))
+DEVICE_LEASE_WAIT  = float(os.getenv("DEVICE_LEASE_WAIT", "300"))
+LEASE_POLL_SECONDS = 1.0
+
+# Port UiAutomator2 du premier device du registre (puis +1 par device)
+SYSTEM_PORT_BASE = int(os.getenv("SYSTEM_PORT_BASE", "8200"))
+
+# Attente sans signe de vie au-delà de laquelle une place dans la file est abandonnée
+_QUEUE_STALE_SECONDS = 30
+
+
+@contextmanager
+def _locked() -> Iterator[dict]:
+    """État des baux sous verrou exclusif, réécrit à la sortie du bloc."""
+    DEVICE_LEASES_FILE.parent.mkdir(parents=True, exist_ok=True)
+    with open(DEVICE_LEASES_FILE.with_suffix(".lock"), "a+") as lock:
+        if os.name == "nt":
+            import msvcrt
+            lock.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(lock.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+        else:
+            import fcntl
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            state = (json.loads(DEVICE_LEASES_FILE.read_text(encoding="utf-8"))
+                     if DEVICE_LEASES_FILE.exists() else {})
+            state.setdefault("leases", {})
+            state.setdefault("queue", [])
+            _prune(state)
+            yield state
+            DEVICE_LEASES_FILE.write_text(json.dumps(state, indent=2, ensure_ascii=False),
+                                          encoding="utf-8")
+        finally:
+            if os.name == "nt":
+                lock.seek(0)
+                msvcrt.locking(lock.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def pid_alive(pid: int) -> bool:
+    """Processus `pid` toujours vivant (baux, jobs Robot)."""
+    if os.name == "nt":
+        out = subprocess.run(["tasklist", "/FI", f"PID eq {pid}", "/NH"],
+                             capture_output=True, text=True)
+        return str(pid) in out.stdout
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def parse_devices(devices: Optional[list] = None) -> list[dict]:
+    """Devices fournis, sinon ROBOT_DEVICES, sinon liste vide (endpoint par défaut)."""
+    if devices:
+        return [dict(d) for d in devices]
+    devices = []
+    for entry in filter(None, os.getenv("ROBOT_DEVICES", "").split(",")):
+        url, _, name = entry.strip().partition("|")
+        devices.append({"appium_url": url, "device_name": name})
+    return devices
+
+
+def _prune(state: dict) -> None:
+    """Libère les baux échus ou orphelins et les places abandonnées de la file."""
+    now = time.time()
+    state["leases"] = {serial: lease for serial, lease in state["leases"].items()
+                       if lease["expires_at"] > now and pid_alive(lease["pid"])}
+    state["queue"]  = [entry for entry in state["queue"]
+                       if now - entry["seen_at"] < _QUEUE_STALE_SECONDS and pid_alive(entry["pid"])]
+
+
+def registry() -> list[dict]:
+    """
+    Devices louables : ROBOT_DEVICES (endpoint Appium dédié) puis devices prêts
+    découverts par adb. `system_port` est fixé par position dans le registre.
+    """
+    devices = {}
+    for entry in parse_devices():
+        if entry.get("device_name"):
+            devices[entry["device_name"]] = {"serial": entry["device_name"], "platform_version": "",
+                                             "appium_url": entry.get("appium_url") or None}
+    for found in device_discovery.discover_devices()["devices"]:
+        if found["state"] != "device":
+            continue
+        device = devices.setdefault(found["serial"], {"serial": found["serial"], "appium_url": None})
+        device["platform_version"] = found["platform_version"]
+    return [{**device, "system_port": SYSTEM_PORT_BASE + index}
+            for index, device in enumerate(devices.values())]
+
+
+def acquire(owner: str, wait: float = DEVICE_LEASE_WAIT, ttl: float = DEVICE_LEASE_TTL,
+            prefer: Optional[str] = None, pid: Optional[int] = None) -> Optional[dict]:
+    """
+    Bail exclusif sur un device libre (celui de `prefer` s'il est libre).
+    Attend au plus `wait` secondes dans la file ; TimeoutError au-delà.
+    Retourne None si le registre est vide (pas de device à répartir).
+    """
+    devices = registry()
+    if not devices:
+        return None
+
+    ticket   = uuid.uuid4().hex[:12]
+    pid      = pid or os.getpid()
+    deadline = time.monotonic() + wait
+    while True:
+        with _locked() as state:
+            queue = state["queue"]
+            entry = next((e for e in queue if e["ticket"] == ticket), None)
+            if entry is None:
+                entry = {"ticket": ticket, "owner": owner, "pid": pid, "enqueued_at": time.time()}
+                queue.append(entry)
+            entry["seen_at"] = time.time()
+
+            free = [d for d in devices if d["serial"] not in state["leases"]]
+            if free and queue.index(entry) < len(free):
+                device = next((d for d in free if d["serial"] == prefer), free[0])
+                lease  = {**device, "lease_id": ticket, "owner": owner, "pid": pid,
+                          "acquired_at": time.time(), "expires_at": time.time() + ttl}
+                state["leases"][device["serial"]] = lease
+                queue.remove(entry)
+                return lease
+
+            expired = time.monotonic() >= deadline
+            if expired:
+                queue.remove(entry)
+                busy = ", ".join(f"{l['serial']} ({l['owner']})" for l in state["leases"].values())
+        if expired:
+            raise TimeoutError(f"Aucun device libre après {wait:.0f}s — loués : {busy}")
+        time.sleep(LEASE_POLL_SECONDS)
+
+
+def release(lease_id: str) -> bool:
+    """Libère un bail ; False s'il n'existe plus (échu, déjà libéré)."""
+    with _locked() as state:
+        for serial, lease in list(state["leases"].items()):
+            if lease["lease_id"] == lease_id:
+                del state["leases"][serial]
+                return True
+    return False
+
+
+def renew(lease_id: str, ttl: float = DEVICE_LEASE_TTL) -> bool:
+    """Repousse l'échéance d'un bail en cours ; False s'il n'existe plus."""
+    with _locked() as state:
+        for lease in state["leases"].values():
+            if lease["lease_id"] == lease_id:
+                lease["expires_at"] = time.time() + ttl
+                return True
+    return False
+
+
+def leases_status() -> dict:
+    """Registre avec le bail en cours de chaque device, et file d'attente."""
+    devices = registry()
+    with _locked() as state:
+        return {
+            "devices": [{**d, "lease": state["leases"].get(d["serial"])} for d in devices],
+            "queue":   [{k: e[k] for k in ("owner", "pid", "enqueued_at")} for e in state["queue"]],
+        }
+
+
+@contextmanager
+def lease(owner: str, wait: float = DEVICE_LEASE_WAIT, ttl: float = DEVICE_LEASE_TTL,
+          prefer: Optional[str] = None) -> Iterator[Optional[dict]]:
+    """Bail libéré à la sortie du bloc (None si le registre est vide)."""
+    held = acquire(owner, wait=wait, ttl=ttl, prefer=prefer)
+    try:
+        yield held
+    finally:
+        if held:
+            release(held["lease_id"])
+
+
+def checkout(owner: str, device_name: Optional[str] = None,
+             platform_version: Optional[str] = None, wait: float = DEVICE_LEASE_WAIT) -> dict:
+    """
+    Preflight (device_discovery) puis bail : capabilities de session pour un
+    device réservé à l'appelant. Même forme que `preflight()` + `lease`.
+    """
+    check = device_discovery.preflight(device_name, platform_version)
+    if not check["ok"]:
+        return {**check, "lease": None}
+    try:
+        held = acquire(owner, wait=wait, prefer=check["capabilities"]["deviceName"])
+    except TimeoutError as e:
+        return {**check, "ok": False, "lease": None, "error": str(e)}
+    if held is None:
+        return {**check, "lease": None}
+
+    capabilities = {"deviceName": held["serial"], "udid": held["serial"],
+                    "platformVersion": held["platform_version"] or check["capabilities"]["platformVersion"],
+                    "systemPort": held["system_port"]}
+    corrections = list(check["corrections"])
+    if held["serial"] != check["capabilities"]["deviceName"]:
+        corrections.append(f"deviceName {check['capabilities']['deviceName']} → {held['serial']} "
+                           f"(device loué par {_owner_of(check['capabilities']['deviceName'])})")
+    return {**check, "capabilities": capabilities, "corrections": corrections, "lease": held}
+
+
+def _owner_of(serial: str) -> str:
+    with _locked() as state:
+        lease = state["leases"].get(serial)
+    return lease["owner"] if lease else "un autre processus"
+
+
+def bind(driver, held: Optional[dict]):
+    """Libère le bail quand la session est fermée (`driver.quit()`)."""
+    if held is None:
+        return driver
+    quit_session = driver.quit
+
+    def quit():
+        try:
+            quit_session()
+        finally:
+            release(held["lease_id"])
+
+    driver.quit = quit
+    return driver
+
+
+def robot_variables(held: dict) -> list[str]:
+    """Arguments robot `--variable` du device loué (UiAutomator2 le sélectionne par `udid`)."""
+    args = ["--variable", f"DEVICE_NAME:{held['serial']}",
+            "--variable", f"UDID:{held['serial']}",
+            "--variable", f"SYSTEM_PORT:{held['system_port']}"]
+    if held["platform_version"]:
+        args += ["--variable", f"PLATFORM_VERSION:{held['platform_version']}"]
+    if held["appium_url"]:
+        args += ["--variable", f"APPIUM_URL:{held['appium_url']}"]
+    return args
+
+
+def run_robot(robot_args: list[str], owner: str, wait: float = DEVICE_LEASE_WAIT,
+              ttl: float = DEVICE_LEASE_TTL) -> int:
+    """`python -m robot` sous bail : attend un device, le passe en variables, le libère."""
+    if os.name != "nt":
+        signal.signal(signal.SIGTERM, lambda *_: sys.exit(128 + signal.SIGTERM))
+    try:
+        held = acquire(owner, wait=wait, ttl=ttl)
+    except TimeoutError as e:
+        print(f"[device_leases] {e}", flush=True)
+        return 252
+    if held:
+        print(f"[device_leases] {held['serial']} loué à {owner} (bail {held['lease_id']})", flush=True)
+    try:
+        return subprocess.call([sys.executable, "-m", "robot",
+                                *(robot_variables(held) if held else []), *robot_args])
+    finally:
+        if held:
+            release(held["lease_id"])
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Baux exclusifs sur les devices Android")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("status", help="Devices, baux en cours et file d'attente")
+    robot = commands.add_parser("robot", help="Lancer robot sous bail (arguments après --)")
+    robot.add_argument("--owner", default="robot")
+    robot.add_argument("--wait", type=float, default=DEVICE_LEASE_WAIT)
+    robot.add_argument("--ttl", type=float, default=DEVICE_LEASE_TTL)
+    robot.add_argument("robot_args", nargs=argparse.REMAINDER)
+    args = parser.parse_args()
+
+    if args.command == "robot":
+        robot_args = args.robot_args[1:] if args.robot_args[:1] == ["--"] else args.robot_args
+        sys.exit(run_robot(robot_args, args.owner, wait=args.wait, ttl=args.ttl))
+
+    status = leases_status()
+    for device in status["devices"]:
+        held = device["lease"]
+        print(f"  {device['serial']:<20} :{device['system_port']}  "
+              + (f"loué à {held['owner']} (pid {held['pid']})" if held else "libre"))
+    for position, entry in enumerate(status["queue"], 1):
+        print(f"  file #{position} : {entry['owner']} (pid {entry['pid']})")
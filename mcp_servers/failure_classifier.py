@@ -0,0 +1,201 @@
+"""
+Failure Classifier — Échec flaky, infrastructure ou réel ?
+==========================================================
+Classe chaque test en échec à partir de l'historique (history_store.py) :
+
+  • infrastructure : message connu de l'environnement (device / session
+    Appium / adb / réseau) ou même signature d'échec de setup partagée par
+    plusieurs tests — l'application n'est pas en cause
+  • flaky          : alternance PASS / FAIL (taux de bascule élevé sur les
+    dernières exécutions, hors échecs d'infrastructure) ou test passé au rejeu
+  • real           : échec stable, à diagnostiquer (self-healing / régénération)
+
+Action proposée : `retry` (infrastructure, flaky modéré), `quarantine` (flaky
+chronique : ses échecs ne bloquent plus) ou `heal`. Un test en quarantaine
+tourne toujours, tagué `quarantine` avec `--skiponfailure` (quarantine_args) :
+un échec devient SKIP. Il en sort après QUARANTINE_RELEASE_PASSES PASS
+consécutifs depuis sa mise en quarantaine (release_recovered, après chaque job).
+
+Les signatures sont calculées au chargement de chaque résultat ; le taux de
+bascule porte sur une fenêtre indexée des FLIP_WINDOW dernières exécutions.
+
+Usage:
+    classifier = FailureClassifier(HistoryStore())
+    classifier.classify("TC-MENU-03", message="Setup failed: ...")
+    classifier.classify_latest()
+    classifier.release_recovered()
+"""
+
+import os
+import re
+import json
+import time
+from pathlib import Path
+from typing import Optional
+
+from history_store import HistoryStore, failure_signature, test_id
+
+FLIP_WINDOW               = 20
+MIN_RUNS                  = 4      # exécutions nécessaires pour juger l'instabilité
+FLAKY_FLIP_RATE           = float(os.getenv("ROBOT_FLAKY_FLIP_RATE", "0.3"))
+QUARANTINE_FLIP_RATE      = float(os.getenv("ROBOT_QUARANTINE_FLIP_RATE", "0.5"))
+QUARANTINE_RELEASE_PASSES = 5
+INFRA_SPREAD              = 3      # tests distincts partageant une signature d'échec de setup
+INFRA_SPREAD_WINDOW_S     = 7 * 86400
+QUARANTINE_TAG            = "quarantine"
+
+MODIFIER_PATH = Path(__file__).resolve().parent / "robot_quarantine_modifier.py"
+
+# Messages propres à l'environnement d'exécution (device, serveur Appium, réseau)
+INFRA_PATTERNS = [re.compile(p, re.IGNORECASE) for p in (
+    r"unable to find an active device or emulator",
+    r"could not find a connected android device",
+    r"device .* (not found|offline|unauthorized)",
+    r"no devices?/emulators? found",
+    r"adb: (device|error)",
+    r"could not start a new session",
+    r"session not created",
+    r"a session is either terminated or not started",
+    r"nosuchdriver",
+    r"instrumentation process is not running",
+    r"uiautomator2 server",
+    r"cannot be proxied to uiautomator2",
+    r"connection refused|econnrefused|econnreset|socket hang up",
+    r"max retries exceeded|remotedisconnected|read timed out",
+)]
+
+
+def flip_rate(statuses: list[str]) -> float:
+    """Proportion de bascules PASS↔FAIL entre exécutions successives."""
+    if len(statuses) < 2:
+        return 0.0
+    flips = sum(a != b for a, b in zip(statuses, statuses[1:]))
+    return flips / (len(statuses) - 1)
+
+
+def infra_pattern(message: Optional[str]) -> Optional[str]:
+    """Motif d'infrastructure reconnu dans le message, sinon None."""
+    for pattern in INFRA_PATTERNS:
+        if pattern.search(message or ""):
+            return pattern.pattern
+    return None
+
+
+class FailureClassifier:
+    """Classe les échecs de tests d'après l'historique d'un HistoryStore."""
+
+    def __init__(self, store: HistoryStore):
+        self.store = store
+
+    def _is_infra(self, message: Optional[str], signature: Optional[str],
+                  phase: str, now: float) -> Optional[str]:
+        pattern = infra_pattern(message)
+        if pattern:
+            return f"message d'environnement ({pattern})"
+        if phase == "setup" and signature:
+            spread = self.store.signature_spread(signature, phase="setup",
+                                                 since=now - INFRA_SPREAD_WINDOW_S)
+            if spread >= INFRA_SPREAD:
+                return f"échec de setup identique sur {spread} tests"
+        return None
+
+    def classify(self, test: str, message: Optional[str] = None, phase: Optional[str] = None,
+                 passed_on_retry: bool = False, apply: bool = True) -> dict:
+        """
+        Classe un test. Sans `message`, le dernier échec connu de l'historique
+        est utilisé. `apply` met en quarantaine / libère le test selon le verdict.
+        """
+        now     = time.time()
+        history = self.store.recent(test, limit=FLIP_WINDOW)
+        last_failure = next((r for r in reversed(history) if r["status"] == "FAIL"), None)
+        if message is None and last_failure:
+            message, phase = last_failure["message"], phase or last_failure["phase"]
+        phase     = phase or "test"
+        signature = failure_signature(message)
+
+        # Taux de bascule sans les échecs d'infrastructure (ni les SKIP)
+        statuses = [r["status"] for r in history
+                    if r["status"] in ("PASS", "FAIL")
+                    and not (r["status"] == "FAIL"
+                             and self._is_infra(r["message"], r["signature"], r["phase"], now))]
+        rate     = flip_rate(statuses)
+        verdict  = {"test_id": test_id(test), "signature": signature, "phase": phase,
+                    "runs": len(statuses), "flip_rate": round(rate, 3),
+                    "history": "".join(s[0] for s in statuses)}
+
+        infra = self._is_infra(message, signature, phase, now)
+        if infra:
+            verdict.update(category="infrastructure", action="retry", reason=infra)
+        elif passed_on_retry:
+            verdict.update(category="flaky", action="retry", reason="passé au rejeu")
+        elif len(statuses) >= MIN_RUNS and "PASS" in statuses and rate >= FLAKY_FLIP_RATE:
+            chronic = rate >= QUARANTINE_FLIP_RATE
+            verdict.update(category="flaky", action="quarantine" if chronic else "retry",
+                           reason=f"{rate:.0%} de bascules PASS/FAIL sur {len(statuses)} exécutions")
+        else:
+            verdict.update(category="real", action="heal",
+                           reason="échec stable" if statuses else "aucun historique")
+
+        if apply and verdict["action"] == "quarantine":
+            self.store.quarantine(test, verdict["reason"])
+        verdict["quarantined"] = verdict["test_id"] in self.store.quarantined()
+        return verdict
+
+    def classify_latest(self, since: Optional[float] = None, apply: bool = True) -> list[dict]:
+        """Classe chaque test dont la dernière exécution connue est un échec."""
+        return [self.classify(f["test_id"], f["message"], f["phase"], apply=apply)
+                for f in self.store.latest_failures(since)]
+
+    def release_recovered(self) -> list[str]:
+        """
+        Sort de quarantaine les tests dont les QUARANTINE_RELEASE_PASSES dernières
+        exécutions depuis la mise en quarantaine sont des PASS (un SKIP — échec
+        masqué par --skiponfailure — rompt la série). Retourne les tests libérés.
+        """
+        released = []
+        for test, entry in self.store.quarantined().items():
+            recent = [r["status"] for r in self.store.recent(test, limit=QUARANTINE_RELEASE_PASSES)
+                      if (r["start"] or 0) >= entry["since"]]
+            if len(recent) == QUARANTINE_RELEASE_PASSES and set(recent) == {"PASS"}:
+                self.store.release(test)
+                released.append(test)
+        return released
+
+
+def quarantine_args(store: HistoryStore, job_dir: Path) -> list[str]:
+    """
+    Options robot pour les tests en quarantaine : tag ajouté par pre-run
+    modifier (liste écrite dans le dossier du job) + `--skiponfailure`. Ils
+    s'exécutent (leurs PASS permettent la sortie de quarantaine) sans que
+    leurs échecs bloquent le run.
+    """
+    quarantined = sorted(store.quarantined())
+    if not quarantined:
+        return []
+    tests_file = Path(job_dir) / "quarantine.json"
+    tests_file.parent.mkdir(parents=True, exist_ok=True)
+    tests_file.write_text(json.dumps(quarantined, ensure_ascii=False), encoding="utf-8")
+    return ["--prerunmodifier", f"{MODIFIER_PATH};{tests_file}",
+            "--skiponfailure", QUARANTINE_TAG]
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Classe les échecs : flaky, infrastructure ou réel")
+    parser.add_argument("tests", nargs="*", help="Codes TC-… (défaut : derniers échecs)")
+    parser.add_argument("--days", type=float, help="Échecs des N derniers jours")
+    parser.add_argument("--dry-run", action="store_true", help="Ne pas modifier la quarantaine")
+    args = parser.parse_args()
+
+    store = HistoryStore()
+    store.ingest()
+    classifier = FailureClassifier(store)
+    if args.tests:
+        verdicts = [classifier.classify(t, apply=not args.dry_run) for t in args.tests]
+    else:
+        since    = time.time() - args.days * 86400 if args.days else None
+        verdicts = classifier.classify_latest(since, apply=not args.dry_run)
+    if not args.dry_run:
+        classifier.release_recovered()
+    print(json.dumps(verdicts, indent=2, ensure_ascii=False))
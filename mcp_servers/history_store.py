@@ -0,0 +1,459 @@
+"""
+History Store — Historique des exécutions de tests (SQLite indexé)
+==================================================================
+Charge de façon incrémentale les résultats épars dans une base SQLite :
+  • Allure : `*-result.json` (un test) et `*-container.json` (setups /
+    teardowns de ses tests enfants)
+  • Robot Framework : `output.xml` (lecture en flux via robot_output) ;
+    log.html / report.html en sont dérivés et ne sont pas relus
+
+Un fichier déjà chargé (même chemin, taille et date) est ignoré. Les
+`output.xml` des dossiers `merged/` (fusions rebot) sont ignorés : leurs
+tests proviennent des output.xml d'origine, déjà chargés. Un test d'output.xml
+déjà présent via Allure (même run, même nom, même durée) n'est pas dupliqué :
+les dates Robot sont en heure locale sans fuseau (décalage d'un fuseau toléré).
+
+Identité d'un test : code `TC-XXX-NN` en tête du nom quand il existe (les
+titres générés varient d'une génération à l'autre), sinon le nom complet.
+Chaque échec porte une signature (message normalisé, calculée une fois au
+chargement) pour regrouper les échecs identiques (failure_classifier.py).
+
+Source de vérité unique de l'historique : les jobs Robot y sont chargés à
+leur fin (robot_jobs), l'ordonnancement (robot_priority) et la classification
+des échecs (failure_classifier) la lisent. La base vit sous robot_jobs.JOBS_DIR.
+
+Usage:
+    store = HistoryStore()
+    store.ingest(["agents/output/allure", "results"])
+    store.duration_trend("TC-MENU-03")
+    store.failures(phase="setup", since=time.time() - 7 * 86400)
+"""
+
+import os
+import re
+import json
+import time
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, Optional
+from xml.etree.ElementTree import ParseError
+
+from robot_output import parse_output_xml
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+# Base : ROBOT_HISTORY_DB, sinon <robot_jobs.JOBS_DIR>/test_history.db
+HISTORY_DB = os.getenv("ROBOT_HISTORY_DB")
+
+# Emplacements scannés par défaut
+DEFAULT_SOURCES = ["agents/output/allure", "results"]
+
+_TEST_ID      = re.compile(r"^([A-Z][A-Z0-9]*-[A-Z0-9]+-\d+)")
+_ALLURE_STATUS = {"passed": "PASS", "failed": "FAIL", "broken": "FAIL", "skipped": "SKIP"}
+_RF6_TIME     = "%Y%m%d %H:%M:%S.%f"
+_TZ_TOLERANCE = 14 * 3600
+
+SIGNATURE_LENGTH = 200
+
+_PHASE_PREFIX = re.compile(r"^(parent suite |also )?(setup|teardown) failed:", re.IGNORECASE)
+_SIGNATURE_MASKS = [
+    (re.compile(r"'[^']*'|\"[^\"]*\""), "'*'"),
+    (re.compile(r"\b(?=[0-9a-f]*\d)[0-9a-f]{8,}\b", re.IGNORECASE), "<id>"),
+    (re.compile(r"\d+(\.\d+)*"), "N"),
+]
+
+# Containers d'abord (phase des échecs), output.xml en dernier (dédoublonnage)
+_INGEST_ORDER = {"allure-container": 0, "allure-result": 1, "robot": 2}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS ingested_files (
+    path        TEXT PRIMARY KEY,
+    size        INTEGER NOT NULL,
+    mtime       REAL    NOT NULL,
+    kind        TEXT    NOT NULL,
+    ingested_at REAL    NOT NULL
+);
+CREATE TABLE IF NOT EXISTS runs (
+    id          INTEGER PRIMARY KEY,
+    kind        TEXT NOT NULL,            -- robot | allure
+    source      TEXT NOT NULL,
+    started_at  REAL
+);
+CREATE TABLE IF NOT EXISTS results (
+    id          INTEGER PRIMARY KEY,
+    run_id      INTEGER NOT NULL REFERENCES runs(id),
+    test_id     TEXT NOT NULL,
+    name        TEXT NOT NULL,
+    full_name   TEXT,
+    suite       TEXT,
+    status      TEXT NOT NULL,            -- PASS | FAIL | SKIP
+    phase       TEXT NOT NULL DEFAULT 'test',   -- test | setup | teardown
+    message     TEXT,
+    start       REAL,
+    duration_s  REAL,
+    uuid        TEXT,
+    signature   TEXT
+);
+CREATE TABLE IF NOT EXISTS quarantine (
+    test_id     TEXT PRIMARY KEY,
+    reason      TEXT,
+    since       REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS locators (
+    key         TEXT PRIMARY KEY,         -- chemin/relatif.resource::NOM_VARIABLE
+    value       TEXT NOT NULL,
+    changed_at  REAL NOT NULL             -- 0 : présent dès le premier instantané
+);
+CREATE TABLE IF NOT EXISTS allure_fixtures (
+    child_uuid  TEXT NOT NULL,
+    phase       TEXT NOT NULL,            -- setup | teardown
+    name        TEXT,
+    status      TEXT,
+    message     TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_results_test   ON results(test_id, start);
+CREATE INDEX IF NOT EXISTS idx_results_name   ON results(name, start);
+CREATE INDEX IF NOT EXISTS idx_results_status ON results(status, start);
+CREATE INDEX IF NOT EXISTS idx_results_phase  ON results(phase, start);
+CREATE INDEX IF NOT EXISTS idx_results_uuid   ON results(uuid);
+CREATE INDEX IF NOT EXISTS idx_fixtures_child ON allure_fixtures(child_uuid);
+CREATE INDEX IF NOT EXISTS idx_results_sig    ON results(signature);
+"""
+
+
+def test_id(name: str) -> str:
+    """`TC-MENU-03 Edge Case: ...` → `TC-MENU-03` ; sinon le nom tel quel."""
+    match = _TEST_ID.match(name.strip())
+    return match.group(1) if match else name.strip()
+
+
+def failure_signature(message: Optional[str]) -> Optional[str]:
+    """
+    Message d'échec normalisé : préfixe de phase retiré, première ligne utile,
+    identifiants / nombres / chaînes entre guillemets masqués.
+    `Setup failed:\nWebDriverException: Message: Unable to find ... OS 13.0 ...`
+    → `WebDriverException: Message: Unable to find ... OS N ...`
+    """
+    lines = [line.strip() for line in (message or "").splitlines() if line.strip()]
+    while lines and _PHASE_PREFIX.match(lines[0]):
+        rest = _PHASE_PREFIX.sub("", lines[0]).strip()
+        lines = ([rest] if rest else []) + lines[1:]
+    if not lines:
+        return None
+    signature = lines[0]
+    for pattern, replacement in _SIGNATURE_MASKS:
+        signature = pattern.sub(replacement, signature)
+    return signature[:SIGNATURE_LENGTH]
+
+
+def _phase(message: str) -> str:
+    """Phase en échec d'après le message Robot (`Setup failed:`, `Parent suite setup failed:`…)."""
+    head = (message or "").lower()
+    if head.startswith(("setup failed", "parent suite setup failed")):
+        return "setup"
+    if head.startswith(("teardown failed", "parent suite teardown failed")):
+        return "teardown"
+    return "test"
+
+
+def history_db() -> Path:
+    """Chemin de la base, résolu à l'appel (suit un JOBS_DIR reconfiguré)."""
+    if HISTORY_DB:
+        return Path(HISTORY_DB)
+    import robot_jobs  # import local : robot_jobs importe ce module
+    return robot_jobs.JOBS_DIR / "test_history.db"
+
+
+def _robot_time(value: Optional[str]) -> Optional[float]:
+    if not value or value == "N/A":
+        return None
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        return datetime.strptime(value, _RF6_TIME).timestamp()
+
+
+class HistoryStore:
+    """Base SQLite des résultats de tests, alimentée de façon incrémentale."""
+
+    def __init__(self, path=None):
+        self.path = Path(path or history_db())
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(self.path)
+        self.db.row_factory = sqlite3.Row
+        self.db.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self.db.close()
+
+    # ── Ingestion ────────────────────────────────────────────────────────
+
+    def _iter_sources(self, paths: Iterable) -> Iterable[tuple[Path, str]]:
+        for path in (Path(p).resolve() for p in paths):
+            files = [path] if path.is_file() else sorted(path.rglob("*")) if path.is_dir() else []
+            for file in files:
+                if file.name.endswith("-container.json"):
+                    yield file, "allure-container"
+                elif file.name.endswith("-result.json"):
+                    yield file, "allure-result"
+                elif file.name == "output.xml" and "merged" not in file.parts:
+                    yield file, "robot"
+
+    def _seen(self, file: Path) -> bool:
+        stat = file.stat()
+        row  = self.db.execute("SELECT size, mtime FROM ingested_files WHERE path = ?",
+                               (str(file.resolve()),)).fetchone()
+        return row is not None and row["size"] == stat.st_size and row["mtime"] == stat.st_mtime
+
+    def ingest(self, paths: Optional[Iterable] = None) -> dict[str, int]:
+        """
+        Charge les fichiers de résultats nouveaux ou modifiés sous `paths`.
+        Les containers sont chargés avant les résultats pour dater les phases.
+        """
+        paths   = [p if Path(p).is_absolute() else PROJECT_ROOT / p
+                   for p in (paths or DEFAULT_SOURCES)]
+        sources = dict(self._iter_sources(paths))      # un fichier listé deux fois n'est lu qu'une fois
+        pending = [(f, kind) for f, kind in sources.items() if not self._seen(f)]
+        pending.sort(key=lambda item: _INGEST_ORDER[item[1]])
+
+        counts = {"files": 0, "results": 0, "skipped_files": 0}
+        allure_run = None
+        with self.db:
+            for file, kind in pending:
+                try:
+                    if kind == "allure-container":
+                        self._ingest_container(file)
+                    elif kind == "allure-result":
+                        if allure_run is None:
+                            allure_run = self._new_run("allure", str(file.parent), None)
+                        counts["results"] += self._ingest_allure_result(file, allure_run)
+                    else:
+                        counts["results"] += self._ingest_output_xml(file)
+                except (ValueError, KeyError, ParseError):
+                    counts["skipped_files"] += 1
+                    continue
+                stat = file.stat()
+                self.db.execute(
+                    "INSERT OR REPLACE INTO ingested_files VALUES (?, ?, ?, ?, ?)",
+                    (str(file.resolve()), stat.st_size, stat.st_mtime, kind, time.time()))
+                counts["files"] += 1
+        return counts
+
+    def _new_run(self, kind: str, source: str, started_at: Optional[float]) -> int:
+        return self.db.execute("INSERT INTO runs (kind, source, started_at) VALUES (?, ?, ?)",
+                               (kind, source, started_at)).lastrowid
+
+    def _ingest_container(self, file: Path) -> None:
+        data = json.loads(file.read_text(encoding="utf-8"))
+        for phase, fixtures in (("setup", data.get("befores", [])),
+                                ("teardown", data.get("afters", []))):
+            for fixture in fixtures:
+                status  = _ALLURE_STATUS.get(fixture.get("status"), "FAIL")
+                message = fixture.get("statusDetails", {}).get("message", "")
+                for child in data.get("children", []):
+                    self.db.execute("INSERT INTO allure_fixtures VALUES (?, ?, ?, ?, ?)",
+                                    (child, phase, fixture.get("name"), status, message))
+                    if status == "FAIL":
+                        self.db.execute("UPDATE results SET phase = ? WHERE uuid = ? AND status = 'FAIL'",
+                                        (phase, child))
+
+    def _ingest_allure_result(self, file: Path, run_id: int) -> int:
+        data    = json.loads(file.read_text(encoding="utf-8"))
+        status  = _ALLURE_STATUS.get(data["status"], "FAIL")
+        message = data.get("statusDetails", {}).get("message", "")
+        phase   = _phase(message) if status == "FAIL" else "test"
+        if status == "FAIL" and phase == "test":
+            failed_fixture = self.db.execute(
+                "SELECT phase FROM allure_fixtures WHERE child_uuid = ? AND status = 'FAIL'",
+                (data.get("uuid"),)).fetchone()
+            phase = failed_fixture["phase"] if failed_fixture else phase
+        suite = next((l["value"] for l in data.get("labels", []) if l["name"] == "suite"), None)
+        start, stop = data.get("start"), data.get("stop")
+        duration    = round((stop - start) / 1000, 3) if start and stop else None
+        if self._duplicate("allure", data["name"], start / 1000 if start else None, duration):
+            return 0
+        self.db.execute(
+            "INSERT INTO results (run_id, test_id, name, full_name, suite, status, phase, "
+            "message, start, duration_s, uuid, signature) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (run_id, test_id(data["name"]), data["name"], data.get("fullName"), suite, status,
+             phase, message, start / 1000 if start else None, duration, data.get("uuid"),
+             failure_signature(message) if status == "FAIL" else None))
+        return 1
+
+    def _ingest_output_xml(self, file: Path) -> int:
+        results = parse_output_xml(file, keyword_depth=0)
+        starts  = [_robot_time(t["start"]) for t in results["tests"]]
+        run_id  = self._new_run("robot", str(file), min(filter(None, starts), default=None))
+        rows = [
+            (run_id, test_id(t["name"]), t["name"], t["longname"], t["suite"], t["status"],
+             _phase(t["message"]) if t["status"] == "FAIL" else "test",
+             t["message"], start, t["elapsed_s"], None,
+             failure_signature(t["message"]) if t["status"] == "FAIL" else None)
+            for t, start in zip(results["tests"], starts)
+            if not self._duplicate("robot", t["name"], start, t["elapsed_s"])
+        ]
+        self.db.executemany(
+            "INSERT INTO results (run_id, test_id, name, full_name, suite, status, phase, "
+            "message, start, duration_s, uuid, signature) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            rows)
+        return len(rows)
+
+    def _duplicate(self, kind: str, name: str, start: Optional[float],
+                   duration_s: Optional[float]) -> bool:
+        """
+        Même exécution déjà chargée depuis l'autre format (Allure ↔ output.xml) :
+        même nom, même durée, dates décalées d'un fuseau (multiple de 15 min).
+        """
+        if start is None or duration_s is None:
+            return False
+        rows = self.db.execute(
+            "SELECT r.start FROM results r JOIN runs ON runs.id = r.run_id "
+            "WHERE r.name = ? AND r.duration_s = ? AND r.start BETWEEN ? AND ? AND runs.kind != ?",
+            (name, duration_s, start - _TZ_TOLERANCE, start + _TZ_TOLERANCE, kind)).fetchall()
+        return any(abs(abs(start - row["start"]) - round(abs(start - row["start"]) / 900) * 900) < 2
+                   for row in rows)
+
+    # ── Requêtes ─────────────────────────────────────────────────────────
+
+    def duration_trend(self, test: str, limit: int = 50) -> list[dict]:
+        """Durée et statut des dernières exécutions d'un test (par code TC-… ou nom)."""
+        rows = self.db.execute(
+            "SELECT start, duration_s, status, phase, name FROM results "
+            "WHERE test_id = ? OR name = ? OR full_name = ? ORDER BY start DESC LIMIT ?",
+            (test_id(test), test, test, limit)).fetchall()
+        return [dict(row) for row in reversed(rows)]
+
+    def failures(self, phase: Optional[str] = None, since: Optional[float] = None,
+                 test: Optional[str] = None, limit: int = 100) -> list[dict]:
+        """Échecs les plus récents, filtrés par phase (setup / test / teardown), date et test."""
+        clauses, params = ["status = 'FAIL'"], []
+        if phase:
+            clauses.append("phase = ?")
+            params.append(phase)
+        if since:
+            clauses.append("start >= ?")
+            params.append(since)
+        if test:
+            clauses.append("test_id = ?")
+            params.append(test_id(test))
+        rows = self.db.execute(
+            f"SELECT test_id, name, phase, message, start, duration_s FROM results "
+            f"WHERE {' AND '.join(clauses)} ORDER BY start DESC LIMIT ?",
+            (*params, limit)).fetchall()
+        return [dict(row) for row in rows]
+
+    def recent(self, test: str, limit: int = 20) -> list[dict]:
+        """Dernières exécutions d'un test, de la plus ancienne à la plus récente."""
+        rows = self.db.execute(
+            "SELECT status, phase, signature, message, start FROM results "
+            "WHERE test_id = ? ORDER BY start DESC LIMIT ?", (test_id(test), limit)).fetchall()
+        return [dict(row) for row in reversed(rows)]
+
+    def runs_by_test(self, limit: int = 20) -> dict[str, dict]:
+        """
+        Par test : statuts et durées des `limit` dernières exécutions (de la plus
+        ancienne à la plus récente) et date du dernier PASS, toutes exécutions confondues.
+        """
+        history: dict[str, dict] = {}
+        rows = self.db.execute(
+            "SELECT test_id, status, duration_s FROM ("
+            "  SELECT test_id, status, duration_s, start, ROW_NUMBER() OVER "
+            "    (PARTITION BY test_id ORDER BY start DESC) AS rank FROM results) "
+            "WHERE rank <= ? ORDER BY test_id, start", (limit,)).fetchall()
+        for row in rows:
+            entry = history.setdefault(row["test_id"], {"runs": [], "last_pass": None})
+            entry["runs"].append({"status": row["status"], "duration_s": row["duration_s"]})
+        for row in self.db.execute("SELECT test_id, MAX(start) AS last_pass FROM results "
+                                   "WHERE status = 'PASS' GROUP BY test_id"):
+            history.setdefault(row["test_id"], {"runs": [], "last_pass": None})
+            history[row["test_id"]]["last_pass"] = row["last_pass"]
+        return history
+
+    def signature_spread(self, signature: str, phase: Optional[str] = None,
+                         since: Optional[float] = None) -> int:
+        """Nombre de tests distincts ayant échoué avec cette signature."""
+        clauses, params = ["signature = ?"], [signature]
+        if phase:
+            clauses.append("phase = ?")
+            params.append(phase)
+        if since:
+            clauses.append("start >= ?")
+            params.append(since)
+        return self.db.execute(
+            f"SELECT COUNT(DISTINCT test_id) FROM results WHERE {' AND '.join(clauses)}",
+            params).fetchone()[0]
+
+    def latest_failures(self, since: Optional[float] = None) -> list[dict]:
+        """Tests dont la dernière exécution est un échec."""
+        rows = self.db.execute(
+            "SELECT r.test_id, r.name, r.phase, r.message, r.signature, r.start FROM results r "
+            "JOIN (SELECT test_id, MAX(start) AS start FROM results GROUP BY test_id) last "
+            "ON r.test_id = last.test_id AND r.start = last.start "
+            "WHERE r.status = 'FAIL' AND (? IS NULL OR r.start >= ?) ORDER BY r.start DESC",
+            (since, since)).fetchall()
+        return [dict(row) for row in rows]
+
+    # ── Quarantaine ──────────────────────────────────────────────────────
+
+    def quarantine(self, test: str, reason: str) -> None:
+        with self.db:
+            self.db.execute("INSERT OR IGNORE INTO quarantine VALUES (?, ?, ?)",
+                            (test_id(test), reason, time.time()))
+
+    def release(self, test: str) -> None:
+        with self.db:
+            self.db.execute("DELETE FROM quarantine WHERE test_id = ?", (test_id(test),))
+
+    def quarantined(self) -> dict[str, dict]:
+        rows = self.db.execute("SELECT test_id, reason, since FROM quarantine").fetchall()
+        return {row["test_id"]: {"reason": row["reason"], "since": row["since"]} for row in rows}
+
+    # ── Instantané des locators (robot_priority) ─────────────────────────
+
+    def locator_snapshot(self) -> dict[str, dict]:
+        rows = self.db.execute("SELECT key, value, changed_at FROM locators").fetchall()
+        return {row["key"]: {"value": row["value"], "changed_at": row["changed_at"]} for row in rows}
+
+    def save_locator_snapshot(self, snapshot: dict[str, dict]) -> None:
+        with self.db:
+            self.db.executemany("INSERT OR REPLACE INTO locators VALUES (?, ?, ?)",
+                                [(key, entry["value"], entry["changed_at"])
+                                 for key, entry in snapshot.items()])
+
+    def summary(self) -> list[dict]:
+        """Par test : exécutions, échecs, durée moyenne et dernière exécution."""
+        rows = self.db.execute(
+            "SELECT test_id, COUNT(*) AS runs, SUM(status = 'FAIL') AS failures, "
+            "ROUND(AVG(duration_s), 3) AS avg_duration_s, MAX(start) AS last_run "
+            "FROM results GROUP BY test_id ORDER BY failures DESC, test_id").fetchall()
+        return [dict(row) for row in rows]
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Historique SQLite des résultats de tests")
+    sub    = parser.add_subparsers(dest="command", required=True)
+    ingest = sub.add_parser("ingest", help="Charger les nouveaux résultats")
+    ingest.add_argument("paths", nargs="*", default=DEFAULT_SOURCES)
+    trend  = sub.add_parser("trend", help="Tendance de durée d'un test")
+    trend.add_argument("test")
+    fails  = sub.add_parser("failures", help="Échecs récents")
+    fails.add_argument("--phase", choices=["setup", "test", "teardown"])
+    fails.add_argument("--days", type=float)
+    fails.add_argument("--test")
+    sub.add_parser("summary", help="Synthèse par test")
+    args = parser.parse_args()
+
+    store = HistoryStore()
+    if args.command == "ingest":
+        output = store.ingest(args.paths)
+    elif args.command == "trend":
+        output = store.duration_trend(args.test)
+    elif args.command == "failures":
+        output = store.failures(args.phase, time.time() - args.days * 86400 if args.days else None,
+                                args.test)
+    else:
+        output = store.summary()
+    print(json.dumps(output, indent=2, ensure_ascii=False))
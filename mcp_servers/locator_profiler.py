@@ -0,0 +1,205 @@
+"""
+Locator Profiler — Latence de résolution des locators Robot Framework
+======================================================================
+Extrait tous les locators `${...}` des ressources Robot, résout chacun
+plusieurs fois (session Appium réelle ou stand-in sur page source
+enregistré) et produit un classement p50 / p95 avec le nombre de matchs
+et un remplacement plus rapide proposé par LocatorSynthesizer.
+
+Stand-in (SnapshotDriver) : reproduit la structure de coût UiAutomator2 —
+  • id / accessibility id / UiSelector → parcours de l'arbre d'accessibilité
+  • XPath → dump XML complet de la hiérarchie PUIS évaluation, à chaque appel
+
+Usage:
+    python locator_profiler.py --resources ../tests/resources --xml debug_ui.xml
+"""
+
+import math
+import re
+import time
+from pathlib import Path
+from typing import Any, Iterable, Optional
+
+from ui_snapshot import UiSnapshot, get_snapshot, parse_locator, _node_class
+from locator_synthesizer import LOCATOR_COSTS, LocatorSynthesizer
+from robot_resources import RobotVariable, iter_locator_variables
+
+DEFAULT_ITERATIONS = 5
+
+# Stratégie du snapshot → `by` WebDriver / Appium
+_APPIUM_BY = {
+    "resource_id":  "id",
+    "content_desc": "accessibility id",
+    "class_name":   "class name",
+    "xpath":        "xpath",
+    "uiautomator":  "-android uiautomator",
+}
+_BY_STRATEGY = {by: strategy for strategy, by in _APPIUM_BY.items()}
+
+# XPath ancré sur un attribut stable (id, description, texte) : plus robuste
+# qu'un `instance(n)` global, qui dépend de l'ordre de TOUS les éléments de la classe
+_ANCHORED_XPATH = re.compile(r"@(resource-id|content-desc|text)\b")
+
+# Famille de coût (LOCATOR_COSTS) de chaque stratégie
+_STRATEGY_FAMILY = {
+    "resource_id":  "id",
+    "content_desc": "accessibility_id",
+    "uiautomator":  "uiautomator",
+    "class_name":   "xpath",
+    "xpath":        "xpath",
+}
+
+
+class SnapshotDriver:
+    """
+    Stand-in WebDriver : `find_elements(by, value)` sur un page source enregistré.
+    Aucun index pré-calculé n'est utilisé, pour conserver les écarts de coût
+    réels entre stratégies natives et XPath.
+    """
+
+    def __init__(self, page_source: str):
+        self.page_source = page_source
+        self._snapshot   = UiSnapshot(page_source)
+
+    def find_elements(self, by: str, value: str) -> list:
+        strategy = _BY_STRATEGY.get(by)
+        if strategy is None:
+            raise ValueError(f"Stratégie non supportée : {by}")
+        if strategy == "xpath":
+            # UiAutomator2 sérialise toute la hiérarchie avant chaque requête XPath
+            return UiSnapshot(self.page_source).find_all("xpath", value)
+        if strategy == "uiautomator":
+            return self._snapshot.find_all("uiautomator", value)
+        if strategy == "resource_id":
+            return [n for n in self._snapshot.nodes
+                    if n.get("resource-id", "") == value
+                    or n.get("resource-id", "").endswith(f":id/{value}")]
+        if strategy == "class_name":
+            return [n for n in self._snapshot.nodes if _node_class(n) == value]
+        return [n for n in self._snapshot.nodes if n.get("content-desc", "") == value]
+
+
+def _percentile(timings: list[float], percent: float) -> float:
+    """Percentile au rang le plus proche (timings non vide)."""
+    ordered = sorted(timings)
+    rank    = max(1, math.ceil(percent / 100 * len(ordered)))
+    return round(ordered[rank - 1], 3)
+
+
+def _suggest_replacement(snapshot: UiSnapshot, synthesizer: LocatorSynthesizer,
+                         strategy: str, value: str) -> Optional[dict]:
+    """
+    Locator unique plus rapide désignant le même élément (None si aucun gain).
+    Un XPath est remplacé par une stratégie native quand c'est possible ; un
+    résultat positionnel (`instance(n)`) n'est qu'un dernier recours, jamais
+    proposé à la place d'un XPath ancré.
+    """
+    try:
+        matches = snapshot.find_all(strategy, value)
+    except ValueError:
+        return None
+    if len(matches) != 1:
+        return None
+    family = _STRATEGY_FAMILY[strategy]
+    best   = synthesizer.synthesize(matches[0], allow_xpath=family != "xpath")
+    if best and best["positional"] and _ANCHORED_XPATH.search(value):
+        return None
+    if best and (family == "xpath" or best["cost"] < LOCATOR_COSTS[family]):
+        return best
+    return None
+
+
+def profile_locators(driver: Any, variables: Iterable[RobotVariable],
+                     iterations: int = DEFAULT_ITERATIONS) -> dict[str, Any]:
+    """
+    Résout chaque locator `iterations` fois via `driver.find_elements` et
+    retourne le classement du plus lent (p95) au plus rapide.
+
+    `driver` : session Appium (implicit wait à 0 conseillé) ou SnapshotDriver.
+    """
+    snapshot    = get_snapshot(driver.page_source)
+    synthesizer = LocatorSynthesizer.from_snapshot(snapshot)
+    rows        = []
+
+    for variable in variables:
+        strategy, value = parse_locator(variable.locator)
+        row = {
+            "name":     variable.name,
+            "locator":  variable.value,
+            "file":     variable.path,
+            "line":     variable.line,
+            "strategy": strategy,
+        }
+        timings, matches, error = [], 0, None
+        for _ in range(max(1, iterations)):
+            start = time.perf_counter()
+            try:
+                matches = len(driver.find_elements(_APPIUM_BY[strategy], value))
+            except Exception as e:
+                error = str(e)
+                break
+            timings.append((time.perf_counter() - start) * 1000)
+
+        suggestion = _suggest_replacement(snapshot, synthesizer, strategy, value)
+        row.update({
+            "p50_ms":      _percentile(timings, 50) if timings else None,
+            "p95_ms":      _percentile(timings, 95) if timings else None,
+            "match_count": matches if error is None else None,
+            "unique":      error is None and matches == 1,
+            "suggestion":  suggestion["locator"] if suggestion else None,
+            "suggestion_strategy": suggestion["strategy"] if suggestion else None,
+            "suggestion_positional": bool(suggestion and suggestion["positional"]),
+        })
+        if error:
+            row["error"] = error
+        rows.append(row)
+
+    rows.sort(key=lambda r: (r["p95_ms"] is not None, r["p95_ms"] or 0), reverse=True)
+    return {
+        "iterations":     max(1, iterations),
+        "total_locators": len(rows),
+        "not_found":      sum(1 for r in rows if r["match_count"] == 0),
+        "ambiguous":      sum(1 for r in rows if (r["match_count"] or 0) > 1),
+        "with_suggestion": sum(1 for r in rows if r["suggestion"]),
+        "locators":       rows,
+    }
+
+
+def profile_resources(driver: Any, paths: Iterable,
+                      iterations: int = DEFAULT_ITERATIONS) -> dict[str, Any]:
+    """Raccourci : extrait les locators des fichiers Robot puis les profile."""
+    return profile_locators(driver, list(iter_locator_variables(paths)), iterations)
+
+
+def format_report(report: dict, limit: int = 20) -> str:
+    """Tableau texte du classement (les `limit` locators les plus lents)."""
+    lines = [
+        f"{'Variable':<28} {'p50 ms':>8} {'p95 ms':>8} {'match':>5}  Remplacement suggéré",
+        f"{'-'*28} {'-'*8} {'-'*8} {'-'*5}  {'-'*30}",
+    ]
+    for row in report["locators"][:limit]:
+        p50   = f"{row['p50_ms']:.2f}" if row["p50_ms"] is not None else "-"
+        p95   = f"{row['p95_ms']:.2f}" if row["p95_ms"] is not None else "-"
+        count = row["match_count"] if row["match_count"] is not None else "err"
+        note  = "  (positionnel, dernier recours)" if row["suggestion_positional"] else ""
+        lines.append(f"{row['name'][:28]:<28} {p50:>8} {p95:>8} {count!s:>5}  "
+                     f"{row['suggestion'] or ''}{note}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Profile la latence des locators Robot Framework")
+    parser.add_argument("--resources", nargs="+", default=["tests/resources"],
+                        help="Fichiers ou dossiers .robot à analyser")
+    parser.add_argument("--xml", required=True,
+                        help="Page source enregistré (stand-in WebDriver)")
+    parser.add_argument("--iterations", type=int, default=DEFAULT_ITERATIONS)
+    parser.add_argument("--json", action="store_true", help="Sortie JSON complète")
+    args = parser.parse_args()
+
+    report = profile_resources(SnapshotDriver(Path(args.xml).read_text(encoding="utf-8")),
+                               args.resources, args.iterations)
+    print(json.dumps(report, indent=2, ensure_ascii=False) if args.json else format_report(report))
@@ -0,0 +1,185 @@
+"""
+Locator Rewriter — XPath des variables Robot → locators natifs vérifiés
+=======================================================================
+Pour chaque variable-locator XPath d'un fichier de variables Robot
+(`xpath=//android.widget.ScrollView/android.widget.EditText[2]`…) :
+
+  1. évalue l'XPath sur chaque snapshot enregistré (page sources XML) ;
+  2. propose les alternatives natives du nœud trouvé (LocatorSynthesizer :
+     id, accessibility id, UiSelector, resourceIdMatches, instance(n)) ;
+  3. retient la moins coûteuse qui est ÉQUIVALENTE sur tous les snapshots :
+     même nœud, unique, là où l'XPath trouvait un élément — et aucun
+     élément là où l'XPath n'en trouvait pas.
+
+Le fichier de variables n'est réécrit (`write=True`) que pour les locators
+vérifiés ; les valeurs sont échappées au format Robot (`\\n`, `\\\\`).
+
+Usage:
+    python locator_rewriter.py ../tests/resources/AppVariables.robot --snapshots ../results/ui_snapshots
+    python locator_rewriter.py ../tests/resources/AppVariables.robot --snapshots debug_ui.xml --write
+"""
+
+import os
+import re
+import time
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from typing import Iterable, Optional
+
+from ui_snapshot import UiSnapshot, parse_locator
+from locator_synthesizer import LocatorSynthesizer
+from robot_resources import parse_variables
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+# Snapshots enregistrés (un page source XML par écran)
+SNAPSHOT_DIR = Path(os.getenv("UI_SNAPSHOT_DIR", PROJECT_ROOT / "results" / "ui_snapshots"))
+
+# Variables Robot dans une valeur : à échapper pour rester littérales
+_ROBOT_VARIABLE = re.compile(r"([$@&%]\{)")
+
+
+def robot_escape(value: str) -> Optional[str]:
+    """
+    Valeur écrite telle quelle dans une cellule Robot (None si non représentable :
+    espaces multiples ou en bordure, qui changeraient le découpage des cellules).
+    """
+    if value != value.strip() or "  " in value or "\t" in value:
+        return None
+    value = value.replace("\\", "\\\\").replace("\n", "\\n").replace("\r", "\\r")
+    return _ROBOT_VARIABLE.sub(r"\\\1", value)
+
+
+def load_snapshots(paths: Iterable) -> list[tuple[str, UiSnapshot]]:
+    """Snapshots (nom, UiSnapshot) des fichiers .xml sous `paths` ; XML invalides ignorés."""
+    snapshots = []
+    for path in map(Path, paths):
+        files = [path] if path.is_file() else sorted(path.glob("*.xml"))
+        for file in files:
+            try:
+                snapshots.append((file.name, UiSnapshot(file.read_text(encoding="utf-8"))))
+            except (OSError, ET.ParseError):
+                continue
+    return snapshots
+
+
+def record_snapshot(page_source: str, directory: Path = SNAPSHOT_DIR) -> Path:
+    """Enregistre un page source dans le dossier des snapshots (nom = empreinte)."""
+    snapshot = UiSnapshot(page_source)
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"{snapshot.fingerprint[:16]}.xml"
+    if not path.exists():
+        path.write_text(page_source, encoding="utf-8")
+    return path
+
+
+def _first(snapshot: UiSnapshot, locator: str) -> tuple[list, Optional[str]]:
+    try:
+        return snapshot.find_all(*parse_locator(locator)), None
+    except ValueError as e:
+        return [], str(e)
+
+
+def _equivalent(candidate: str, targets: list) -> Optional[str]:
+    """None si `candidate` désigne le même nœud sur chaque snapshot, sinon la raison."""
+    for name, snapshot, target in targets:
+        matches, error = _first(snapshot, candidate)
+        if error:
+            return error
+        if target is None and matches:
+            return f"{name} : trouve un élément là où l'XPath n'en trouve pas"
+        if target is not None and (len(matches) != 1 or matches[0] is not target):
+            return f"{name} : {len(matches)} élément(s), pas le même nœud"
+    return None
+
+
+def rewrite_locator(locator: str, snapshots: list[tuple[str, UiSnapshot]]) -> dict:
+    """
+    Remplacement vérifié d'un locator XPath. Retourne un dict avec `status` :
+    `verified` (+ `locator`, `strategy`), `unverified`, `not_matched` ou `invalid` ;
+    `rejected` liste les candidats moins coûteux écartés et la raison.
+    """
+    targets = []
+    for name, snapshot in snapshots:
+        matches, error = _first(snapshot, locator)
+        if error:
+            return {"status": "invalid", "reason": error}
+        # AppiumLibrary agit sur le premier élément trouvé
+        targets.append((name, snapshot, matches[0] if matches else None))
+
+    matched = [(name, snapshot, target) for name, snapshot, target in targets if target is not None]
+    if not matched:
+        return {"status": "not_matched", "snapshots": 0}
+
+    name, snapshot, target = matched[0]
+    reasons = []
+    for candidate in LocatorSynthesizer.from_snapshot(snapshot).candidates(target):
+        reason = _equivalent(candidate["locator"], targets)
+        if reason is None:
+            return {"status": "verified", "locator": candidate["locator"],
+                    "strategy": candidate["strategy"], "positional": candidate["positional"],
+                    "snapshots": len(matched), "rejected": reasons}
+        reasons.append(f"{candidate['locator']} — {reason}")
+    return {"status": "unverified", "snapshots": len(matched), "rejected": reasons}
+
+
+def rewrite_variables(path, snapshots: list[tuple[str, UiSnapshot]],
+                      write: bool = False) -> dict:
+    """
+    Propose (et applique si `write`) un remplacement vérifié pour chaque
+    variable XPath de `path`. Les autres variables ne sont pas touchées.
+    """
+    path    = Path(path)
+    lines   = path.read_text(encoding="utf-8").splitlines(keepends=True)
+    rows    = []
+    start   = time.perf_counter()
+    for variable in parse_variables(path):
+        if not variable.is_locator or parse_locator(variable.locator)[0] != "xpath":
+            continue
+        result = rewrite_locator(variable.locator, snapshots)
+        # `original` : valeur écrite dans le fichier ; `locator` : remplacement vérifié
+        row = {"name": variable.name, "line": variable.line, "original": variable.value, **result}
+        if result["status"] == "verified":
+            escaped = robot_escape(result["locator"])
+            if escaped is None:
+                row.update(status="unverified", reason="valeur non représentable dans une cellule Robot")
+            else:
+                row["replacement"] = escaped
+                if write:
+                    index = variable.line - 1
+                    lines[index] = lines[index].replace(variable.value, escaped, 1)
+        rows.append(row)
+
+    rewritten = [r for r in rows if r.get("replacement")]
+    if write and rewritten:
+        path.write_text("".join(lines), encoding="utf-8")
+    return {
+        "file":        str(path),
+        "snapshots":   len(snapshots),
+        "xpath":       len(rows),
+        "verified":    len(rewritten),
+        "written":     write and bool(rewritten),
+        "duration_ms": round((time.perf_counter() - start) * 1000, 1),
+        "locators":    rows,
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="XPath des variables Robot → locators natifs vérifiés")
+    parser.add_argument("variables", help="Fichier de variables Robot (ex. AppVariables.robot)")
+    parser.add_argument("--snapshots", nargs="+", default=[str(SNAPSHOT_DIR)],
+                        help="Fichiers ou dossiers de page sources XML")
+    parser.add_argument("--write", action="store_true", help="Réécrire le fichier de variables")
+    args = parser.parse_args()
+
+    report = rewrite_variables(args.variables, load_snapshots(args.snapshots), write=args.write)
+    for row in report["locators"]:
+        if row.get("replacement"):
+            print(f"✅ ${{{row['name']}}}  {row['original']}  →  {row['replacement']}  "
+                  f"({row['snapshots']} snapshot(s))")
+        else:
+            print(f"⚠️  ${{{row['name']}}}  {row['original']}  [{row['status']}]")
+    print(f"\n{report['verified']}/{report['xpath']} XPath remplaçable(s) sur "
+          f"{report['snapshots']} snapshot(s)" + (" — fichier réécrit" if report["written"] else ""))
@@ -0,0 +1,236 @@
+"""
+Locator Synthesizer — Locator unique le moins coûteux par élément
+=================================================================
+Pour chaque élément d'un snapshot UI, calcule le locator UNIQUE le plus
+rapide et le plus stable, en s'appuyant sur les tables de hachage du
+snapshot (LocatorIndex) — aucune évaluation XPath globale.
+
+Ordre de préférence (coût croissant) :
+  1. id=                              resource-id unique
+  2. accessibility_id=                content-desc unique
+  3. android=new UiSelector()...      text / className+text / resourceId+text
+  4. xpath= ancré court               label voisin ou ancêtre identifié unique
+  5. android=...instance(n)           positionnel (dernier recours)
+
+`candidates(node)` liste toutes les alternatives natives, uniques ou non
+sur ce snapshot, pour une vérification sur plusieurs snapshots
+(locator_rewriter.py) ; s'y ajoute `resourceIdMatches(".*:id/nom")`,
+insensible au package (builds debug / release).
+
+Usage:
+    synth = LocatorSynthesizer.from_snapshot(get_snapshot(page_source))
+    best  = synth.synthesize(node)   # {"locator", "strategy", "cost", "positional"}
+"""
+
+import re
+from typing import Optional
+
+from ui_snapshot import LocatorIndex, UiSnapshot, _node_class
+
+# Nom de classe utilisable tel quel comme pas XPath (exclut les classes internes `$`)
+_XPATH_NAME = re.compile(r"^[A-Za-z_][\w.\-]*$")
+
+# Coût relatif de chaque famille de locator (UiAutomator2)
+LOCATOR_COSTS = {
+    "id":               1,
+    "accessibility_id": 2,
+    "uiautomator":      3,
+    "xpath":            4,
+    "positional":       5,
+}
+
+
+def _xpath_literal(value: str) -> str:
+    """Littéral XPath 1.0 sûr (gère les apostrophes)."""
+    if "'" not in value:
+        return f"'{value}'"
+    if '"' not in value:
+        return f'"{value}"'
+    parts = value.split("'")
+    return "concat(" + ", \"'\", ".join(f"'{p}'" for p in parts) + ")"
+
+
+def _java_literal(value: str) -> str:
+    """Littéral Java pour UiSelector (échappe \\ et \")."""
+    return '"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def _candidate(locator: str, strategy: str, positional: bool = False) -> dict:
+    return {
+        "locator":    locator,
+        "strategy":   strategy,
+        "cost":       LOCATOR_COSTS["positional" if positional else strategy],
+        "positional": positional,
+    }
+
+
+class LocatorSynthesizer:
+    """
+    Synthétiseur de locators uniques pour un arbre UI (ElementTree ou lxml).
+    Les index (id, text, content-desc, classe, classe+text, parents) sont
+    calculés une fois ; chaque synthèse est ensuite en O(profondeur).
+    """
+
+    def __init__(self, root, index: Optional[LocatorIndex] = None):
+        self.root   = root
+        self.nodes  = [n for n in root.iter() if isinstance(n.tag, str)]
+        self.index  = index or LocatorIndex(self.nodes)
+        self.parent = {child: parent for parent in self.nodes
+                       for child in parent if isinstance(child.tag, str)}
+
+    @classmethod
+    def from_snapshot(cls, snapshot: UiSnapshot) -> "LocatorSynthesizer":
+        """Réutilise l'arbre et les tables de hachage déjà calculées du snapshot."""
+        return cls(snapshot.root, snapshot.index)
+
+    # ──────────────────────────────────────────────────────────────────────
+    # API
+    # ──────────────────────────────────────────────────────────────────────
+
+    def synthesize(self, node, allow_xpath: bool = True) -> Optional[dict]:
+        """
+        Locator unique le moins coûteux pour `node` (None si nœud hors arbre).
+        `allow_xpath=False` : uniquement des stratégies natives UiAutomator2
+        (pas de dump XML de la hiérarchie côté device), quitte à être positionnel.
+        """
+        return (self._by_id(node)
+                or self._by_accessibility(node)
+                or self._by_uiautomator(node)
+                or (self._by_anchored_xpath(node) if allow_xpath else None)
+                or self._by_position(node))
+
+    def candidates(self, node) -> list[dict]:
+        """
+        Alternatives natives (sans XPath) pour `node`, par coût croissant :
+        id, accessibility id, UiSelector, resourceIdMatches, positionnel.
+        """
+        found = [c for c in (self._by_id(node), self._by_accessibility(node),
+                             self._by_uiautomator(node)) if c]
+        rid = node.get("resource-id", "")
+        if ":id/" in rid:
+            pattern = ".*:id/" + re.escape(rid.split(":id/", 1)[1])
+            found.append(_candidate(
+                f"android=new UiSelector().resourceIdMatches({_java_literal(pattern)})", "uiautomator"))
+        position = self._by_position(node)
+        if position:
+            found.append(position)
+        return found
+
+    def synthesize_all(self) -> list[dict]:
+        """Synthèse pour tous les éléments utiles (id, texte, description ou cliquable)."""
+        results = []
+        for node in self.nodes:
+            if (node.get("resource-id") or node.get("text") or node.get("content-desc")
+                    or node.get("clickable") == "true"):
+                best = self.synthesize(node)
+                if best:
+                    results.append({
+                        "class":        _node_class(node),
+                        "resource_id":  node.get("resource-id", ""),
+                        "text":         node.get("text", ""),
+                        "content_desc": node.get("content-desc", ""),
+                        "bounds":       node.get("bounds", ""),
+                        **best,
+                    })
+        return results
+
+    # ──────────────────────────────────────────────────────────────────────
+    # STRATÉGIES (ordre de préférence)
+    # ──────────────────────────────────────────────────────────────────────
+
+    def _unique(self, strategy: str, key) -> bool:
+        return len(self.index.maps[strategy].get(key, ())) == 1
+
+    def _by_id(self, node) -> Optional[dict]:
+        rid = node.get("resource-id", "")
+        if rid and self._unique("resource_id", rid):
+            return _candidate(f"id={rid}", "id")
+        return None
+
+    def _by_accessibility(self, node) -> Optional[dict]:
+        desc = node.get("content-desc", "")
+        if desc and self._unique("content_desc", desc):
+            return _candidate(f"accessibility_id={desc}", "accessibility_id")
+        return None
+
+    def _by_uiautomator(self, node) -> Optional[dict]:
+        cls  = _node_class(node)
+        text = node.get("text", "")
+        rid  = node.get("resource-id", "")
+        desc = node.get("content-desc", "")
+
+        selector = None
+        if text and self._unique("text", text):
+            selector = f"text({_java_literal(text)})"
+        elif text and self._unique("class_text", (cls, text)):
+            selector = f"className({_java_literal(cls)}).text({_java_literal(text)})"
+        elif rid and text and sum(
+                1 for n in self.index.maps["resource_id"][rid] if n.get("text", "") == text) == 1:
+            selector = f"resourceId({_java_literal(rid)}).text({_java_literal(text)})"
+        elif desc and sum(
+                1 for n in self.index.maps["content_desc"][desc] if _node_class(n) == cls) == 1:
+            selector = f"className({_java_literal(cls)}).description({_java_literal(desc)})"
+
+        if selector:
+            return _candidate(f"android=new UiSelector().{selector}", "uiautomator")
+        return None
+
+    def _anchor_predicate(self, node) -> Optional[str]:
+        """Prédicat XPath identifiant `node` de façon unique (id, description ou texte)."""
+        rid  = node.get("resource-id", "")
+        desc = node.get("content-desc", "")
+        text = node.get("text", "")
+        if rid and self._unique("resource_id", rid):
+            return f"@resource-id={_xpath_literal(rid)}"
+        if desc and self._unique("content_desc", desc):
+            return f"@content-desc={_xpath_literal(desc)}"
+        if text and self._unique("text", text):
+            return f"@text={_xpath_literal(text)}"
+        return None
+
+    def _by_anchored_xpath(self, node) -> Optional[dict]:
+        cls    = _node_class(node)
+        parent = self.parent.get(node)
+        if not _XPATH_NAME.match(cls):
+            return None
+
+        # a) Label voisin : //*[@content-desc='First Name']/following-sibling::EditText[1]
+        if parent is not None:
+            siblings = [c for c in parent if isinstance(c.tag, str)]
+            position = siblings.index(node)
+            for label in reversed(siblings[:position]):
+                predicate = self._anchor_predicate(label)
+                if not predicate:
+                    continue
+                between = siblings[siblings.index(label) + 1:position]
+                if not any(_node_class(s) == cls for s in between):
+                    return _candidate(
+                        f"xpath=//*[{predicate}]/following-sibling::{cls}[1]", "xpath")
+                break
+
+        # b) Ancêtre identifié : (//*[@resource-id='list']//android.widget.Button)[2]
+        ancestor = parent
+        while ancestor is not None:
+            predicate = self._anchor_predicate(ancestor)
+            if predicate:
+                same_class = [n for n in ancestor.iter()
+                              if n is not ancestor and isinstance(n.tag, str) and _node_class(n) == cls]
+                rank = same_class.index(node) + 1
+                path = f"//*[{predicate}]//{cls}"
+                return _candidate(f"xpath={path}" if len(same_class) == 1 else f"xpath=({path})[{rank}]",
+                                  "xpath")
+            ancestor = self.parent.get(ancestor)
+        return None
+
+    def _by_position(self, node) -> Optional[dict]:
+        rid = node.get("resource-id", "")
+        if rid:
+            rank = self.index.maps["resource_id"][rid].index(node)
+            selector = f"resourceId({_java_literal(rid)}).instance({rank})"
+        else:
+            cls = _node_class(node)
+            if not cls:
+                return None
+            rank = self.index.maps["class_name"][cls].index(node)
+            selector = f"className({_java_literal(cls)}).instance({rank})"
+        return _candidate(f"android=new UiSelector().{selector}", "uiautomator", positional=True)
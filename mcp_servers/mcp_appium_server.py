@@ -8,24 +8,47 @@ Outils exposés:
   • get_page_source               → XML brut de l'écran courant
   • find_element_by_strategies    → Recherche multi-stratégies d'un élément
   • suggest_alternative_locators  → Self-healing : propose des alternatives
-  • execute_robot_test            → Lance un test Robot Framework
+  • execute_robot_test            → Lance un test Robot Framework (job en arrière-plan)
+  • select_impacted_tests         → Tests impactés par des locators / fichiers modifiés
+  • get_test_priorities           → Ordre fail-fast calculé sur l'historique d'exécution
+  • get_robot_job_status          → Statut + résultats partiels d'un job Robot
+  • watch_robot_job               → Diffuse la progression d'un job (notifications MCP)
+  • cancel_robot_job              → Annule un job Robot (arbre de processus complet)
+  • list_robot_jobs               → Derniers jobs Robot et leur statut
+  • get_robot_results             → Résultats structurés d'un output.xml (lecture en flux)
+  • get_keyword_profile           → Points chauds : temps par keyword / locator d'un job
+  • query_test_history            → Historique SQLite : tendances de durée, échecs par phase
+  • classify_failures             → Échecs flaky / infrastructure / réels (retry, quarantaine, healing)
+  • execute_robot_sharded         → Régression parallèle : un shard par device
+  • get_sharded_run_status        → Statut agrégé des shards + rapport fusionné
+  • cancel_sharded_run            → Annule tous les shards d'un run
   • take_screenshot               → Capture d'écran encodée base64
   • analyze_current_screen        → Analyse enrichie : classification sémantique
                                     + détection page + locators RF prêts à l'emploi
+  • profile_robot_locators        → Latence p50/p95 des locators des ressources Robot
+  • lint_robot_suites             → Anti-patterns de performance des .robot (coût estimé, autofix)
+  • rewrite_xpath_locators        → XPath des variables Robot → id / UiSelector vérifiés sur snapshots
+  • discover_devices              → Devices adb (cache) + capabilities validées avant session
+  • get_device_leases             → Devices loués (sessions, jobs Robot, agents) et file d'attente
+  • release_device_lease          → Libérer un bail (processus bloqué)
 
 Architecture:
   - Simulation automatique si Appium non connecté (mode dev/CI sans device)
   - Détection de page par heuristique ou Gemini Vision (si screenshot dispo)
   - Locators classifiés : robust / fragile / missing
+  - Locators résolus localement sur un snapshot du page source (ui_snapshot.py)
+  - Locator unique le moins coûteux par élément (locator_synthesizer.py)
 """
 
 import os
+import asyncio
 import re
+import sys
+import time
 import base64
-import subprocess
 import json
 import xml.etree.ElementTree as ET
-from typing import Any, Optional
+from typing import Any, Callable, Optional
 from pathlib import Path
 
 # ============================================================================
@@ -57,7 +80,6 @@ except ImportError:
 try:
     from appium import webdriver
     from appium.options.android import UiAutomator2Options
-    from appium.webdriver.common.appiumby import AppiumBy
     from selenium.webdriver.support.ui import WebDriverWait
     from selenium.webdriver.support import expected_conditions as EC
     from selenium.common.exceptions import (
@@ -69,7 +91,25 @@ except ImportError:
     print("⚠️  Appium non installé — mode simulation activé")
     print("   pip install Appium-Python-Client selenium")
 
-from mcp.server.fastmcp import FastMCP
+from mcp.server.fastmcp import Context, FastMCP
+
+# ── Moteur de résolution locale des locators (lxml + cache XPath) ──────────
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from ui_snapshot import LocatorIndex, get_snapshot, element_details
+from locator_synthesizer import LocatorSynthesizer
+from locator_profiler import SnapshotDriver, profile_resources
+import robot_jobs
+import robot_priority
+import robot_shards
+import robot_timing_listener
+from robot_impact import ImpactIndex, robot_selection_args
+from robot_output import parse_output_xml
+import history_store
+from failure_classifier import FailureClassifier, quarantine_args
+import robot_lint
+import locator_rewriter
+import device_discovery
+import device_leases
 
 # ============================================================================
 # CONFIGURATION  (toutes les valeurs proviennent du .env)
@@ -81,9 +121,10 @@ APPIUM_HOST              = os.getenv("APPIUM_HOST", "http://127.0.0.1")
 APPIUM_PORT              = os.getenv("APPIUM_PORT", "4723")
 APPIUM_URL               = APPIUM_SERVER_URL or f"{APPIUM_HOST}:{APPIUM_PORT}"
 
+# Vide : version lue sur le device (device_discovery.preflight)
 ANDROID_PLATFORM_VERSION = (
     os.getenv("PLATFORM_VERSION") or
-    os.getenv("ANDROID_PLATFORM_VERSION") or "13.0"
+    os.getenv("ANDROID_PLATFORM_VERSION") or ""
 )
 ANDROID_DEVICE_NAME = (
     os.getenv("DEVICE_NAME") or
@@ -95,6 +136,8 @@ APP_APK_PATH   = os.getenv("APP_PATH", os.getenv("APP_APK_PATH", ""))
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "")
 
 ELEMENT_TIMEOUT  = int(os.getenv("ELEMENT_TIMEOUT", "10"))
+RACE_POLL_INTERVAL = float(os.getenv("RACE_POLL_INTERVAL", "0.5"))
+DEVICE_LEASE_WAIT  = float(os.getenv("MCP_DEVICE_LEASE_WAIT", "30"))
 TESTS_DIR        = os.getenv("TESTS_DIR", "tests")
 SCREENSHOTS_DIR  = os.getenv("SCREENSHOTS_DIR", "screenshots")
 
@@ -135,16 +178,31 @@ KNOWN_PAGES = {
 
 def _get_driver() -> Optional[Any]:
     """
-    Crée une session Appium (UiAutomator2Options).
-    Retourne None si Appium indisponible ou si la connexion échoue.
+    Crée une session Appium (UiAutomator2Options) sur un device loué
+    (device_leases.checkout : preflight + bail libéré par driver.quit()).
+    Retourne None si Appium indisponible, sans device libre, ou si la connexion échoue.
     """
     if not APPIUM_AVAILABLE:
         return None
+    check = device_leases.checkout("mcp_appium_server", ANDROID_DEVICE_NAME,
+                                   ANDROID_PLATFORM_VERSION, wait=DEVICE_LEASE_WAIT)
+    if not check["ok"]:
+        print(f"⚠️  Preflight : {check['error']} → simulation activée")
+        return None
+    for correction in check["corrections"]:
+        print(f"🔧 Preflight : {correction}")
+    capabilities = check["capabilities"]
+    lease        = check["lease"]
     try:
         options = UiAutomator2Options()
         options.platform_name                  = "Android"
-        options.platform_version               = ANDROID_PLATFORM_VERSION
-        options.device_name                    = ANDROID_DEVICE_NAME
+        if capabilities["platformVersion"]:
+            options.platform_version           = capabilities["platformVersion"]
+        options.device_name                    = capabilities["deviceName"]
+        if capabilities.get("udid"):
+            options.udid                       = capabilities["udid"]
+        if capabilities.get("systemPort"):
+            options.system_port                = capabilities["systemPort"]
         options.app_package                    = APP_PACKAGE
         options.app_activity                   = APP_ACTIVITY
         options.no_reset                       = True
@@ -157,10 +215,12 @@ def _get_driver() -> Optional[Any]:
                 and Path(APP_APK_PATH).exists()):
             options.app = APP_APK_PATH
 
-        driver = webdriver.Remote(APPIUM_URL, options=options)
+        driver = webdriver.Remote((lease or {}).get("appium_url") or APPIUM_URL, options=options)
         print(f"✅ Session Appium: {driver.current_package}/{driver.current_activity}")
-        return driver
+        return device_leases.bind(driver, lease)
     except Exception as e:
+        if lease:
+            device_leases.release(lease["lease_id"])
         print(f"⚠️  Session Appium échouée ({e}) → simulation activée")
         return None
 
@@ -239,8 +299,12 @@ def _classify_element(cls: str, rid: str, text: str, desc: str, clickable: bool)
 
 
 def _build_rf_locators(resource_id: str, short_id: str, text: str,
-                        content_desc: str, cls: str) -> dict:
-    """Construit tous les locators Robot Framework disponibles pour un élément."""
+                        content_desc: str, cls: str,
+                        recommended: Optional[dict] = None) -> dict:
+    """
+    Construit tous les locators Robot Framework disponibles pour un élément.
+    `recommended` : locator unique le moins coûteux calculé par LocatorSynthesizer.
+    """
     locators = {}
     if resource_id:
         locators["by_id"]     = f"id={resource_id}"
@@ -251,27 +315,63 @@ def _build_rf_locators(resource_id: str, short_id: str, text: str,
     if content_desc:
         locators["by_accessibility"] = f"accessibility id={content_desc}"
     if cls and text:
-        short_cls = cls.split(".")[-1]
-        locators["by_class_text"] = f"xpath=//{short_cls}[@text='{text}']"
+        # Nom de classe complet : c'est le nom de balise dans le page source UiAutomator2
+        locators["by_class_text"] = f"xpath=//{cls}[@text='{text}']"
+    if recommended:
+        locators["recommended"] = recommended["locator"]
     return locators
 
 
-def _compute_locator_quality(resource_id: str, text: str, locators: dict) -> str:
+def _count_locator_matches(locators: dict, index: LocatorIndex) -> dict:
+    """
+    Nombre exact de matchs + unicité de chaque locator, via les tables de hachage.
+    `recommended` est exclu : il est unique par construction (LocatorSynthesizer).
+    """
+    matches = {}
+    for key, locator in locators.items():
+        if key == "recommended":
+            continue
+        count = index.count(locator)
+        if count is not None:
+            matches[key] = {"count": count, "unique": count == 1}
+    return matches
+
+
+def _compute_locator_quality(resource_id: str, text: str, locators: dict,
+                             locator_matches: Optional[dict] = None) -> str:
     """
     Calcule la qualité du locator selon la chaîne de priorité :
       resource-id → robust | accessibility id → robust | text → fragile | rien → missing
+    Un resource-id / accessibility id présent plusieurs fois à l'écran est
+    rétrogradé en fragile (le test cliquerait sur le mauvais élément).
     """
-    if resource_id:
+    def unique(key: str) -> bool:
+        return not locator_matches or key not in locator_matches or locator_matches[key]["unique"]
+
+    if resource_id and unique("by_id"):
+        return "robust"
+    if locators.get("by_accessibility") and unique("by_accessibility"):
         return "robust"
-    if locators.get("by_accessibility") or locators.get("appium_a11y"):
+    if locators.get("appium_a11y"):
         return "robust"
-    if text or locators.get("by_text") or locators.get("by_xpath"):
+    if (resource_id or locators.get("by_accessibility")
+            or text or locators.get("by_text") or locators.get("by_xpath")):
         return "fragile"
     return "missing"
 
 
-def _extract_enriched_elements(node: ET.Element, depth: int = 0) -> list:
-    """Parse récursivement l'XML UI → liste d'éléments enrichis avec locators RF."""
+def _extract_enriched_elements(node: ET.Element, depth: int = 0,
+                               synthesizer: Optional[LocatorSynthesizer] = None) -> list:
+    """
+    Parse récursivement l'XML UI → liste d'éléments enrichis avec locators RF.
+    Les tables de hachage (LocatorIndex) sont construites en une passe à la
+    racine puis partagées par tous les nœuds pour compter les matchs et
+    synthétiser le locator unique le moins coûteux (`recommended`).
+    """
+    if synthesizer is None:
+        synthesizer = LocatorSynthesizer(node)
+    index = synthesizer.index
+
     elements = []
     attrib   = node.attrib
 
@@ -286,8 +386,11 @@ def _extract_enriched_elements(node: ET.Element, depth: int = 0) -> list:
 
     if resource_id or (text and len(text) < 120) or content_desc or clickable:
         elem_type       = _classify_element(cls, short_id, text, content_desc, clickable)
-        locators        = _build_rf_locators(resource_id, short_id, text, content_desc, cls)
-        locator_quality = _compute_locator_quality(resource_id, text, locators)
+        recommended     = synthesizer.synthesize(node)
+        locators        = _build_rf_locators(resource_id, short_id, text, content_desc, cls,
+                                             recommended)
+        locator_matches = _count_locator_matches(locators, index)
+        locator_quality = _compute_locator_quality(resource_id, text, locators, locator_matches)
 
         # Fallback xpath par position pour EditText/Button sans identifiant
         if locator_quality == "missing":
@@ -297,38 +400,56 @@ def _extract_enriched_elements(node: ET.Element, depth: int = 0) -> list:
             elif "Button" in cls:
                 locators["by_xpath"] = f"xpath=//android.widget.Button"
                 locator_quality = "fragile"
+            if "by_xpath" in locators:
+                locator_matches.update(_count_locator_matches(
+                    {"by_xpath": locators["by_xpath"]}, index))
 
         elements.append({
-            "type":           elem_type,
-            "class":          cls,
-            "resource_id":    resource_id,
-            "short_id":       short_id,
-            "text":           text,
-            "content_desc":   content_desc,
-            "bounds":         bounds,
-            "clickable":      clickable,
-            "enabled":        enabled,
-            "depth":          depth,
-            "locators":       locators,
+            "type":            elem_type,
+            "class":           cls,
+            "resource_id":     resource_id,
+            "short_id":        short_id,
+            "text":            text,
+            "content_desc":    content_desc,
+            "bounds":          bounds,
+            "clickable":       clickable,
+            "enabled":         enabled,
+            "depth":           depth,
+            "locators":        locators,
+            "locator_matches": locator_matches,
+            "ambiguous":       bool(locator_matches) and not any(
+                m["unique"] for m in locator_matches.values()),
             "locator_quality": locator_quality,
+            "recommended_locator": recommended,
         })
 
     for child in node:
-        elements.extend(_extract_enriched_elements(child, depth + 1))
+        elements.extend(_extract_enriched_elements(child, depth + 1, synthesizer))
     return elements
 
 
+def _fragile_reason(element: dict) -> str:
+    """Explique pourquoi un élément est classé fragile (pour le prompt LLM)."""
+    if element.get("ambiguous"):
+        return "Aucun locator unique — plusieurs éléments correspondent à l'écran"
+    if element.get("resource_id") or element.get("content_desc"):
+        return "resource-id / accessibility id non unique à l'écran"
+    return "Basé sur le texte visible — sensible aux traductions"
+
+
 def _compute_locator_stats(elements: list) -> dict:
     """Calcule les statistiques de couverture des locators."""
     robust  = sum(1 for e in elements if e.get("locator_quality") == "robust")
     fragile = sum(1 for e in elements if e.get("locator_quality") == "fragile")
     missing = sum(1 for e in elements if e.get("locator_quality") == "missing")
+    ambiguous = sum(1 for e in elements if e.get("ambiguous"))
     total   = len(elements)
     covered = robust + fragile
     return {
         "robust":           robust,
         "fragile":          fragile,
         "missing":          missing,
+        "ambiguous":        ambiguous,
         "coverage_percent": round(covered / total * 100, 1) if total > 0 else 0.0,
     }
 
@@ -467,21 +588,6 @@ def _build_locator_suggestions(element: dict) -> list[str]:
     return suggestions or ["Aucune suggestion disponible"]
 
 
-def _parse_robot_output(stdout: str) -> dict:
-    """Parse la sortie de Robot Framework pour extraire les statistiques pass/fail."""
-    stats = {"passed": 0, "failed": 0, "skipped": 0, "total": 0}
-    if not stdout:
-        return stats
-    match = re.search(r"(\d+) tests?,\s*(\d+) passed,\s*(\d+) failed", stdout, re.IGNORECASE)
-    if match:
-        stats.update(
-            total=int(match.group(1)),
-            passed=int(match.group(2)),
-            failed=int(match.group(3)),
-        )
-    return stats
-
-
 def _parse_ui_node(node: ET.Element, depth: int = 0) -> dict:
     """Parse récursivement un nœud XML → dict structuré (pour get_ui_hierarchy)."""
     attrib = node.attrib
@@ -557,6 +663,121 @@ def get_page_source() -> dict[str, Any]:
     }
 
 
+# Correspondance stratégie → (by Appium, valeur) pour les requêtes device
+_APPIUM_BY = {
+    "resource_id":  "id",
+    "text":         "xpath",
+    "content_desc": "accessibility id",
+    "class_name":   "class name",
+    "xpath":        "xpath",
+}
+
+
+def _build_strategies(resource_id: Optional[str], text: Optional[str],
+                      content_desc: Optional[str], class_name: Optional[str],
+                      xpath: Optional[str]) -> list[tuple[str, str]]:
+    """Liste ordonnée (stratégie, valeur) ; le resource-id court est préfixé du package."""
+    strategies = []
+    if resource_id:
+        rid = resource_id if ":" in resource_id else f"{APP_PACKAGE}:id/{resource_id}"
+        strategies.append(("resource_id", rid))
+    if text:
+        strategies.append(("text", text))
+    if content_desc:
+        strategies.append(("content_desc", content_desc))
+    if class_name:
+        strategies.append(("class_name", class_name))
+    if xpath:
+        strategies.append(("xpath", xpath))
+    return strategies
+
+
+def _appium_locator(strategy: str, value: str) -> tuple[str, str]:
+    """Traduit une stratégie en locator Appium (by, value)."""
+    if strategy == "text":
+        return _APPIUM_BY["text"], f"//*[@text='{value}']"
+    return _APPIUM_BY[strategy], value
+
+
+def _resolve_in_snapshot(snapshot, strategies: list, results: dict) -> None:
+    """Résout les stratégies en cascade contre le snapshot (aucun appel device)."""
+    for strategy_name, value in strategies:
+        results["tried_strategies"].append(strategy_name)
+        try:
+            matches = snapshot.find_all(strategy_name, value)
+        except ValueError as e:
+            results.setdefault("strategy_errors", {})[strategy_name] = str(e)
+            continue
+        if matches:
+            results.update(found=True, strategy_used=strategy_name,
+                           match_count=len(matches),
+                           element_details=element_details(matches[0]))
+            return
+
+
+def _race_strategies(fetch_source, strategies: list, results: dict, timeout: float) -> None:
+    """
+    Mode course : UNE boucle de polling rafraîchit le page source et évalue
+    toutes les stratégies sur chaque snapshot ; arrêt au premier snapshot
+    contenant un match (priorité à l'ordre des stratégies).
+    Pire cas : un seul `timeout` au lieu d'un timeout par stratégie.
+    """
+    timings = {name: {"evaluations": 0, "total_ms": 0.0, "hit_at_ms": None}
+               for name, _ in strategies}
+    active   = list(strategies)
+    started  = time.perf_counter()
+    deadline = started + timeout
+    polls    = 0
+    fetch_ms = 0.0
+    results["tried_strategies"] = [name for name, _ in strategies]
+
+    while active:
+        t0     = time.perf_counter()
+        source = fetch_source()
+        fetch_ms += (time.perf_counter() - t0) * 1000
+        polls    += 1
+
+        winner = None
+        try:
+            snapshot = get_snapshot(source)
+        except ET.ParseError:
+            snapshot = None
+
+        candidates = list(active) if snapshot is not None else []
+        for strategy_name, value in candidates:
+            t1 = time.perf_counter()
+            try:
+                matches = snapshot.find_all(strategy_name, value)
+            except ValueError as e:
+                results.setdefault("strategy_errors", {})[strategy_name] = str(e)
+                active.remove((strategy_name, value))
+                continue
+            finally:
+                timing = timings[strategy_name]
+                timing["evaluations"] += 1
+                timing["total_ms"]    += (time.perf_counter() - t1) * 1000
+            if matches:
+                if timing["hit_at_ms"] is None:
+                    timing["hit_at_ms"] = round((time.perf_counter() - started) * 1000, 2)
+                if winner is None:
+                    winner = (strategy_name, matches)
+
+        if winner:
+            strategy_name, matches = winner
+            results.update(found=True, strategy_used=strategy_name,
+                           match_count=len(matches),
+                           element_details=element_details(matches[0]))
+            break
+        if time.perf_counter() >= deadline:
+            break
+        time.sleep(min(RACE_POLL_INTERVAL, max(0.0, deadline - time.perf_counter())))
+
+    for timing in timings.values():
+        timing["avg_ms"]   = round(timing["total_ms"] / timing["evaluations"], 3) if timing["evaluations"] else None
+        timing["total_ms"] = round(timing["total_ms"], 3)
+    results.update(polls=polls, page_source_ms=round(fetch_ms, 2), strategy_timings=timings)
+
+
 @mcp.tool()
 def find_element_by_strategies(
     resource_id:  Optional[str] = None,
@@ -564,17 +785,31 @@ def find_element_by_strategies(
     content_desc: Optional[str] = None,
     class_name:   Optional[str] = None,
     xpath:        Optional[str] = None,
+    use_snapshot: bool          = True,
+    live_state:   bool          = False,
+    race:         bool          = False,
+    timeout:      Optional[float] = None,
 ) -> dict[str, Any]:
     """
     Cherche un élément UI avec plusieurs stratégies en cascade.
     Si une stratégie échoue, les suivantes sont tentées automatiquement.
 
+    Par défaut, toutes les stratégies sont résolues localement contre UN page
+    source capturé (snapshot lxml) : quelques millisecondes au lieu d'un
+    WebDriverWait de ELEMENT_TIMEOUT par stratégie manquée.
+
     Args:
         resource_id:  Ex: "com.example.mybiat:id/btn_login" ou simplement "btn_login"
         text:         Texte visible. Ex: "Se connecter"
         content_desc: Description d'accessibilité
         class_name:   Classe Android. Ex: "android.widget.Button"
         xpath:        XPath complet
+        use_snapshot: False → ancienne cascade WebDriverWait sur le device.
+        live_state:   Interroge le device pour enabled/displayed de l'élément trouvé.
+        race:         Mode course : toutes les stratégies évaluées à chaque
+                      rafraîchissement du page source jusqu'au premier match
+                      (+ temps par stratégie dans `strategy_timings`).
+        timeout:      Durée max du mode course en secondes (défaut ELEMENT_TIMEOUT).
 
     Returns:
         Quelle stratégie a réussi + attributs de l'élément trouvé.
@@ -583,104 +818,87 @@ def find_element_by_strategies(
         "success": False, "found": False,
         "strategy_used": None, "element_details": None,
         "tried_strategies": [], "simulation": False,
+        "resolution": "race" if race else ("snapshot" if use_snapshot else "device"),
     }
+    strategies = _build_strategies(resource_id, text, content_desc, class_name, xpath)
+    started    = time.perf_counter()
 
     if APPIUM_AVAILABLE:
         driver = _get_driver()
         if driver:
             try:
-                strategies = []
-                if resource_id:
-                    rid = resource_id if ":" in resource_id else f"{APP_PACKAGE}:id/{resource_id}"
-                    strategies.append(("resource_id", AppiumBy.ID, rid))
-                if text:
-                    strategies.append(("text", AppiumBy.XPATH, f"//*[@text='{text}']"))
-                if content_desc:
-                    strategies.append(("content_desc", AppiumBy.ACCESSIBILITY_ID, content_desc))
-                if class_name:
-                    strategies.append(("class_name", AppiumBy.CLASS_NAME, class_name))
-                if xpath:
-                    strategies.append(("xpath", AppiumBy.XPATH, xpath))
-
-                for strategy_name, by, value in strategies:
-                    results["tried_strategies"].append(strategy_name)
-                    try:
-                        element = WebDriverWait(driver, ELEMENT_TIMEOUT).until(
-                            EC.presence_of_element_located((by, value))
-                        )
-                        results.update(success=True, found=True, strategy_used=strategy_name,
-                                       element_details={
-                                           "resource_id":  element.get_attribute("resourceId"),
-                                           "text":         element.text,
-                                           "content_desc": element.get_attribute("contentDescription"),
-                                           "class":        element.get_attribute("className"),
-                                           "bounds":       element.get_attribute("bounds"),
-                                           "enabled":      element.is_enabled(),
-                                           "displayed":    element.is_displayed(),
-                                       })
-                        break
-                    except (NoSuchElementException, TimeoutException):
-                        continue
+                if race or use_snapshot:
+                    if race:
+                        _race_strategies(lambda: driver.page_source, strategies, results,
+                                         ELEMENT_TIMEOUT if timeout is None else timeout)
+                    else:
+                        _resolve_in_snapshot(get_snapshot(driver.page_source), strategies, results)
+                    if results["found"] and live_state:
+                        # Échec de la requête live : résultat du snapshot conservé,
+                        # erreur remontée (pas de repli sur la simulation)
+                        try:
+                            element = driver.find_element(
+                                *_appium_locator(results["strategy_used"],
+                                                 dict(strategies)[results["strategy_used"]])
+                            )
+                            results["element_details"].update(
+                                enabled=element.is_enabled(),
+                                displayed=element.is_displayed(),
+                            )
+                            results["live_state"] = True
+                        except Exception as e:
+                            results["live_state"]       = False
+                            results["live_state_error"] = str(e)
+                else:
+                    for strategy_name, value in strategies:
+                        results["tried_strategies"].append(strategy_name)
+                        try:
+                            element = WebDriverWait(driver, ELEMENT_TIMEOUT).until(
+                                EC.presence_of_element_located(_appium_locator(strategy_name, value))
+                            )
+                            results.update(found=True, strategy_used=strategy_name,
+                                           element_details={
+                                               "resource_id":  element.get_attribute("resourceId"),
+                                               "text":         element.text,
+                                               "content_desc": element.get_attribute("contentDescription"),
+                                               "class":        element.get_attribute("className"),
+                                               "bounds":       element.get_attribute("bounds"),
+                                               "enabled":      element.is_enabled(),
+                                               "displayed":    element.is_displayed(),
+                                           })
+                            break
+                        except (NoSuchElementException, TimeoutException):
+                            continue
 
                 driver.quit()
-                results["success"] = True
+                results["success"]   = True
+                results["lookup_ms"] = round((time.perf_counter() - started) * 1000, 2)
                 return results
             except Exception as e:
                 results["error"] = str(e)
+                results["tried_strategies"] = []
                 try: driver.quit()
                 except Exception: pass
 
     # ── Mode simulation ────────────────────────────────────────────────────
     results["simulation"] = True
     results["success"]    = True
-    try:
-        root = ET.fromstring(_get_mock_page_source())
-        for strategy_name, value in [
-            ("resource_id", resource_id), ("text", text),
-            ("content_desc", content_desc), ("class_name", class_name),
-        ]:
-            if not value:
-                continue
-            results["tried_strategies"].append(strategy_name)
-            found = _search_mock_xml(root, strategy_name, value)
-            if found:
-                results.update(found=True, strategy_used=strategy_name, element_details={
-                    "resource_id":  found.get("resource-id", ""),
-                    "text":         found.get("text", ""),
-                    "content_desc": found.get("content-desc", ""),
-                    "class":        found.get("class", ""),
-                    "bounds":       found.get("bounds", ""),
-                    "enabled":      found.get("enabled", "true") == "true",
-                    "displayed":    True,
-                })
-                break
-    except ET.ParseError:
-        pass
+    if race:
+        # Page source simulé statique : un seul polling suffit
+        _race_strategies(_get_mock_page_source, strategies, results, 0)
+    else:
+        results["resolution"] = "snapshot"
+        try:
+            _resolve_in_snapshot(get_snapshot(_get_mock_page_source()), strategies, results)
+        except ET.ParseError:
+            pass
+    if live_state:
+        results["live_state"]       = False
+        results["live_state_error"] = results.get("error") or "Aucune session Appium — état live indisponible"
+    results["lookup_ms"] = round((time.perf_counter() - started) * 1000, 2)
     return results
 
 
-def _search_mock_xml(node: ET.Element, strategy: str, value: str) -> Optional[dict]:
-    """Recherche récursive dans l'XML simulé."""
-    attrib = node.attrib
-    match  = False
-    if strategy == "resource_id":
-        rid   = attrib.get("resource-id", "")
-        match = value in rid or rid.endswith(value)
-    elif strategy == "text":
-        match = attrib.get("text", "") == value
-    elif strategy == "content_desc":
-        match = attrib.get("content-desc", "") == value
-    elif strategy == "class_name":
-        match = attrib.get("class", "") == value
-    if match:
-        return attrib
-    for child in node:
-        result = _search_mock_xml(child, strategy, value)
-        if result:
-            return result
-    return None
-
-
 @mcp.tool()
 def suggest_alternative_locators(
     broken_locator_id: str,
@@ -793,26 +1011,69 @@ def take_screenshot(save_path: Optional[str] = None) -> dict[str, Any]:
 
 @mcp.tool()
 def execute_robot_test(
-    test_file:  str,
-    test_tags:  Optional[str] = None,
-    test_name:  Optional[str] = None,
-    output_dir: str           = "results",
+    test_file:    str,
+    test_tags:    Optional[str] = None,
+    test_name:    Optional[str] = None,
+    output_dir:   str           = "results",
+    timeout:      int           = robot_jobs.DEFAULT_JOB_TIMEOUT,
+    wait_seconds: float         = 0,
+    impacted_by:  Optional[list[str]] = None,
+    rerun_failed: Optional[str] = None,
+    prioritize:   bool          = False,
 ) -> dict[str, Any]:
     """
-    Lance l'exécution d'un fichier de test Robot Framework.
+    Lance un fichier de test Robot Framework en arrière-plan et retourne un job_id.
+
+    L'appel rend la main immédiatement : suivre l'exécution avec
+    get_robot_job_status(job_id) et l'interrompre avec cancel_robot_job(job_id).
+    Les tests en quarantaine (classify_failures) s'exécutent, mais leurs
+    échecs sont comptés SKIP et ne bloquent pas le run.
 
     Args:
-        test_file:  Chemin du fichier .robot
-        test_tags:  Tags à inclure (ex: "login", "smoke")
-        test_name:  Nom exact d'un test à exécuter
-        output_dir: Répertoire pour les rapports Allure/RF
+        test_file:    Chemin du fichier .robot (ou dossier de suites)
+        test_tags:    Tags à inclure (ex: "login", "smoke")
+        test_name:    Nom exact d'un test à exécuter
+        output_dir:   Répertoire des rapports (un sous-dossier par job)
+        timeout:      Durée maximale du job en secondes (arbre de processus tué au-delà)
+        wait_seconds: Attente optionnelle de la fin du job avant de répondre
+        impacted_by:  Locators (`HOME_SEARCH_BAR`, `btn_login`) ou fichiers .robot
+                      modifiés : seuls les tests de test_file qui en dépendent sont lancés
+        rerun_failed: job_id ou output.xml d'une exécution précédente : seuls ses tests
+                      en échec sont relancés puis fusionnés avec elle (tentatives par test)
+        prioritize:   Exécuter d'abord les tests les plus susceptibles d'échouer
+                      (historique, locators modifiés, durée) — premier échec au plus tôt
 
     Returns:
-        Statistiques pass/fail + chemin des rapports.
+        job_id + statut courant (statistiques pass/fail si déjà terminé).
     """
     project_root = Path(__file__).resolve().parent.parent
     full_path    = None
 
+    args = [
+        "--nostatusrc",
+        "--log",    "log.html",
+        "--report", "report.html",
+        "--output", "output.xml",
+    ]
+    if test_tags:
+        args += ["--include", test_tags]
+
+    if rerun_failed:
+        previous = rerun_failed
+        if not re.fullmatch(r"[\w-]+", previous) and not Path(previous).is_absolute():
+            previous = str(project_root / previous)
+        failure, device_args, leased = _preflight_robot()
+        if failure:
+            return failure
+        args += device_args
+        status = robot_jobs.start_rerun_job(previous, project_root / output_dir, args,
+                                            timeout=timeout, cwd=project_root,
+                                            lease_owner=f"rerun:{previous}" if leased else None,
+                                            job_args=_job_args())
+        if wait_seconds > 0 and status.get("job_id"):
+            return robot_jobs.wait_job(status["job_id"], wait_seconds)
+        return status
+
     for candidate in [
         Path(test_file),
         project_root / test_file,
@@ -825,47 +1086,477 @@ def execute_robot_test(
     if not full_path:
         return {"success": False, "error": f"Fichier introuvable: {test_file}"}
 
-    output_path = project_root / output_dir
-    output_path.mkdir(parents=True, exist_ok=True)
-
-    cmd = [
-        "python", "-m", "robot",
-        "--outputdir", str(output_path),
-        "--nostatusrc",
-        "--log",    "log.html",
-        "--report", "report.html",
-        "--output", "output.xml",
-    ]
-    if test_tags:
-        cmd += ["--include", test_tags]
     if test_name:
-        cmd += ["--test", test_name]
-    cmd.append(str(full_path))
+        args += ["--test", test_name]
+
+    impacted = None
+    if impacted_by:
+        impacted = _select_impacted([full_path], impacted_by)
+        if not impacted:
+            # Rien n'a tourné : ni succès ni échec (all_passed None)
+            return {"success": True, "done": True, "status": "nothing_to_run", "nothing_to_run": True,
+                    "total": 0, "passed": 0, "failed": 0, "skipped": 0, "all_passed": None,
+                    "impacted_tests": [], "message": "Aucun test impacté par ces changements"}
+
+    failure, device_args, leased = _preflight_robot()
+    if failure:
+        return failure
+    args += device_args
+
+    plan = robot_priority.prioritize([full_path]) if prioritize else None
+
+    if impacted:
+        args += robot_selection_args(impacted)
+    else:
+        args.append(str(full_path))
 
     try:
-        proc  = subprocess.run(cmd, capture_output=True, text=True, timeout=300)
-        stats = _parse_robot_output(proc.stdout)
-        return {
-            "success":     True,
-            "returncode":  proc.returncode,
-            "passed":      stats["passed"],
-            "failed":      stats["failed"],
-            "skipped":     stats["skipped"],
-            "total":       stats["total"],
-            "all_passed":  stats["failed"] == 0 and stats["total"] > 0,
-            "output_dir":  str(output_path),
-            "log_file":    str(output_path / "log.html"),
-            "report_file": str(output_path / "report.html"),
-            "stdout_tail": proc.stdout[-2000:] if proc.stdout else "",
-            "stderr_tail": proc.stderr[-1000:] if proc.stderr else "",
-        }
-    except subprocess.TimeoutExpired:
-        return {"success": False, "error": "Timeout : test dépassé 5 minutes"}
+        job = robot_jobs.start_job(args, project_root / output_dir, timeout=timeout,
+                                   cwd=project_root, label=full_path.name,
+                                   lease_owner=full_path.name if leased else None,
+                                   job_args=_job_args(plan))
     except FileNotFoundError:
         return {"success": False, "error": "Robot Framework non trouvé (pip install robotframework)"}
     except Exception as e:
         return {"success": False, "error": str(e)}
 
+    if wait_seconds > 0:
+        status = robot_jobs.wait_job(job["job_id"], wait_seconds)
+    else:
+        status = robot_jobs.job_status(job["job_id"])
+    if impacted is not None:
+        status["impacted_tests"] = impacted
+    if plan is not None:
+        status["priority"] = [{k: t[k] for k in ("name", "failure_prob", "locator_changed", "score")}
+                              for t in plan[:5]]
+    return status
+
+
+def _job_args(plan: Optional[list[dict]] = None) -> Callable[[Path], list[str]]:
+    """
+    Arguments robot écrits dans le dossier du job : tests en quarantaine
+    (tag + --skiponfailure) et ordre fail-fast (`plan`).
+    """
+    def build(job_dir: Path) -> list[str]:
+        store = history_store.HistoryStore()
+        try:
+            args = quarantine_args(store, job_dir)
+        finally:
+            store.close()
+        return args + (robot_priority.prerun_args(plan, job_dir) if plan else [])
+    return build
+
+
+def _preflight_robot() -> tuple[Optional[dict], list[str], bool]:
+    """
+    Capabilities validées avant que les suites n'ouvrent leur session ; avec
+    un registre de devices, le job attend un device loué (device_leases).
+    Retourne (erreur à renvoyer ou None, arguments `--variable`, sous bail).
+    Sans adb (Appium distant), les capabilities configurées sont gardées.
+    """
+    check = device_discovery.preflight(ANDROID_DEVICE_NAME, ANDROID_PLATFORM_VERSION)
+    if not check["ok"]:
+        return {"success": False, "error": f"Preflight : {check['error']}", "preflight": check}, [], False
+    if device_leases.registry():
+        return None, [], True
+    return None, device_discovery.robot_variables(check), False
+
+
+def _select_impacted(paths: list, changes: list[str]) -> list[dict]:
+    """Tests sous `paths` impactés par des locators ou des fichiers .robot modifiés."""
+    project_root = Path(__file__).resolve().parent.parent
+    locators, files = [], []
+    for change in changes:
+        candidates = [Path(change), project_root / change]
+        existing   = [c for c in candidates if c.suffix in (".robot", ".resource") and c.is_file()]
+        if existing:
+            files.append(existing[0])
+        else:
+            locators.append(change)
+    return ImpactIndex(paths).impacted_tests(changed_locators=locators, changed_files=files)
+
+
+@mcp.tool()
+def get_test_priorities(paths: Optional[list[str]] = None, top: int = 20) -> dict[str, Any]:
+    """
+    Ordre d'exécution fail-fast : tests triés par échecs attendus par seconde
+    (probabilité d'échec récente, locators modifiés depuis le dernier PASS, durée).
+    C'est l'ordre appliqué par execute_robot_test(prioritize=True). Aperçu en
+    lecture seule : l'instantané des locators n'est pas mis à jour.
+
+    Args:
+        paths: Dossiers ou fichiers .robot (défaut : tests/suites + agents/tests/suites)
+        top:   Nombre de tests retournés
+    """
+    project_root = Path(__file__).resolve().parent.parent
+    candidates   = paths or [f"{TESTS_DIR}/suites", "agents/tests/suites"]
+    resolved     = [p for c in candidates for p in (Path(c), project_root / c) if p.exists()]
+    if not resolved:
+        return {"success": False, "error": f"Aucune suite trouvée : {candidates}"}
+
+    plan = robot_priority.prioritize(resolved, persist=False)
+    return {"success": True, "count": len(plan), "tests": plan[:top],
+            "locator_changes": sum(1 for t in plan if t["locator_changed"])}
+
+
+@mcp.tool()
+def select_impacted_tests(
+    changed:  list[str],
+    paths:    Optional[list[str]] = None,
+) -> dict[str, Any]:
+    """
+    Tests impactés par un changement, via l'index variable → keywords → tests
+    construit en parsant les fichiers .robot / .resource.
+
+    Args:
+        changed: Locators (nom de variable `HOME_SEARCH_BAR` / `${HOME_SEARCH_BAR}`
+                 ou fragment de valeur `btn_login`) et/ou fichiers .robot modifiés
+        paths:   Dossiers de suites (défaut : tests/suites + agents/tests/suites)
+
+    Returns:
+        Tests impactés (fichier, nom, ligne, chaîne de dépendance) ; les passer
+        à execute_robot_test(impacted_by=...) pour n'exécuter qu'eux.
+    """
+    project_root = Path(__file__).resolve().parent.parent
+    candidates   = paths or [f"{TESTS_DIR}/suites", "agents/tests/suites"]
+    resolved     = [p for c in candidates for p in (Path(c), project_root / c) if p.exists()]
+    if not resolved:
+        return {"success": False, "error": f"Aucune suite trouvée : {candidates}"}
+
+    impacted = _select_impacted(resolved, changed)
+    return {
+        "success":  True,
+        "count":    len(impacted),
+        "files":    sorted({t["file"] for t in impacted}),
+        "tests":    impacted,
+    }
+
+
+@mcp.tool()
+def get_robot_job_status(job_id: str, include_console: bool = False) -> dict[str, Any]:
+    """
+    Statut d'un job Robot lancé par execute_robot_test.
+
+    Retourne le statut (running / passed / failed / cancelled / timeout / error),
+    les tests déjà terminés avec leur message d'échec, les statistiques
+    (partielles tant que le job tourne) et les chemins des rapports.
+    Une fois le job terminé, les résultats viennent de output.xml : durée,
+    tags, keywords de premier niveau et keyword en échec de chaque test.
+
+    Args:
+        job_id:          Identifiant retourné par execute_robot_test
+        include_console: Inclure la sortie console complète
+    """
+    return robot_jobs.job_status(job_id, include_console=include_console)
+
+
+@mcp.tool()
+async def watch_robot_job(
+    job_id:            str,
+    ctx:               Context,
+    max_wait:          float = 25,
+    return_on_failure: bool  = False,
+    since:             int   = 0,
+) -> dict[str, Any]:
+    """
+    Suit un job Robot et diffuse chaque début/fin de test au client MCP sous
+    forme de notifications de progression (progress = tests terminés / total).
+
+    Rend la main quand le job se termine, après `max_wait` secondes (rappeler
+    l'outil avec `since=events_offset` pour continuer), ou dès le premier échec
+    si `return_on_failure` — le reste de la suite continue de tourner pendant
+    que l'agent réagit.
+
+    Args:
+        job_id:            Identifiant retourné par execute_robot_test
+        max_wait:          Durée maximale de l'appel en secondes
+        return_on_failure: Rendre la main au premier test en échec
+        since:             Offset retourné par l'appel précédent (événements déjà vus)
+    """
+    status = robot_jobs.job_status(job_id)
+    if not status.get("success"):
+        return status
+
+    loop, offset  = asyncio.get_running_loop(), since
+    deadline      = loop.time() + max_wait
+    first_failure = None
+    while True:
+        events, offset = robot_jobs.read_events(job_id, offset)
+        for event in events:
+            if event["event"] == "start_test":
+                await ctx.report_progress(event["done"], event["total"],
+                                          f"▶ {event['longname']}")
+            elif event["event"] == "end_test":
+                await ctx.report_progress(
+                    event["done"], event["total"],
+                    f"{event['status']} {event['longname']} ({event['elapsed_s']}s)"
+                    + (f" — {event['message'][:200]}" if event["message"] else ""))
+                if event["status"] == "FAIL" and first_failure is None:
+                    first_failure = {k: event[k] for k in
+                                     ("name", "longname", "message", "elapsed_s")}
+
+        status = robot_jobs.job_status(job_id)
+        if (status["done"] or loop.time() >= deadline
+                or (return_on_failure and first_failure)):
+            break
+        await asyncio.sleep(0.5)
+
+    return {**status, "first_failure": first_failure, "events_offset": offset}
+
+
+@mcp.tool()
+def cancel_robot_job(job_id: str) -> dict[str, Any]:
+    """
+    Annule un job Robot en cours : robot et tous ses sous-processus sont arrêtés.
+
+    Args:
+        job_id: Identifiant retourné par execute_robot_test
+    """
+    return robot_jobs.cancel_job(job_id)
+
+
+@mcp.tool()
+def list_robot_jobs(limit: int = 20) -> dict[str, Any]:
+    """Liste les derniers jobs Robot (plus récent d'abord) avec leur statut."""
+    jobs = robot_jobs.list_jobs(limit)
+    return {"success": True, "count": len(jobs), "jobs": jobs}
+
+
+@mcp.tool()
+def get_robot_results(
+    output_xml:    str,
+    keyword_depth: int  = 1,
+    failed_only:   bool = False,
+) -> dict[str, Any]:
+    """
+    Résultats structurés d'un output.xml Robot Framework, lu en flux
+    (mémoire constante, adapté aux rapports de plusieurs centaines de Mo).
+
+    Args:
+        output_xml:    Chemin du fichier output.xml
+        keyword_depth: Niveaux de keywords conservés sous chaque test
+        failed_only:   Ne retourner que les tests non PASS (stats complètes)
+
+    Returns:
+        stats pass/fail/skip, arbre des suites, tests avec durées, tags,
+        keywords et keyword en échec, erreurs d'exécution.
+    """
+    path = Path(output_xml)
+    if not path.is_absolute():
+        path = Path(__file__).resolve().parent.parent / path
+    if not path.exists():
+        return {"success": False, "error": f"Fichier introuvable: {output_xml}"}
+    try:
+        results = parse_output_xml(path, keyword_depth=keyword_depth, failed_only=failed_only)
+    except ET.ParseError as e:
+        return {"success": False, "error": f"output.xml invalide ou incomplet: {e}"}
+    return {"success": True, "output_xml": str(path), **results}
+
+
+@mcp.tool()
+def get_keyword_profile(
+    job_id:  Optional[str] = None,
+    profile: Optional[str] = None,
+    by:      str           = "keyword",
+    top:     int           = 20,
+) -> dict[str, Any]:
+    """
+    Où passe le temps d'une suite : keywords triés par temps propre (hors
+    sous-keywords) ou locators triés par temps total, d'après le profil écrit
+    par robot_timing_listener pendant un job.
+
+    Args:
+        job_id:  Job Robot profilé (execute_robot_test)
+        profile: Ou chemin direct d'un keyword_profile.json
+        by:      "keyword" ou "locator"
+        top:     Nombre de lignes retournées
+
+    Returns:
+        Points chauds + chemin du fichier .folded (flamegraph.pl, speedscope).
+    """
+    if by not in ("keyword", "locator"):
+        return {"success": False, "error": f"Regroupement inconnu: {by} (keyword, locator)"}
+    if job_id:
+        status = robot_jobs.job_status(job_id)
+        if not status.get("success"):
+            return status
+        profile = status.get("keyword_profile")
+        if not profile:
+            return {"success": False, "error": f"Aucun profil pour le job {job_id} "
+                                               f"(job en cours ou ROBOT_KEYWORD_PROFILE=false)"}
+    if not profile or not Path(profile).exists():
+        return {"success": False, "error": f"Profil introuvable: {profile}"}
+
+    data = json.loads(Path(profile).read_text(encoding="utf-8"))
+    return {"success": True, "profile": str(profile), "by": by,
+            "wall_s": data["wall_s"], "keyword_s": data["keyword_s"],
+            "hotspots": robot_timing_listener.hotspots(profile, by=by, top=top),
+            "folded": data["folded"]}
+
+
+@mcp.tool()
+def query_test_history(
+    query:      str            = "summary",
+    test:       Optional[str]  = None,
+    phase:      Optional[str]  = None,
+    since_days: Optional[float] = None,
+    limit:      int            = 50,
+) -> dict[str, Any]:
+    """
+    Interroge l'historique des exécutions (base SQLite indexée). Les nouveaux
+    résultats Allure (*-result.json / *-container.json) et Robot (output.xml)
+    sont chargés au préalable ; les fichiers déjà chargés sont ignorés.
+
+    Args:
+        query:      "trend" (durées d'un test), "failures" ou "summary" (par test)
+        test:       Code (`TC-MENU-03`) ou nom du test — requis pour "trend"
+        phase:      Filtre "failures" : "setup", "test" ou "teardown"
+        since_days: Filtre "failures" : seulement les N derniers jours
+        limit:      Nombre maximum de lignes retournées
+    """
+    if query not in ("trend", "failures", "summary"):
+        return {"success": False, "error": f"Requête inconnue: {query} (trend, failures, summary)"}
+    if query == "trend" and not test:
+        return {"success": False, "error": "Paramètre 'test' requis pour 'trend'"}
+
+    store = history_store.HistoryStore()
+    try:
+        ingested = store.ingest()
+        t0 = time.perf_counter()
+        if query == "trend":
+            rows = store.duration_trend(test, limit=limit)
+        elif query == "failures":
+            since = time.time() - since_days * 86400 if since_days else None
+            rows  = store.failures(phase=phase, since=since, test=test, limit=limit)
+        else:
+            rows = store.summary()[:limit]
+    finally:
+        store.close()
+    return {"success": True, "query": query, "count": len(rows), "rows": rows,
+            "ingested": ingested, "query_ms": round((time.perf_counter() - t0) * 1000, 2)}
+
+
+@mcp.tool()
+def classify_failures(
+    job_id:     Optional[str]       = None,
+    tests:      Optional[list[str]] = None,
+    since_days: Optional[float]     = None,
+    apply:      bool                = True,
+) -> dict[str, Any]:
+    """
+    Classe les échecs en flaky, infrastructure ou réels d'après l'historique
+    (taux de bascule PASS/FAIL, signatures des messages d'échec).
+    Seuls les échecs réels justifient un self-healing ou une régénération :
+    les autres sont rejoués (`retry`) ou mis en quarantaine (`quarantine`).
+
+    Args:
+        job_id:     Job Robot dont on classe les échecs (et les tests passés au rejeu)
+        tests:      Codes / noms de tests (leur dernier échec connu)
+        since_days: Sans job ni tests : derniers échecs des N derniers jours
+        apply:      Mettre à jour la quarantaine selon les verdicts (et libérer
+                    les tests redevenus stables, `released`)
+    """
+    store = history_store.HistoryStore()
+    try:
+        if job_id:
+            status = robot_jobs.job_status(job_id)
+            if not status.get("success"):
+                return status
+            store.ingest([*history_store.DEFAULT_SOURCES, status["output_dir"]])
+            classifier, verdicts = FailureClassifier(store), []
+            for test in status.get("tests", []):
+                passed_on_retry = test.get("status") == "PASS" and test.get("attempts", 1) > 1
+                if test.get("status") == "FAIL" or passed_on_retry:
+                    verdict = classifier.classify(test["name"], test.get("message", ""),
+                                                  passed_on_retry=passed_on_retry, apply=apply)
+                    verdicts.append({"test": test.get("longname", test["name"]), **verdict})
+        else:
+            store.ingest()
+            classifier = FailureClassifier(store)
+            if tests:
+                verdicts = [classifier.classify(t, apply=apply) for t in tests]
+            else:
+                since    = time.time() - since_days * 86400 if since_days else None
+                verdicts = classifier.classify_latest(since, apply=apply)
+        released    = classifier.release_recovered() if apply else []
+        quarantined = store.quarantined()
+    finally:
+        store.close()
+
+    by_category = {c: sum(v["category"] == c for v in verdicts)
+                   for c in ("real", "flaky", "infrastructure")}
+    return {"success": True, "count": len(verdicts), "by_category": by_category,
+            "needs_healing": [v["test_id"] for v in verdicts if v["action"] == "heal"],
+            "verdicts": verdicts, "quarantined": quarantined, "released": released}
+
+
+@mcp.tool()
+def execute_robot_sharded(
+    paths:      Optional[list[str]]  = None,
+    devices:    Optional[list[dict]] = None,
+    workers:    Optional[int]        = None,
+    split:      str                  = "suites",
+    test_tags:  Optional[str]        = None,
+    output_dir: str                  = "results",
+    timeout:    int                  = robot_jobs.DEFAULT_JOB_TIMEOUT,
+) -> dict[str, Any]:
+    """
+    Lance la régression en parallèle : suites (ou tests) réparties en shards
+    équilibrés par durée historique, un shard par device / endpoint Appium.
+
+    Args:
+        paths:      Dossiers ou fichiers .robot (défaut : tests/suites + agents/tests/suites)
+        devices:    [{"appium_url": "http://127.0.0.1:4723", "device_name": "emulator-5554"}, ...]
+                    (défaut : variable ROBOT_DEVICES) ; devices du registre device_leases
+                    loués shard par shard (udid + systemPort distincts)
+        workers:    Nombre de shards si aucun device n'est fourni (shards sous bail
+                    device_leases ; sans registre, un seul shard)
+        split:      "suites" (un fichier = une unité) ou "tests" (un test = une unité)
+        test_tags:  Tags à inclure (ex: "smoke")
+        output_dir: Répertoire des rapports (un sous-dossier par run)
+        timeout:    Durée maximale de chaque shard en secondes
+
+    Returns:
+        run_id + plan des shards ; suivre avec get_sharded_run_status(run_id).
+    """
+    if split not in ("suites", "tests"):
+        return {"success": False, "error": f"split invalide : {split} (suites | tests)"}
+
+    project_root = Path(__file__).resolve().parent.parent
+    candidates   = paths or [f"{TESTS_DIR}/suites", "agents/tests/suites"]
+    resolved     = [p for c in candidates for p in (Path(c), project_root / c) if p.exists()]
+    if not resolved:
+        return {"success": False, "error": f"Aucune suite trouvée : {candidates}"}
+
+    robot_args = ["--include", test_tags] if test_tags else []
+    devices    = device_discovery.annotate_devices(device_leases.parse_devices(devices))
+    try:
+        return robot_shards.start_sharded_run(
+            list(dict.fromkeys(p.resolve() for p in resolved)), devices,
+            project_root / output_dir, workers=workers, split=split,
+            robot_args=robot_args, timeout=timeout, job_args=_job_args(),
+        )
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+
+@mcp.tool()
+def get_sharded_run_status(run_id: str) -> dict[str, Any]:
+    """
+    Statut agrégé d'un run parallèle. À la fin de tous les shards, les
+    output.xml sont fusionnés (rebot) et l'historique des durées est mis à jour.
+
+    Args:
+        run_id: Identifiant retourné par execute_robot_sharded
+    """
+    return robot_shards.sharded_run_status(run_id)
+
+
+@mcp.tool()
+def cancel_sharded_run(run_id: str) -> dict[str, Any]:
+    """Annule tous les shards encore en cours d'un run parallèle."""
+    return robot_shards.cancel_sharded_run(run_id)
+
 
 @mcp.tool()
 def analyze_current_screen(include_screenshot: bool = True) -> dict[str, Any]:
@@ -942,6 +1633,8 @@ def analyze_current_screen(include_screenshot: bool = True) -> dict[str, Any]:
                 "enabled":         e["enabled"],
                 "locator_quality": e["locator_quality"],
                 "locators":        e["locators"],
+                "locator_matches": e["locator_matches"],
+                "recommended_locator": e["recommended_locator"],
             }
             for e in interactive
         ],
@@ -954,7 +1647,8 @@ def analyze_current_screen(include_screenshot: bool = True) -> dict[str, Any]:
                 "type":     e["type"],
                 "text":     e["text"],
                 "locators": e["locators"],
-                "reason":   "Basé sur le texte visible — sensible aux traductions",
+                "locator_matches": e["locator_matches"],
+                "reason":   _fragile_reason(e),
             }
             for e in elements if e["locator_quality"] == "fragile"
         ],
@@ -985,6 +1679,169 @@ def analyze_current_screen(include_screenshot: bool = True) -> dict[str, Any]:
     return result
 
 
+@mcp.tool()
+def profile_robot_locators(
+    resources:        str           = "tests/resources",
+    iterations:       int           = 5,
+    page_source_file: Optional[str] = None,
+    live:             bool          = False,
+    top:              int           = 20,
+) -> dict[str, Any]:
+    """
+    Profile la latence de résolution de chaque locator `${...}` des ressources Robot.
+
+    Chaque locator est résolu `iterations` fois ; le rapport est trié du plus
+    lent au plus rapide (p95) avec le nombre de matchs et un remplacement
+    unique plus rapide quand il existe. Un remplacement positionnel
+    (`suggestion_positional`, `instance(n)`) est un dernier recours : il n'est
+    jamais proposé à la place d'un XPath ancré (id, description, texte).
+
+    Args:
+        resources:        Fichier ou dossier .robot (relatif à la racine du projet)
+        iterations:       Nombre de résolutions par locator
+        page_source_file: Page source XML enregistré servant de stand-in WebDriver
+        live:             Mesurer sur la session Appium réelle (find_elements)
+        top:              Nombre de locators retournés dans le classement
+    """
+    project_root = Path(__file__).resolve().parent.parent
+    paths = [p for p in (Path(resources), project_root / resources) if p.exists()][:1]
+    if not paths:
+        return {"success": False, "error": f"Ressources introuvables: {resources}"}
+
+    driver  = _get_driver() if live else None
+    backend = "appium" if driver else "snapshot"
+    try:
+        if driver:
+            driver.implicitly_wait(0)
+        else:
+            if page_source_file:
+                source = Path(page_source_file).read_text(encoding="utf-8")
+            else:
+                source, simulation = _fetch_page_source()
+                backend = "simulation" if simulation else backend
+            driver = SnapshotDriver(source)
+        report = profile_resources(driver, paths, iterations)
+    except (OSError, ET.ParseError) as e:
+        return {"success": False, "error": str(e)}
+    finally:
+        if backend == "appium":
+            try: driver.quit()
+            except Exception: pass
+
+    report["locators"] = report["locators"][:top]
+    return {"success": True, "backend": backend, **report}
+
+
+@mcp.tool()
+def lint_robot_suites(
+    paths: Optional[list[str]] = None,
+    fix:   bool                = False,
+    top:   int                 = 50,
+) -> dict[str, Any]:
+    """
+    Analyse statique des fichiers .robot : Sleep fixes, session Appium par test,
+    vérifications de visibilité redondantes, XPath `//*`, captures d'écran à
+    chaque teardown. Chaque constat a un coût estimé par exécution.
+
+    Args:
+        paths: Fichiers ou dossiers (relatifs à la racine du projet) ;
+               par défaut tests/resources, tests/suites et agents/tests/suites
+        fix:   Réécrire les fichiers avec les corrections automatiques
+        top:   Nombre de constats retournés (les plus coûteux d'abord)
+    """
+    project_root = Path(__file__).resolve().parent.parent
+    paths = paths or ["tests/resources", "tests/suites", "agents/tests/suites"]
+    resolved = [p for p in (project_root / path for path in paths) if p.exists()]
+    if not resolved:
+        return {"success": False, "error": f"Aucun fichier Robot trouvé : {paths}"}
+
+    report = robot_lint.lint_paths(resolved, fix=fix)
+    for finding in report["findings"]:
+        finding["path"] = Path(os.path.relpath(finding["path"], project_root)).as_posix()
+    report["findings"] = sorted(report["findings"], key=lambda f: f["cost_s"], reverse=True)[:top]
+    return {"success": True, **report}
+
+
+@mcp.tool()
+def rewrite_xpath_locators(
+    variables: str                 = "tests/resources/AppVariables.robot",
+    snapshots: Optional[list[str]] = None,
+    write:     bool                = False,
+) -> dict[str, Any]:
+    """
+    Remplace les locators XPath d'un fichier de variables Robot par l'alternative
+    native la moins coûteuse (id, accessibility id, UiSelector, instance(n)),
+    uniquement si elle désigne le même élément sur tous les snapshots.
+
+    Args:
+        variables: Fichier de variables Robot (relatif à la racine du projet)
+        snapshots: Page sources XML enregistrés (fichiers ou dossiers) ;
+                   par défaut results/ui_snapshots, complété par l'écran courant
+        write:     Réécrire le fichier de variables avec les locators vérifiés
+
+    Returns:
+        Une ligne par variable XPath : `original` (valeur du fichier), `locator`
+        et `replacement` (remplacement vérifié, échappé Robot), `status`.
+    """
+    project_root = Path(__file__).resolve().parent.parent
+    path = project_root / variables
+    if not path.exists():
+        return {"success": False, "error": f"Fichier introuvable : {variables}"}
+
+    simulation = False
+    if not snapshots:
+        page_source, simulation = _fetch_page_source()
+        if not simulation:
+            locator_rewriter.record_snapshot(page_source)
+        snapshots = [str(locator_rewriter.SNAPSHOT_DIR)]
+    loaded = locator_rewriter.load_snapshots(
+        p if Path(p).is_absolute() else project_root / p for p in snapshots)
+    if not loaded:
+        return {"success": False, "error": "Aucun snapshot XML disponible", "simulation": simulation}
+
+    report = locator_rewriter.rewrite_variables(path, loaded, write=write)
+    report["file"] = Path(os.path.relpath(report["file"], project_root)).as_posix()
+    return {"success": True, "simulation": simulation, **report}
+
+
+@mcp.tool()
+def discover_devices(refresh: bool = False) -> dict[str, Any]:
+    """
+    Devices Android connectés (adb, mis en cache) et preflight des capabilities
+    configurées : version Android et deviceName corrigés d'après le device réel.
+    Les sessions du serveur et execute_robot_test utilisent ces capabilities.
+
+    Args:
+        refresh: Ignorer le cache et interroger adb
+    """
+    discovery = device_discovery.discover_devices(refresh)
+    check     = device_discovery.preflight(ANDROID_DEVICE_NAME, ANDROID_PLATFORM_VERSION)
+    return {"success": check["ok"], "source": discovery["source"],
+            "devices": discovery["devices"], "preflight": check}
+
+
+@mcp.tool()
+def get_device_leases() -> dict[str, Any]:
+    """
+    Registre des devices (adb + ROBOT_DEVICES) avec le bail en cours de chacun
+    (propriétaire, pid, échéance) et la file des demandeurs en attente.
+    """
+    return {"success": True, **device_leases.leases_status()}
+
+
+@mcp.tool()
+def release_device_lease(lease_id: str) -> dict[str, Any]:
+    """
+    Libère un bail sans attendre son échéance (processus bloqué, session perdue).
+
+    Args:
+        lease_id: Identifiant du bail (get_device_leases)
+    """
+    if device_leases.release(lease_id):
+        return {"success": True, "released": lease_id}
+    return {"success": False, "error": f"Bail inconnu ou déjà libéré : {lease_id}"}
+
+
 # ============================================================================
 # HELPER INTERNE — récupération page source (factorisée)
 # ============================================================================
@@ -1019,14 +1876,20 @@ if __name__ == "__main__":
     print(f"   App Package    : {APP_PACKAGE}")
     print(f"   App Activity   : {APP_ACTIVITY}")
     print(f"   Device         : {ANDROID_DEVICE_NAME}")
-    print(f"   Android        : {ANDROID_PLATFORM_VERSION}")
+    print(f"   Android        : {ANDROID_PLATFORM_VERSION or '(découverte adb)'}")
     print(f"   Appium SDK     : {'✅ Disponible' if APPIUM_AVAILABLE else '⚠️  Simulation'}")
     print(f"   Gemini Vision  : {'✅ Configuré' if GEMINI_API_KEY else '⚠️  Heuristique only'}")
     print("\n   Outils exposés :")
     for tool in [
         "get_ui_hierarchy", "get_page_source", "find_element_by_strategies",
-        "suggest_alternative_locators", "execute_robot_test",
-        "take_screenshot", "analyze_current_screen",
+        "suggest_alternative_locators", "execute_robot_test", "select_impacted_tests",
+        "get_test_priorities",
+        "get_robot_job_status", "watch_robot_job", "cancel_robot_job", "list_robot_jobs",
+        "get_robot_results", "get_keyword_profile", "query_test_history", "classify_failures",
+        "execute_robot_sharded", "get_sharded_run_status", "cancel_sharded_run",
+        "take_screenshot", "analyze_current_screen", "profile_robot_locators",
+        "lint_robot_suites", "rewrite_xpath_locators", "discover_devices",
+        "get_device_leases", "release_device_lease",
     ]:
         print(f"   • {tool}")
     print("\n🚀 Serveur MCP prêt!\n" + "=" * 60 + "\n")
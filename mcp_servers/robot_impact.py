@@ -0,0 +1,241 @@
+"""
+Robot Impact — Sélection des tests impactés par un changement
+=============================================================
+Index de dépendances construit en parsant les fichiers .robot / .resource :
+
+    variable-locator  →  keywords qui l'utilisent  →  keywords appelants  →  test cases
+
+Chaque fichier ne voit que ses propres définitions et celles des ressources
+qu'il importe (transitivement), comme Robot Framework. Les setups / teardowns
+de suite (*** Settings ***) impactent tous les tests du fichier.
+
+Changements acceptés :
+  • locators : nom de variable (`HOME_SEARCH_BAR`, `${HOME_SEARCH_BAR}`) ou
+    fragment de valeur (`btn_login`) → variables et lignes qui le contiennent
+  • fichiers : page object / ressource / suite modifiés → tout ce qu'ils définissent
+
+Usage:
+    index = ImpactIndex(["tests/suites", "agents/tests/suites"])
+    for test in index.impacted_tests(changed_locators=["HOME_SEARCH_BAR"]):
+        print(test["file"], test["name"], " > ".join(test["via"]))
+"""
+
+import re
+from collections import deque
+from pathlib import Path
+from typing import Iterable, Optional
+
+from robot_resources import (RobotBlock, iter_robot_files, parse_blocks, parse_settings,
+                             parse_variables)
+
+_VARIABLE_REF = re.compile(r"[$@&%]\{([^{}]+)\}")
+_EMBEDDED_ARG = re.compile(r"\$\{[^}]+\}")
+
+# Réglages de suite qui exécutent des keywords pour tous les tests du fichier
+_SUITE_HOOKS = ("suite setup", "suite teardown", "test setup", "test teardown",
+                "test template", "task setup", "task teardown", "task template")
+
+
+def normalize(name: str) -> str:
+    """Nom Robot normalisé : insensible à la casse, aux espaces et aux underscores."""
+    return re.sub(r"[\s_]", "", name).lower()
+
+
+def _variable_refs(cell: str) -> set[str]:
+    return {normalize(ref.split("[")[0].split(".")[0]) for ref in _VARIABLE_REF.findall(cell)}
+
+
+def _body_cells(block: RobotBlock) -> Iterable[tuple[int, list[str]]]:
+    """Lignes du corps, hors documentation."""
+    for line, cells in block.body:
+        if cells and cells[0].lower() != "[documentation]":
+            yield line, cells
+
+
+class ImpactIndex:
+    """
+    Graphe « dépendance → dépendants » des variables, keywords et tests.
+
+    Nœuds : ("var", fichier, nom) · ("kw", fichier, nom) · ("test", fichier, nom)
+            · ("suite", fichier) pour les hooks de la section Settings.
+    """
+
+    def __init__(self, paths: Iterable):
+        self.users: dict[tuple, set[tuple]] = {}
+        self.labels: dict[tuple, str] = {}
+        self.lines: dict[tuple, list[tuple[int, list[str]]]] = {}
+        self.tests: dict[tuple, RobotBlock] = {}
+        self.variables: dict[tuple, str] = {}
+        self._files: dict[Path, dict] = {}
+
+        for file in iter_robot_files(paths):
+            self._load(file.resolve())
+        for file in list(self._files):
+            self._link(file)
+
+    # ── Lecture des fichiers ─────────────────────────────────────────────
+
+    def _load(self, file: Path) -> None:
+        if file in self._files or not file.exists():
+            return
+        settings = parse_settings(file)
+        data = {
+            "keywords":  parse_blocks(file, "keywords"),
+            "tests":     parse_blocks(file, "test cases"),
+            "variables": parse_variables(file),
+            "settings":  settings,
+            "imports":   [],
+        }
+        self._files[file] = data
+
+        for _, cells in settings:
+            if len(cells) > 1 and cells[0].lower() == "resource":
+                target = (file.parent / cells[1].replace("${CURDIR}", str(file.parent))).resolve()
+                data["imports"].append(target)
+                self._load(target)
+
+        for variable in data["variables"]:
+            node = ("var", file, normalize(variable.name))
+            self.labels[node]    = f"${{{variable.name}}}"
+            self.variables[node] = variable.value
+        for block in data["keywords"]:
+            node = ("kw", file, normalize(block.name))
+            self.labels[node] = block.name
+            self.lines[node]  = list(_body_cells(block))
+        for block in data["tests"]:
+            node = ("test", file, block.name)
+            self.labels[node] = block.name
+            self.lines[node]  = list(_body_cells(block))
+            self.tests[node]  = block
+
+    def _visible(self, file: Path) -> list[Path]:
+        """Le fichier et toutes les ressources qu'il importe (transitivement)."""
+        seen, queue = [file], deque([file])
+        while queue:
+            for target in self._files.get(queue.popleft(), {}).get("imports", []):
+                if target not in seen and target in self._files:
+                    seen.append(target)
+                    queue.append(target)
+        return seen
+
+    # ── Construction du graphe ───────────────────────────────────────────
+
+    def _link(self, file: Path) -> None:
+        visible   = self._visible(file)
+        variables: dict[str, list[tuple]] = {}
+        keywords:  dict[str, list[tuple]] = {}
+        embedded:  list[tuple[re.Pattern, tuple]] = []
+        for source in visible:
+            data = self._files[source]
+            for variable in data["variables"]:
+                name = normalize(variable.name)
+                variables.setdefault(name, []).append(("var", source, name))
+            for block in data["keywords"]:
+                node = ("kw", source, normalize(block.name))
+                keywords.setdefault(node[2], []).append(node)
+                if _EMBEDDED_ARG.search(block.name):
+                    parts   = _EMBEDDED_ARG.split(block.name)
+                    pattern = ".+?".join(re.escape(normalize(p)) for p in parts)
+                    embedded.append((re.compile(pattern + "$"), node))
+
+        def resolve(cell: str) -> list[tuple]:
+            name = normalize(cell)
+            if name in keywords:
+                return keywords[name]
+            if "." in cell and normalize(cell.rsplit(".", 1)[1]) in keywords:
+                return keywords[normalize(cell.rsplit(".", 1)[1])]
+            return [node for pattern, node in embedded if pattern.match(name)]
+
+        def depends(node: tuple, cells: list[str]) -> None:
+            for cell in cells:
+                for ref in _variable_refs(cell):
+                    for dependency in variables.get(ref, []):
+                        self.users.setdefault(dependency, set()).add(node)
+                for dependency in resolve(cell):
+                    if dependency != node:
+                        self.users.setdefault(dependency, set()).add(node)
+
+        data = self._files[file]
+        for variable in data["variables"]:
+            depends(("var", file, normalize(variable.name)), [variable.value])
+        for block in data["keywords"]:
+            node = ("kw", file, normalize(block.name))
+            for _, cells in self.lines[node]:
+                depends(node, cells)
+        for block in data["tests"]:
+            node = ("test", file, block.name)
+            for _, cells in self.lines[node]:
+                depends(node, cells)
+
+        suite = ("suite", file)
+        self.labels[suite] = f"Settings ({file.name})"
+        for _, cells in data["settings"]:
+            if cells[0].lower() in _SUITE_HOOKS:
+                depends(suite, cells[1:])
+        for block in data["tests"]:
+            self.users.setdefault(suite, set()).add(("test", file, block.name))
+
+    # ── Sélection ────────────────────────────────────────────────────────
+
+    def seeds(self, changed_locators: Iterable[str] = (),
+              changed_files: Iterable = ()) -> set[tuple]:
+        """Nœuds directement touchés par les locators / fichiers modifiés."""
+        seeds: set[tuple] = set()
+        for locator in changed_locators:
+            match = re.fullmatch(r"[$@&%]?\{?([^{}]+?)\}?", locator.strip())
+            name  = normalize(match.group(1)) if match else ""
+            by_name = {node for node in self.variables if node[2] == name}
+            if by_name:
+                seeds |= by_name
+                continue
+            # Fragment de valeur : variables et lignes qui contiennent le locator
+            seeds |= {node for node, value in self.variables.items() if locator in value}
+            seeds |= {node for node, lines in self.lines.items()
+                      if any(locator in cell for _, cells in lines for cell in cells)}
+
+        for changed in changed_files:
+            path = Path(changed).resolve()
+            seeds |= {node for node in self.labels if node[1] == path}
+        return seeds
+
+    def impacted_tests(self, changed_locators: Iterable[str] = (),
+                       changed_files: Iterable = ()) -> list[dict]:
+        """
+        Tests qui dépendent (transitivement) des changements, triés par fichier
+        puis par ligne, avec la chaîne de dépendance qui les relie au changement.
+        """
+        seeds  = self.seeds(changed_locators, changed_files)
+        parent: dict[tuple, Optional[tuple]] = {seed: None for seed in seeds}
+        queue  = deque(seeds)
+        while queue:
+            node = queue.popleft()
+            for user in self.users.get(node, ()):
+                if user not in parent:
+                    parent[user] = node
+                    queue.append(user)
+
+        impacted = []
+        for node in parent:
+            if node[0] != "test":
+                continue
+            chain, current = [], node
+            while current is not None:
+                chain.append(self.labels[current])
+                current = parent[current]
+            impacted.append({"file": str(node[1]), "name": node[2],
+                             "line": self.tests[node].line, "via": chain[::-1]})
+        return sorted(impacted, key=lambda t: (t["file"], t["line"]))
+
+
+def impacted_tests(paths: Iterable, changed_locators: Iterable[str] = (),
+                   changed_files: Iterable = ()) -> list[dict]:
+    """Raccourci : construit l'index sur `paths` puis sélectionne les tests impactés."""
+    return ImpactIndex(paths).impacted_tests(changed_locators, changed_files)
+
+
+def robot_selection_args(tests: list[dict]) -> list[str]:
+    """Arguments robot (`--test` + fichiers) pour n'exécuter que les tests donnés."""
+    args = []
+    for test in tests:
+        args += ["--test", test["name"].replace("[", "[[]")]
+    return args + list(dict.fromkeys(test["file"] for test in tests))
@@ -0,0 +1,493 @@
+"""
+Robot Jobs — Exécutions Robot Framework en arrière-plan
+=======================================================
+Lance `python -m robot` comme job détaché et retourne immédiatement un
+identifiant. L'état du job est persisté sur disque (job.json + console.log) :
+le serveur MCP étant relancé à chaque appel stdio, n'importe quel processus
+peut ensuite consulter le statut, les résultats partiels ou annuler le job.
+
+  • Un groupe de processus par job → annulation de tout l'arbre (robot + Appium client)
+  • Timeout appliqué par un timer en mémoire ET à chaque consultation du statut
+  • Résultats partiels diffusés par le listener (events.jsonl)
+  • Résultats finaux lus une fois dans output.xml (robot_output) puis mis en cache
+  • Profil de temps par keyword / locator (keyword_profile.json + .folded)
+
+  • Device loué (device_leases) : avec `lease_owner`, robot est lancé sous
+    bail — le job attend son tour si tous les devices sont occupés
+
+  • Passe de rejeu : seuls les tests en échec d'un output.xml précédent sont
+    relancés (--rerunfailed), puis fusionnés avec lui (rebot --merge) avec le
+    nombre de tentatives de chaque test
+
+Usage:
+    job = start_job(["--include", "smoke", "suite.robot"], output_path, timeout=300)
+    job_status(job["job_id"])      # running → passed / failed / cancelled / timeout
+    cancel_job(job["job_id"])
+    start_rerun_job(job["job_id"], output_path)   # rejoue uniquement les échecs
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import uuid
+import signal
+import subprocess
+import threading
+from pathlib import Path
+from typing import Any, Callable, Optional
+from xml.etree.ElementTree import ParseError
+
+from robot_output import parse_output_xml
+from failure_classifier import FailureClassifier
+from history_store import HistoryStore
+import device_leases
+
+JOBS_DIR = Path(os.getenv(
+    "ROBOT_JOBS_DIR", Path(__file__).resolve().parent.parent / "results" / "jobs"))
+
+DEFAULT_JOB_TIMEOUT = int(os.getenv("ROBOT_JOB_TIMEOUT", "300"))
+KILL_GRACE_SECONDS  = 5
+
+# Options console qui rendent la sortie lisible ligne à ligne dans console.log
+CONSOLE_OPTIONS = ["--consolecolors", "off", "--consolemarkers", "off", "--consolewidth", "160"]
+
+FINAL_STATUSES = ("passed", "failed", "cancelled", "timeout", "error")
+
+# Niveaux de keywords conservés par test dans les résultats finaux
+RESULT_KEYWORD_DEPTH = 1
+
+LISTENER_PATH = Path(__file__).resolve().parent / "robot_progress_listener.py"
+
+# Profil de temps par keyword / locator (robot_timing_listener.py) écrit dans le dossier du job
+TIMING_LISTENER_PATH = Path(__file__).resolve().parent / "robot_timing_listener.py"
+
+# Lanceur `python device_leases.py robot ...` (bail exclusif sur un device)
+LEASES_PATH = Path(__file__).resolve().parent / "device_leases.py"
+KEYWORD_PROFILE      = os.getenv("ROBOT_KEYWORD_PROFILE", "true").lower() == "true"
+PROFILE_NAME         = "keyword_profile"
+
+# Popen des jobs lancés par CE processus (les autres sont suivis par PID)
+_PROCESSES: dict[str, subprocess.Popen] = {}
+_LOCK = threading.Lock()
+
+# ============================================================================
+# PERSISTANCE
+# ============================================================================
+
+def _job_file(job_id: str) -> Path:
+    return JOBS_DIR / job_id / "job.json"
+
+
+def _load(job_id: str) -> Optional[dict]:
+    path = _job_file(job_id)
+    if not re.fullmatch(r"[\w-]+", job_id) or not path.exists():
+        return None
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def _save(job: dict) -> None:
+    path = _job_file(job["job_id"])
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(job, indent=2, ensure_ascii=False), encoding="utf-8")
+    tmp.replace(path)
+
+
+# ============================================================================
+# PROCESSUS
+# ============================================================================
+
+def _is_running(job: dict) -> bool:
+    proc = _PROCESSES.get(job["job_id"])
+    if proc is not None:
+        return proc.poll() is None
+    return device_leases.pid_alive(job["pid"])
+
+
+def _kill_tree(job: dict) -> None:
+    """Termine le job et tous ses descendants (SIGTERM puis SIGKILL)."""
+    pid = job["pid"]
+    if os.name == "nt":
+        subprocess.run(["taskkill", "/T", "/F", "/PID", str(pid)], capture_output=True)
+    else:
+        try:
+            os.killpg(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            return
+        deadline = time.monotonic() + KILL_GRACE_SECONDS
+        while _is_running(job) and time.monotonic() < deadline:
+            time.sleep(0.1)
+        try:
+            os.killpg(pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+    proc = _PROCESSES.get(job["job_id"])
+    if proc is not None:
+        try:
+            proc.wait(timeout=KILL_GRACE_SECONDS)
+        except subprocess.TimeoutExpired:
+            pass
+
+
+def _finish(job: dict, status: str, error: Optional[str] = None) -> dict:
+    job.update(status=status, finished_at=time.time())
+    if error:
+        job["error"] = error
+    if status in ("passed", "failed"):
+        _record_history(job)
+    _save(job)
+    _PROCESSES.pop(job["job_id"], None)
+    return job
+
+
+def _record_history(job: dict) -> None:
+    """
+    Historique (ordonnancement, classification) : uniquement les tests exécutés
+    par CE job — le output.xml fusionné d'un rejeu n'est pas rechargé. Les
+    PASS de ce job peuvent sortir des tests de quarantaine.
+    """
+    store = HistoryStore()
+    try:
+        store.ingest([Path(job["output_dir"]) / "output.xml"])
+        FailureClassifier(store).release_recovered()
+    finally:
+        store.close()
+
+
+# ============================================================================
+# RÉSULTATS
+# ============================================================================
+
+def rebot(outputs: list[str], output_dir: Path, merge: bool = False,
+          name: Optional[str] = None) -> dict:
+    """
+    Combine plusieurs output.xml en un seul rapport (rebot).
+    `merge=True` : les tests rejoués remplacent leur résultat précédent.
+    """
+    output_dir = Path(output_dir)
+    cmd = [sys.executable, "-m", "robot.rebot", "--nostatusrc",
+           "--outputdir", str(output_dir), "--output", "output.xml",
+           "--log", "log.html", "--report", "report.html"]
+    if merge:
+        cmd.append("--merge")
+    if name:
+        cmd += ["--name", name]
+    proc = subprocess.run([*cmd, *map(str, outputs)], capture_output=True, text=True)
+    if proc.returncode != 0:
+        return {"error": (proc.stderr or proc.stdout)[-1000:]}
+    return {
+        "output_xml":  str(output_dir / "output.xml"),
+        "log_file":    str(output_dir / "log.html"),
+        "report_file": str(output_dir / "report.html"),
+    }
+
+
+def final_output(job: dict) -> Path:
+    """output.xml qui fait foi pour le job (fusionné pour une passe de rejeu)."""
+    out_dir = Path(job["output_dir"])
+    return out_dir / "merged" / "output.xml" if job.get("rerun_of") else out_dir / "output.xml"
+
+
+def load_results(job: dict) -> Optional[dict]:
+    """
+    Résultats structurés de output.xml (suites, tests, keywords, durées).
+    Lus une seule fois puis mis en cache dans results.json ; None si Robot
+    n'a pas produit de output.xml complet (crash, arrêt forcé).
+
+    Passe de rejeu : le résultat est la fusion du output.xml précédent et du
+    rejeu, chaque test portant son nombre de tentatives (`attempts`).
+    """
+    cache = JOBS_DIR / job["job_id"] / "results.json"
+    if cache.exists():
+        return json.loads(cache.read_text(encoding="utf-8"))
+    output = Path(job["output_dir"]) / "output.xml"
+    if not output.exists():
+        return None
+    try:
+        if job.get("rerun_of"):
+            rerun  = {t["longname"] for t in parse_output_xml(output, keyword_depth=0)["tests"]}
+            merged = rebot([job["rerun_of"]["output_xml"], output],
+                           Path(job["output_dir"]) / "merged", merge=True)
+            if "error" in merged:
+                return None
+            results = parse_output_xml(merged["output_xml"], keyword_depth=RESULT_KEYWORD_DEPTH)
+        else:
+            rerun, results = set(), parse_output_xml(output, keyword_depth=RESULT_KEYWORD_DEPTH)
+    except ParseError:
+        return None
+
+    previous = job.get("attempts_before", {})
+    for test in results["tests"]:
+        test["attempts"] = previous.get(test["longname"], 1) + (test["longname"] in rerun)
+    results["retries"] = {t["longname"]: t["attempts"] - 1
+                          for t in results["tests"] if t["attempts"] > 1}
+    cache.write_text(json.dumps(results, ensure_ascii=False), encoding="utf-8")
+    return results
+
+
+def read_events(job_id: str, offset: int = 0) -> tuple[list[dict], int]:
+    """
+    Événements du listener écrits depuis `offset` (octets) + nouvel offset.
+    Seules les lignes complètes sont lues (le listener écrit en continu).
+    """
+    path = JOBS_DIR / job_id / "events.jsonl"
+    if not path.exists():
+        return [], offset
+    with open(path, "rb") as f:
+        f.seek(offset)
+        chunk = f.read()
+    complete = chunk[:chunk.rfind(b"\n") + 1]
+    events   = [json.loads(line) for line in complete.decode("utf-8").splitlines() if line.strip()]
+    return events, offset + len(complete)
+
+
+def summarize_events(events: list[dict]) -> dict:
+    """Tests terminés, test en cours et nombre total attendu à partir des événements."""
+    tests, running, total = [], None, None
+    for event in events:
+        if event["event"] == "start_suite" and total is None:
+            total = event["total"]
+        elif event["event"] == "start_test":
+            running = event["longname"]
+        elif event["event"] == "end_test":
+            running = None
+            tests.append({"name": event["name"], "longname": event["longname"],
+                          "status": event["status"],
+                          "message": event["message"], "elapsed_s": event["elapsed_s"]})
+    return {"tests": tests, "running_test": running, "expected_total": total}
+
+
+def _read_console(job: dict) -> str:
+    path = Path(job["console_log"])
+    return path.read_text(encoding="utf-8", errors="replace") if path.exists() else ""
+
+
+# ============================================================================
+# API
+# ============================================================================
+
+def start_job(robot_args: list[str], output_path: Path, timeout: int = DEFAULT_JOB_TIMEOUT,
+              cwd: Optional[Path] = None, label: str = "",
+              rerun_of: Optional[dict] = None, lease_owner: Optional[str] = None,
+              job_args: Optional[Callable[[Path], list[str]]] = None) -> dict:
+    """
+    Démarre `python -m robot <robot_args>` en arrière-plan (même interpréteur).
+    Les rapports sont écrits dans `output_path/<job_id>/`.
+    `rerun_of` : output.xml précédent et tentatives déjà faites (passe de rejeu).
+    `lease_owner` : exécution sous bail d'un device (DEVICE_NAME, PLATFORM_VERSION…
+    passés en variables), attente du device comprise dans `timeout`.
+    `job_args` : arguments supplémentaires construits avec le dossier du job
+    (fichiers de pre-run modifier écrits dans ce dossier, même durée de vie).
+    """
+    job_id  = time.strftime("%Y%m%d-%H%M%S-") + uuid.uuid4().hex[:6]
+    job_dir = JOBS_DIR / job_id
+    out_dir = Path(output_path) / job_id
+    job_dir.mkdir(parents=True, exist_ok=True)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    if job_args:
+        robot_args = [*job_args(job_dir), *robot_args]
+
+    console  = job_dir / "console.log"
+    events   = job_dir / "events.jsonl"
+    profile  = ["--listener", f"{TIMING_LISTENER_PATH};{out_dir / PROFILE_NAME}"] if KEYWORD_PROFILE else []
+    launcher = ([str(LEASES_PATH), "robot", "--owner", lease_owner, "--wait", str(timeout),
+                 "--ttl", str(timeout + KILL_GRACE_SECONDS), "--"]
+                if lease_owner else ["-m", "robot"])
+    full_cmd = [sys.executable, *launcher, "--outputdir", str(out_dir),
+                *CONSOLE_OPTIONS, "--listener", f"{LISTENER_PATH};{events}", *profile, *robot_args]
+
+    popen_kwargs: dict[str, Any] = {}
+    if os.name == "nt":
+        popen_kwargs["creationflags"] = subprocess.CREATE_NEW_PROCESS_GROUP
+    else:
+        popen_kwargs["start_new_session"] = True
+
+    with open(console, "w", encoding="utf-8") as log:
+        proc = subprocess.Popen(
+            full_cmd, stdout=log, stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL,
+            cwd=str(cwd) if cwd else None,
+            env={**os.environ, "PYTHONIOENCODING": "utf-8", "PYTHONUNBUFFERED": "1"},
+            **popen_kwargs,
+        )
+
+    job = {
+        "job_id":      job_id,
+        "label":       label,
+        "pid":         proc.pid,
+        "cmd":         full_cmd,
+        "status":      "running",
+        "started_at":  time.time(),
+        "finished_at": None,
+        "timeout":     timeout,
+        "output_dir":  str(out_dir),
+        "console_log": str(console),
+        "events_log":  str(events),
+    }
+    if rerun_of:
+        job["rerun_of"]        = {"output_xml": rerun_of["output_xml"],
+                                  "job_id": rerun_of.get("job_id")}
+        job["attempts_before"] = rerun_of.get("attempts", {})
+    _save(job)
+    with _LOCK:
+        _PROCESSES[job_id] = proc
+
+    timer = threading.Timer(timeout, lambda: job_status(job_id))
+    timer.daemon = True
+    timer.start()
+    return job
+
+
+def job_status(job_id: str, include_console: bool = False) -> dict[str, Any]:
+    """
+    Statut d'un job + résultats partiels (tests déjà terminés).
+    Applique le timeout si le job le dépasse encore.
+    """
+    job = _load(job_id)
+    if job is None:
+        return {"success": False, "error": f"Job inconnu: {job_id}"}
+
+    with _LOCK:
+        if job["status"] == "running":
+            if not _is_running(job):
+                results = load_results(job)
+                if results is None:
+                    _finish(job, "error", "Robot Framework s'est arrêté sans output.xml")
+                else:
+                    stats = results["stats"]
+                    _finish(job, "passed" if stats["failed"] == 0 and stats["total"] > 0
+                            else "failed")
+            elif time.time() - job["started_at"] > job["timeout"]:
+                _kill_tree(job)
+                _finish(job, "timeout", f"Timeout : job dépassé {job['timeout']}s")
+
+    console = _read_console(job)
+    live    = summarize_events(read_events(job_id)[0])
+    results = load_results(job) if job["status"] in FINAL_STATUSES else None
+    if results is not None:
+        tests, stats = results["tests"], results["stats"]
+    else:
+        # En cours (ou interrompu sans output.xml) : tests déjà terminés d'après le listener
+        tests = live["tests"]
+        stats = {
+            "total":   len(tests),
+            "passed":  sum(1 for t in tests if t["status"] == "PASS"),
+            "failed":  sum(1 for t in tests if t["status"] == "FAIL"),
+            "skipped": sum(1 for t in tests if t["status"] == "SKIP"),
+        }
+
+    out_dir = final_output(job).parent
+    result  = {
+        "success":     True,
+        "job_id":      job_id,
+        "status":      job["status"],
+        "done":        job["status"] in FINAL_STATUSES,
+        "elapsed_s":   round((job["finished_at"] or time.time()) - job["started_at"], 1),
+        **stats,
+        "all_passed":  job["status"] == "passed",
+        "tests":       tests,
+        "running_test":   live["running_test"],
+        "expected_total": live["expected_total"],
+        "output_dir":  str(out_dir),
+        "output_xml":  str(out_dir / "output.xml"),
+        "log_file":    str(out_dir / "log.html"),
+        "report_file": str(out_dir / "report.html"),
+        "stdout_tail": console[-2000:],
+    }
+    if results is not None:
+        result["suite_elapsed_s"] = results["elapsed_s"]
+        result["errors"]          = results["errors"]
+        result["retries"]         = results.get("retries", {})
+    if job.get("rerun_of"):
+        result["rerun_of"] = job["rerun_of"]
+    profile = Path(job["output_dir"]) / f"{PROFILE_NAME}.json"
+    if profile.exists():
+        result["keyword_profile"] = str(profile)
+    if job.get("error"):
+        result["error"] = job["error"]
+    if include_console:
+        result["console"] = console
+    return result
+
+
+def start_rerun_job(previous: str, output_path: Path, robot_args: Optional[list[str]] = None,
+                    timeout: int = DEFAULT_JOB_TIMEOUT, cwd: Optional[Path] = None,
+                    lease_owner: Optional[str] = None,
+                    job_args: Optional[Callable[[Path], list[str]]] = None) -> dict:
+    """
+    Passe de rejeu : relance uniquement les tests en échec de `previous`
+    (job_id d'un job terminé ou chemin d'un output.xml). Le résultat final du
+    nouveau job est la fusion des deux passes.
+    """
+    job = _load(previous) if re.fullmatch(r"[\w-]+", previous) else None
+    if job is not None:
+        results = load_results(job)
+        if results is None:
+            return {"success": False, "error": f"Job {previous} sans output.xml exploitable"}
+        source   = final_output(job)
+        attempts = {t["longname"]: t.get("attempts", 1) for t in results["tests"]}
+    else:
+        source = Path(previous)
+        if not source.exists():
+            return {"success": False, "error": f"Job ou output.xml introuvable: {previous}"}
+        try:
+            results = parse_output_xml(source, keyword_depth=0)
+        except ParseError as e:
+            return {"success": False, "error": f"output.xml invalide: {e}"}
+        attempts = {}
+
+    if results["stats"]["failed"] == 0:
+        return {"success": True, "done": True, "status": "nothing_to_run", "nothing_to_run": True,
+                "total": 0, "all_passed": None,
+                "message": "Aucun test en échec à rejouer", "rerun_of": str(source)}
+
+    # Mêmes sources que la passe initiale : les noms longs des tests doivent correspondre
+    root    = results["suite"]
+    sources = [root["source"]] if root["source"] else [s["source"] for s in root["suites"]]
+    args = [*(robot_args or []), "--rerunfailed", str(source), *sources]
+    started = start_job(args, output_path, timeout=timeout, cwd=cwd,
+                        label=f"rerun:{previous}",
+                        rerun_of={"output_xml": str(source), "attempts": attempts,
+                                  "job_id": job["job_id"] if job else None},
+                        lease_owner=lease_owner, job_args=job_args)
+    return job_status(started["job_id"])
+
+
+def cancel_job(job_id: str) -> dict[str, Any]:
+    """Annule un job en cours et nettoie tout son arbre de processus."""
+    job = _load(job_id)
+    if job is None:
+        return {"success": False, "error": f"Job inconnu: {job_id}"}
+    with _LOCK:
+        if job["status"] != "running":
+            return {"success": False, "job_id": job_id, "status": job["status"],
+                    "error": "Job déjà terminé"}
+        _kill_tree(job)
+        _finish(job, "cancelled")
+    return {"success": True, "job_id": job_id, "status": "cancelled"}
+
+
+def wait_job(job_id: str, timeout: float, poll_interval: float = 0.5) -> dict[str, Any]:
+    """Attend la fin du job au plus `timeout` secondes puis retourne son statut."""
+    deadline = time.monotonic() + timeout
+    status   = job_status(job_id)
+    while status.get("success") and not status["done"] and time.monotonic() < deadline:
+        time.sleep(poll_interval)
+        status = job_status(job_id)
+    return status
+
+
+def list_jobs(limit: int = 20) -> list[dict]:
+    """Derniers jobs (plus récent d'abord) avec leur statut courant."""
+    if not JOBS_DIR.exists():
+        return []
+    job_ids = sorted((p.parent.name for p in JOBS_DIR.glob("*/job.json")), reverse=True)
+    summaries = []
+    for job_id in job_ids[:limit]:
+        status = job_status(job_id)
+        if status.get("success"):
+            summaries.append({k: status[k] for k in
+                              ("job_id", "status", "elapsed_s", "total", "passed", "failed")})
+    return summaries
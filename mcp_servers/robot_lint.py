@@ -0,0 +1,246 @@
+"""
+Robot Lint — Anti-patterns de performance des fichiers Robot
+=============================================================
+Analyse statique des ressources et suites .robot (robot_resources.py) ;
+chaque constat porte un coût estimé en secondes par exécution de la suite :
+
+  • fixed-sleep           `Sleep <durée>`                               durée de la pause
+  • per-test-session      ouverture de l'application à chaque test      SESSION_COST_S par test en trop
+  • redundant-visibility  `Wait Until Element Is Visible X` suivi de
+                          `Element Should Be Visible X`                  un aller-retour device
+  • xpath-wildcard        XPath `//*` (dump et parcours de toute la
+                          hiérarchie à chaque résolution)               XPATH_SCAN_COST_S par résolution
+  • screenshot-teardown   `Capture Page Screenshot` en teardown de
+                          chaque test, même réussi                      SCREENSHOT_COST_S par test
+
+Correction automatique (`fix=True`) : réécrit le fichier, en réutilisant les
+corrections de robot_postprocess pour les Sleep et la session par suite.
+
+Usage:
+    python robot_lint.py ../tests/resources ../tests/suites
+    python robot_lint.py ../agents/tests/suites --fix
+"""
+
+import re
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Iterable, Optional
+
+from robot_resources import iter_robot_files, parse_blocks, parse_settings, parse_variables
+from robot_postprocess import enforce_suite_session, opens_session, replace_fixed_sleeps, session_openers
+
+# Coûts estimés (secondes), mesurés sur device réel UiAutomator2
+SESSION_COST_S    = 5.0     # création de session + démarrage de l'application
+ROUND_TRIP_COST_S = 0.3     # find_element + is_displayed
+XPATH_SCAN_COST_S = 0.8     # dump XML complet puis évaluation de `//*`
+SCREENSHOT_COST_S = 1.0     # capture + encodage + écriture dans le log
+DEFAULT_SLEEP_S   = 1.0     # Sleep dont la durée est une variable
+
+_SLEEP       = re.compile(r"^(BuiltIn\.)?Sleep$", re.IGNORECASE)
+_WAIT_VISIBLE = ("wait until element is visible", "wait until cached element is visible")
+_SCREENSHOT  = "capture page screenshot"
+
+# `//*[@attr='valeur']` → locator AppiumLibrary sans parcours de la hiérarchie
+_WILDCARD_REWRITES = [
+    (re.compile(r"^(?:xpath=)?//\*\[@content-desc='([^']*)'\]$"), "accessibility_id={}"),
+    (re.compile(r"^(?:xpath=)?//\*\[@resource-id='([^']*)'\]$"),  "id={}"),
+    (re.compile(r"^(?:xpath=)?//\*\[@text='([^'\"]*)'\]$"),       'android=new UiSelector().text("{}")'),
+    (re.compile(r"^(?:xpath=)?//\*\[contains\(@text,\s*'([^'\"]*)'\)\]$"),
+     'android=new UiSelector().textContains("{}")'),
+]
+
+
+@dataclass
+class RobotFinding:
+    """Anti-pattern détecté : règle, position, coût estimé et correction éventuelle."""
+    rule:    str
+    path:    str
+    line:    int
+    message: str
+    cost_s:  float
+    fix:     Optional[tuple] = None     # ("delete",) | ("replace", ancien, nouveau) | ("content",)
+
+    @property
+    def fixable(self) -> bool:
+        return self.fix is not None
+
+
+def _sleep_seconds(value: str) -> float:
+    from robot.utils import timestr_to_secs
+    try:
+        return float(timestr_to_secs(value))
+    except (ValueError, TypeError):
+        return DEFAULT_SLEEP_S
+
+
+def _wildcard_rewrite(locator: str) -> Optional[str]:
+    for pattern, template in _WILDCARD_REWRITES:
+        match = pattern.match(locator)
+        if match:
+            return template.format(match.group(1))
+    return None
+
+
+def _wildcard_findings(path: str, line: int, value: str, where: str) -> list[RobotFinding]:
+    if "//*" not in value:
+        return []
+    rewrite = _wildcard_rewrite(value)
+    return [RobotFinding(
+        "xpath-wildcard", path, line,
+        f"XPath `//*` ({where}) : parcours de toute la hiérarchie à chaque résolution"
+        + (f" → {rewrite}" if rewrite else ""),
+        XPATH_SCAN_COST_S, ("replace", value, rewrite) if rewrite else None)]
+
+
+def lint_file(path, session_keywords: Optional[frozenset] = None) -> list[RobotFinding]:
+    """
+    Anti-patterns de performance d'un fichier .robot / .resource (ordre des lignes).
+    `session_keywords` : keywords ouvrant la session Appium (session_openers),
+    par défaut ceux connus et ceux définis dans le fichier.
+    """
+    path     = str(path)
+    content  = Path(path).read_text(encoding="utf-8")
+    session_keywords = session_keywords or session_openers(content)
+    tests    = parse_blocks(path, "test cases")
+    keywords = parse_blocks(path, "keywords")
+    settings = parse_settings(path)
+    findings: list[RobotFinding] = []
+    session_fix = ("content",) if enforce_suite_session(content, Path(path))[1] else None
+
+    # ── Settings : setups / teardowns exécutés à chaque test ─────────────
+    for line, cells in settings:
+        name = cells[0].lower()
+        if name == "test setup" and len(tests) > 1 and any(opens_session(cell, session_keywords) for cell in cells[1:]):
+            findings.append(RobotFinding(
+                "per-test-session", path, line,
+                f"Application ouverte à chaque test ({len(tests)} tests) : Suite Setup + Reset App State",
+                SESSION_COST_S * (len(tests) - 1), session_fix))
+        if name == "test teardown" and len(cells) > 1 and cells[1].lower() == _SCREENSHOT:
+            findings.append(RobotFinding(
+                "screenshot-teardown", path, line,
+                "Capture d'écran à chaque test, même réussi : Run Keyword If Test Failed",
+                SCREENSHOT_COST_S * len(tests),
+                ("replace", cells[1], f"Run Keyword If Test Failed    {cells[1]}")))
+
+    # ── Corps des tests et keywords ──────────────────────────────────────
+    openers = []
+    for is_test, block in [(True, b) for b in tests] + [(False, b) for b in keywords]:
+        previous = None
+        for line, cells in block.body:
+            keyword = cells[0]
+            if _SLEEP.match(keyword) and len(cells) > 1:
+                findings.append(RobotFinding(
+                    "fixed-sleep", path, line, f"Pause fixe `Sleep    {cells[1]}` : Wait For UI Idle",
+                    _sleep_seconds(cells[1]), ("content",)))
+            elif is_test and opens_session(keyword, session_keywords):
+                openers.append(line)
+            elif (keyword.lower() == "element should be visible" and previous
+                  and previous[0].lower() in _WAIT_VISIBLE and previous[1:2] == cells[1:2]):
+                findings.append(RobotFinding(
+                    "redundant-visibility", path, line,
+                    f"`Element Should Be Visible    {cells[1]}` juste après l'attente de visibilité",
+                    ROUND_TRIP_COST_S, ("delete",)))
+            elif is_test and keyword.lower() == "[teardown]" and cells[1:2] \
+                    and cells[1].lower() == _SCREENSHOT:
+                findings.append(RobotFinding(
+                    "screenshot-teardown", path, line,
+                    "Capture d'écran en teardown, même si le test réussit : Run Keyword If Test Failed",
+                    SCREENSHOT_COST_S,
+                    ("replace", cells[1], f"Run Keyword If Test Failed    {cells[1]}")))
+            for cell in cells[1:]:
+                findings.extend(_wildcard_findings(path, line, cell, block.name))
+            if not keyword.startswith("["):
+                previous = cells
+
+    if len(openers) > 1:
+        findings.append(RobotFinding(
+            "per-test-session", path, openers[0],
+            f"Application ouverte dans {len(openers)} tests : Suite Setup + Reset App State",
+            SESSION_COST_S * (len(openers) - 1), session_fix))
+
+    for variable in parse_variables(path):
+        findings.extend(_wildcard_findings(path, variable.line, variable.value, f"${{{variable.name}}}"))
+
+    return sorted(findings, key=lambda f: (f.line, f.rule))
+
+
+def fix_content(content: str, path, findings: list[RobotFinding]) -> tuple[str, list[RobotFinding]]:
+    """Applique les corrections des constats ; retourne (contenu, constats corrigés)."""
+    lines = content.splitlines(keepends=True)
+    fixed = []
+    for finding in sorted((f for f in findings if f.fix and f.fix[0] != "content"),
+                          key=lambda f: f.line, reverse=True):
+        index = finding.line - 1
+        end   = index + 1
+        while end < len(lines) and lines[end].strip().startswith("..."):
+            end += 1
+        if finding.fix[0] == "delete":
+            del lines[index:end]
+            fixed.append(finding)
+            continue
+        _, old, new = finding.fix
+        for position in range(index, end):
+            if old in lines[position]:
+                lines[position] = lines[position].replace(old, new, 1)
+                fixed.append(finding)
+                break
+    content = "".join(lines)
+
+    rules = {f.rule for f in findings if f.fix == ("content",)}
+    if "fixed-sleep" in rules:
+        content, _ = replace_fixed_sleeps(content, Path(path))
+    if "per-test-session" in rules:
+        content, _ = enforce_suite_session(content, Path(path))
+    fixed += [f for f in findings if f.fix == ("content",)]
+    return content, sorted(fixed, key=lambda f: (f.line, f.rule))
+
+
+def lint_paths(paths: Iterable, fix: bool = False) -> dict:
+    """
+    Analyse tous les fichiers Robot sous `paths` ; avec `fix`, réécrit les
+    fichiers corrigeables. Coûts totalisés par règle.
+    """
+    findings, fixed = [], []
+    files = list(iter_robot_files(paths))
+    # Keywords d'ouverture définis dans les ressources (ex. Open FoodApp) visibles de toutes les suites
+    session_keywords = frozenset().union(
+        *(session_openers(file.read_text(encoding="utf-8")) for file in files))
+    for file in files:
+        current = lint_file(file, session_keywords)
+        findings += current
+        if fix and any(f.fixable for f in current):
+            content = file.read_text(encoding="utf-8")
+            content, applied = fix_content(content, file, current)
+            file.write_text(content, encoding="utf-8")
+            fixed += applied
+
+    by_rule: dict[str, dict] = {}
+    for finding in findings:
+        entry = by_rule.setdefault(finding.rule, {"count": 0, "cost_s": 0.0})
+        entry["count"]  += 1
+        entry["cost_s"]  = round(entry["cost_s"] + finding.cost_s, 2)
+    return {
+        "files":        len(files),
+        "total_cost_s": round(sum(f.cost_s for f in findings), 2),
+        "by_rule":      dict(sorted(by_rule.items(), key=lambda kv: kv[1]["cost_s"], reverse=True)),
+        "findings":     [{**asdict(f), "fixable": f.fixable} for f in findings],
+        "fixed":        len(fixed),
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Anti-patterns de performance des fichiers Robot")
+    parser.add_argument("paths", nargs="+", help="Fichiers ou dossiers .robot")
+    parser.add_argument("--fix", action="store_true", help="Réécrire les fichiers corrigeables")
+    args = parser.parse_args()
+
+    report = lint_paths(args.paths, fix=args.fix)
+    for finding in report["findings"]:
+        mark = "🔧" if finding["fixable"] else "  "
+        print(f"{finding['path']}:{finding['line']}  {mark} {finding['rule']:<21} "
+              f"~{finding['cost_s']:.1f}s  {finding['message']}")
+    print(f"\n{len(report['findings'])} constat(s) dans {report['files']} fichier(s), "
+          f"~{report['total_cost_s']:.1f}s par exécution"
+          + (f" — {report['fixed']} corrigé(s)" if args.fix else ""))
@@ -0,0 +1,230 @@
+"""
+Robot Output — Lecture en flux des résultats output.xml
+=======================================================
+Parcourt output.xml avec iterparse (mémoire constante) et retourne les
+résultats structurés : arbre des suites, liste à plat des tests et, pour
+chaque test, ses keywords jusqu'à `keyword_depth` avec leurs durées.
+
+  • Chaque suite / test / keyword est vidé et détaché de son parent dès sa
+    fermeture : la taille du fichier n'influe que sur le temps de lecture
+  • <status>, <arg>, <tag> sont lus dans leur conteneur à sa fermeture
+  • Formats Robot Framework 6 (starttime/endtime) et 7 (start/elapsed)
+  • Pour un test en échec : keyword le plus profond en échec et son chemin
+
+Usage:
+    results = parse_output_xml("results/output.xml", keyword_depth=1)
+    results["stats"]          # {"total": 12, "passed": 10, "failed": 1, "skipped": 1}
+    results["tests"][0]       # {"longname": ..., "status": ..., "elapsed_s": ..., "keywords": [...]}
+"""
+
+import xml.etree.ElementTree as ET
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Optional
+
+# Éléments qui portent un <status> et peuvent contenir des keywords
+KEYWORD_TAGS = {"kw", "for", "iter", "if", "branch", "try", "while", "group",
+                "variable", "return", "break", "continue", "error"}
+
+# Arguments conservés par keyword (et longueur max de chacun)
+MAX_ARGS       = 5
+MAX_ARG_LENGTH = 200
+
+# Éléments suivis pendant la lecture (les autres sont lus depuis leur parent)
+_TRACKED_TAGS = KEYWORD_TAGS | {"robot", "suite", "test", "statistics", "errors"}
+
+_RF6_TIME = "%Y%m%d %H:%M:%S.%f"
+
+
+def _elapsed(status) -> float:
+    """Durée en secondes d'un <status> (RF 7 : `elapsed`, RF 6 : `endtime - starttime`)."""
+    if status.get("elapsed") is not None:
+        return round(float(status.get("elapsed")), 3)
+    start, end = status.get("starttime"), status.get("endtime")
+    if not start or not end or "N/A" in (start, end):
+        return 0.0
+    delta = datetime.strptime(end, _RF6_TIME) - datetime.strptime(start, _RF6_TIME)
+    return round(delta.total_seconds(), 3)
+
+
+def _empty_stats() -> dict:
+    return {"total": 0, "passed": 0, "failed": 0, "skipped": 0}
+
+
+def _count(stats: dict, status: str) -> None:
+    stats["total"] += 1
+    key = {"PASS": "passed", "FAIL": "failed", "SKIP": "skipped"}.get(status)
+    if key:
+        stats[key] += 1
+
+
+def _keyword_name(elem) -> str:
+    tag = elem.tag
+    if tag == "kw":
+        return elem.get("name") or "KW"
+    if tag == "for":
+        return f"FOR {elem.get('flavor', '')}".strip()
+    if tag == "branch":
+        return f"{elem.get('type', '')} {elem.get('condition', '')}".strip()
+    if tag == "variable":
+        return f"VAR {elem.get('name', '')}".strip()
+    return tag.upper()
+
+
+def _keyword_frame(elem) -> dict:
+    frame = {"name": _keyword_name(elem), "type": elem.get("type") or elem.tag.upper()}
+    if elem.get("owner") or elem.get("library"):
+        frame["owner"] = elem.get("owner") or elem.get("library")
+    return frame
+
+
+def _args(elem) -> list[str]:
+    return [(arg.text or "")[:MAX_ARG_LENGTH] for arg in elem.findall("arg")[:MAX_ARGS]]
+
+
+def parse_output_xml(path, keyword_depth: int = 1, failed_only: bool = False) -> dict[str, Any]:
+    """
+    Résultats d'un output.xml lus en flux.
+
+    Args:
+        path:          Chemin du fichier output.xml
+        keyword_depth: Niveaux de keywords conservés sous chaque test / suite
+                       (0 = aucun ; le keyword en échec est toujours remonté)
+        failed_only:   Ne garder que les tests non PASS dans `tests`
+                       (les statistiques restent calculées sur tous les tests)
+
+    Returns:
+        {"suite": arbre des suites, "tests": [...], "stats": {...},
+         "errors": [...], "elapsed_s": durée de la suite racine}
+    """
+    source = str(Path(path))
+    events = ET.iterparse(source, events=("start", "end"))
+
+    result: dict[str, Any] = {"generator": None, "generated": None, "suite": None,
+                              "tests": [], "stats": _empty_stats(), "errors": [],
+                              "elapsed_s": 0.0}
+    # Conteneurs ouverts : (élément, genre, frame ou None si keyword non conservé, profondeur)
+    stack: list[tuple[Any, str, Optional[dict], int]] = []
+    suites: list[dict] = []
+    test: Optional[dict] = None
+    depth = 0                 # profondeur de keyword courante sous le test / la suite
+    in_statistics = False
+
+    for event, elem in events:
+        tag = elem.tag
+        if tag not in _TRACKED_TAGS:
+            continue
+        if tag == "statistics":
+            in_statistics = event == "start"
+            continue
+        if in_statistics:
+            continue   # statistiques recalculées à partir des tests
+
+        if event == "start":
+            if tag == "robot":
+                result["generator"] = elem.get("generator")
+                result["generated"] = elem.get("generated")
+            elif tag == "suite":
+                parent = suites[-1]["longname"] + "." if suites else ""
+                suite  = {"name": elem.get("name"), "longname": parent + (elem.get("name") or ""),
+                          "source": elem.get("source"), "status": None, "message": "",
+                          "elapsed_s": 0.0, "stats": _empty_stats(), "keywords": [], "suites": []}
+                suites.append(suite)
+                stack.append((elem, "suite", suite, 0))
+                depth = 0
+            elif tag == "test":
+                test = {"name": elem.get("name"),
+                        "longname": f"{suites[-1]['longname']}.{elem.get('name')}",
+                        "suite": suites[-1]["longname"], "source": suites[-1]["source"],
+                        "line": int(elem.get("line")) if elem.get("line") else None,
+                        "tags": [], "status": None, "message": "", "start": None,
+                        "elapsed_s": 0.0, "keywords": [], "failed_keyword": None}
+                stack.append((elem, "test", test, 0))
+                depth = 0
+            elif stack:
+                frame = _keyword_frame(elem) if depth < keyword_depth else None
+                stack.append((elem, "keyword", frame, depth))
+                depth += 1
+            continue
+
+        # ── event == "end" ───────────────────────────────────────────────
+        if tag == "errors":
+            result["errors"] = [{"level": msg.get("level"),
+                                 "time": msg.get("time") or msg.get("timestamp"),
+                                 "message": msg.text or ""} for msg in elem.iter("msg")]
+        if not stack or stack[-1][0] is not elem:
+            continue
+
+        _, kind, frame, level = stack.pop()
+        status = elem.find("status")
+        state  = status.get("status") if status is not None else None
+        failed = state == "FAIL"
+
+        if kind == "keyword":
+            depth = level
+            if failed and test is not None and test["failed_keyword"] is None:
+                names = [_keyword_name(e) for e, k, _, _ in stack if k == "keyword"]
+                test["failed_keyword"] = {"name": _keyword_name(elem), "args": _args(elem),
+                                          "message": status.text or "",
+                                          "path": " > ".join(names + [_keyword_name(elem)])}
+            if frame is not None:
+                frame.update(status=state, elapsed_s=_elapsed(status) if status is not None else 0.0)
+                if elem.tag == "kw":
+                    frame["args"] = _args(elem)
+                if failed:
+                    frame["message"] = status.text or ""
+                stack[-1][2].setdefault("keywords", []).append(frame)
+
+        elif kind == "test":
+            frame.update(status=state, message=status.text or "", elapsed_s=_elapsed(status),
+                         start=status.get("start") or status.get("starttime"),
+                         tags=[t.text or "" for t in elem.findall("tag")])
+            _count(result["stats"], state)
+            for suite in suites:
+                _count(suite["stats"], state)
+            if not failed_only or state != "PASS":
+                result["tests"].append(frame)
+            test = None
+
+        else:  # suite
+            frame.update(status=state, message=(status.text or "") if status is not None else "",
+                         elapsed_s=_elapsed(status) if status is not None else 0.0)
+            suites.pop()
+            if suites:
+                suites[-1]["suites"].append(frame)
+            else:
+                result["suite"]     = frame
+                result["elapsed_s"] = frame["elapsed_s"]
+
+        # Libère le sous-arbre déjà traité et le détache de son parent
+        elem.clear()
+        if stack:
+            stack[-1][0].remove(elem)
+
+    return result
+
+
+def failed_tests(results: dict) -> list[dict]:
+    """Tests en échec avec message et keyword fautif (pour les rapports d'agent)."""
+    return [
+        {"longname": t["longname"], "message": t["message"], "elapsed_s": t["elapsed_s"],
+         "failed_keyword": t["failed_keyword"]}
+        for t in results["tests"] if t["status"] == "FAIL"
+    ]
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+    import time
+
+    parser = argparse.ArgumentParser(description="Résultats structurés d'un output.xml Robot Framework")
+    parser.add_argument("output_xml")
+    parser.add_argument("--depth", type=int, default=1, help="Niveaux de keywords conservés")
+    parser.add_argument("--failed", action="store_true", help="Uniquement les tests en échec")
+    args = parser.parse_args()
+
+    t0      = time.perf_counter()
+    results = parse_output_xml(args.output_xml, args.depth, args.failed)
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+    print(f"# {results['stats']} — lu en {time.perf_counter() - t0:.2f}s")
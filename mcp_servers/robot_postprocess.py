@@ -0,0 +1,276 @@
+"""
+Robot Postprocess — Corrections automatiques des suites générées
+=================================================================
+Appliqué par les agents de génération avant d'écrire un fichier .robot :
+
+  • `Sleep <durée>` → `Wait For UI Idle` (UiSyncLibrary : attente de la
+    stabilité de l'interface au lieu d'une pause fixe)
+  • session Appium par suite : l'ouverture de l'application (Test Setup ou
+    premier pas de chaque test) passe en `Suite Setup`, la fermeture en
+    `Suite Teardown`, et `Test Setup    Reset App State` (AppSessionLibrary)
+    relance l'application entre les tests
+  • écran de départ : si la page testée (`test_<page>.robot`) est déclarée
+    dans tests/resources/screens.json, `Test Setup    Start On Screen    <page>`
+    (NavigationLibrary) relance l'application et y navigue en un appel
+  • import des librairies ajouté dans `*** Settings ***`, avec un chemin
+    relatif au fichier généré
+
+Usage:
+    content, notes = postprocess_suite(content, Path("agents/tests/suites/menu/test_menu.robot"))
+"""
+
+import os
+import re
+import json
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+UI_SYNC_LIBRARY     = PROJECT_ROOT / "tests" / "resources" / "libraries" / "UiSyncLibrary.py"
+APP_SESSION_LIBRARY = PROJECT_ROOT / "tests" / "resources" / "libraries" / "AppSessionLibrary.py"
+NAVIGATION_LIBRARY  = PROJECT_ROOT / "tests" / "resources" / "libraries" / "NavigationLibrary.py"
+SCREENS_FILE        = PROJECT_ROOT / "tests" / "resources" / "screens.json"
+
+RESET_KEYWORD = "Reset App State"
+START_KEYWORD = "Start On Screen"
+
+_SLEEP    = re.compile(r"^([ \t]+)(?:BuiltIn\.)?Sleep(?:[ \t]{2,}|\t)\S.*$", re.IGNORECASE | re.MULTILINE)
+_SETTINGS = re.compile(r"^\*{3}\s*Settings?\s*\*{3}[^\n]*\n", re.IGNORECASE | re.MULTILINE)
+_SECTION  = re.compile(r"^\*{3}", re.MULTILINE)
+_LIBRARY  = re.compile(r"^Library[ \t]{2,}|^Library\t", re.IGNORECASE)
+_CELLS    = re.compile(r"[ \t]{2,}|\t")
+_FIXTURE  = re.compile(r"^(Suite|Test)[ \t]+(Setup|Teardown)\b", re.IGNORECASE)
+
+# Keywords qui ouvrent la session Appium — pas les keywords de navigation
+# (« Open Mapping Page », « Open Happy Hour Screen ») ; un keyword utilisateur
+# qui appelle l'un d'eux ouvre aussi la session (session_openers)
+SESSION_KEYWORDS = ("Open Application", "Open FoodApp", "Reset And Open FoodApp",
+                    "Open Application For Tests")
+_CLOSE_APP = re.compile(r"^close\b.*app", re.IGNORECASE)
+
+_RESET_SETUP = re.compile(rf"^Test[ \t]+Setup(?:[ \t]{{2,}}|\t){RESET_KEYWORD}[ \t]*$",
+                          re.IGNORECASE | re.MULTILINE)
+
+
+def library_reference(library: Path, suite_path: Path) -> str:
+    """Chemin de la librairie relatif au fichier .robot (absolu si autre lecteur)."""
+    try:
+        return Path(os.path.relpath(library, Path(suite_path).resolve().parent)).as_posix()
+    except ValueError:
+        return library.as_posix()
+
+
+def ensure_library(content: str, reference: str) -> str:
+    """Ajoute `Library    <reference>` à la section Settings (créée si absente)."""
+    name = Path(reference).stem
+    if re.search(rf"^Library[ \t]+\S*{re.escape(name)}(\.py)?\b", content, re.MULTILINE):
+        return content
+    line = f"Library           {reference}\n"
+
+    header = _SETTINGS.search(content)
+    if header is None:
+        return f"*** Settings ***\n{line}\n{content}"
+    end     = _SECTION.search(content, header.end())
+    section = content[header.end():end.start() if end else len(content)]
+    lines   = section.splitlines(keepends=True)
+    # Après le dernier import Library (et ses continuations `...`), sinon en tête de section
+    position = 0
+    for index, current in enumerate(lines):
+        if _LIBRARY.match(current):
+            position = index + 1
+        elif position == index and current.lstrip().startswith("..."):
+            position = index + 1
+    lines.insert(position, line)
+    return content[:header.end()] + "".join(lines) + content[header.end() + len(section):]
+
+
+def replace_fixed_sleeps(content: str, suite_path: Path) -> tuple[str, int]:
+    """`Sleep` → `Wait For UI Idle` ; retourne le contenu et le nombre de remplacements."""
+    content, count = _SLEEP.subn(r"\1Wait For UI Idle", content)
+    if count:
+        content = ensure_library(content, library_reference(UI_SYNC_LIBRARY, suite_path))
+    return content, count
+
+
+def _cells(line: str) -> list[str]:
+    return [cell for cell in _CELLS.split(line.strip()) if cell]
+
+
+def _normalize(keyword: str) -> str:
+    """Nom de keyword comparable à la façon de Robot (casse, espaces, `_`, préfixe de librairie)."""
+    return re.sub(r"[\s_]", "", keyword.rsplit(".", 1)[-1]).lower()
+
+
+_SESSION_NAMES = frozenset(_normalize(name) for name in SESSION_KEYWORDS)
+
+
+def session_openers(content: str) -> frozenset:
+    """
+    Noms normalisés des keywords ouvrant la session : SESSION_KEYWORDS et
+    keywords de la section Keywords de `content` qui en appellent un.
+    """
+    lines = content.splitlines(keepends=True)
+    start, end = _section(lines, "Keyword")
+    steps, name = {}, None
+    for line in lines[start:end] if start >= 0 else []:
+        if not line.strip() or line.lstrip().startswith("#"):
+            continue
+        if not line[0].isspace():
+            name = _normalize(line.strip())
+            steps[name] = set()
+            continue
+        cells = _cells(line)
+        if name and not cells[0].startswith("[") and cells[0] != "...":
+            steps[name].add(_normalize(cells[0]))
+
+    openers = set(_SESSION_NAMES)
+    while True:
+        found = {keyword for keyword, called in steps.items() if keyword not in openers and called & openers}
+        if not found:
+            return frozenset(openers)
+        openers |= found
+
+
+def opens_session(keyword: str, openers: frozenset = _SESSION_NAMES) -> bool:
+    return _normalize(keyword) in openers
+
+
+def _section(lines: list[str], name: str) -> tuple[int, int]:
+    """Indices [début, fin[ du contenu d'une section (-1, -1 si absente)."""
+    start = next((i + 1 for i, line in enumerate(lines)
+                  if re.match(rf"^\*{{3}}\s*{name}s?\s*\*{{3}}", line, re.IGNORECASE)), -1)
+    if start < 0:
+        return -1, -1
+    end = next((i for i in range(start, len(lines)) if lines[i].startswith("***")), len(lines))
+    return start, end
+
+
+def _setting(name: str, value: str) -> str:
+    return f"{name:<18}{value}\n"
+
+
+def _test_openers(lines: list[str], session_keywords: frozenset) -> list[int]:
+    """
+    Lignes d'ouverture de l'application en premier pas de chaque test
+    (sans argument) ; liste vide si un test n'en a pas.
+    """
+    start, end = _section(lines, "Test Case")
+    if start < 0:
+        return []
+    openers, in_test, expecting = [], False, False
+    for index in range(start, end):
+        line = lines[index]
+        if not line.strip() or line.lstrip().startswith("#"):
+            continue
+        if not line[0].isspace():                       # nouveau test
+            if in_test and expecting:
+                return []
+            in_test, expecting = True, True
+            continue
+        cells = _cells(line)
+        if not expecting or cells[0].startswith("[") or cells[0] == "...":
+            continue
+        expecting = False
+        follows = next((lines[j] for j in range(index + 1, end) if lines[j].strip()), "")
+        if len(cells) != 1 or not opens_session(cells[0], session_keywords) or follows.strip().startswith("..."):
+            return []
+        openers.append(index)
+    return [] if not in_test or expecting else openers
+
+
+def enforce_suite_session(content: str, suite_path: Path) -> tuple[str, bool]:
+    """
+    Une session Appium par suite : ouverture en Suite Setup, fermeture en
+    Suite Teardown, `Reset App State` en Test Setup. Retourne (contenu, modifié).
+    """
+    lines = content.splitlines(keepends=True)
+    start, end = _section(lines, "Setting")
+    if start < 0:
+        return content, False
+    fixtures = {}
+    for index in range(start, end):
+        match = _FIXTURE.match(lines[index])
+        if match:
+            fixtures[f"{match.group(1)} {match.group(2)}".title()] = index
+    if "Suite Setup" in fixtures:
+        # Déjà une session par suite : seulement l'import si la remise à zéro est utilisée
+        if RESET_KEYWORD in content:
+            content = ensure_library(content, library_reference(APP_SESSION_LIBRARY, suite_path))
+        return content, False
+
+    removed: set[int] = set()
+    session_keywords = session_openers(content)
+    # Fin de la section Settings, hors lignes vides : point d'insertion
+    position = end
+    while position > start and not lines[position - 1].strip():
+        position -= 1
+
+    # Ouverture : Test Setup existant ou premier pas de chaque test
+    test_setup = fixtures.get("Test Setup")
+    if test_setup is not None:
+        cells = _cells(lines[test_setup])
+        if len(cells) < 2 or not opens_session(cells[1], session_keywords):
+            return content, False
+        opener = None
+        lines[test_setup] = _setting("Suite Setup", "    ".join(cells[1:]))
+    else:
+        openers = _test_openers(lines, session_keywords)
+        if not openers or len({_cells(lines[i])[0] for i in openers}) != 1:
+            return content, False
+        opener = _cells(lines[openers[0]])[0]
+        removed.update(openers)
+
+    # Fermeture : Test Teardown ou [Teardown] des tests
+    closing = None
+    for index, line in enumerate(lines):
+        cells = _cells(line)
+        if len(cells) == 2 and _CLOSE_APP.match(cells[1]) and (
+                cells[0].lower() == "[teardown]"
+                or index == fixtures.get("Test Teardown")):
+            closing = closing or cells[1]
+            removed.add(index)
+
+    added = [_setting("Suite Setup", opener)] if opener else []
+    if "Suite Teardown" not in fixtures:
+        added.append(_setting("Suite Teardown", closing or "Close Application"))
+    added.append(_setting("Test Setup", RESET_KEYWORD))
+
+    lines   = [line for index, line in enumerate(lines[:position]) if index not in removed] + added \
+              + [line for index, line in enumerate(lines[position:], position) if index not in removed]
+    content = "".join(lines)
+    return ensure_library(content, library_reference(APP_SESSION_LIBRARY, suite_path)), True
+
+
+def suite_screen(suite_path: Path):
+    """Écran déclaré pour la page testée par `test_<page>.robot`, ou None."""
+    page = Path(suite_path).stem.lower().removeprefix("test_")
+    if not SCREENS_FILE.exists():
+        return None
+    return page if page in json.loads(SCREENS_FILE.read_text(encoding="utf-8")) else None
+
+
+def use_screen_navigation(content: str, suite_path: Path) -> tuple[str, bool]:
+    """`Test Setup    Reset App State` → `Start On Screen    <page>` si l'écran est déclaré."""
+    screen = suite_screen(suite_path)
+    if screen is None or not _RESET_SETUP.search(content):
+        return content, False
+    content = _RESET_SETUP.sub(_setting("Test Setup", f"{START_KEYWORD}    {screen}").rstrip("\n"),
+                               content, count=1)
+    for library in (UI_SYNC_LIBRARY, NAVIGATION_LIBRARY):
+        content = ensure_library(content, library_reference(library, suite_path))
+    return content, True
+
+
+def postprocess_suite(content: str, suite_path: Path) -> tuple[str, list[str]]:
+    """Applique toutes les corrections à un fichier généré ; retourne (contenu, notes)."""
+    notes = []
+    content, sleeps = replace_fixed_sleeps(content, suite_path)
+    if sleeps:
+        notes.append(f"{sleeps} Sleep remplacé(s) par Wait For UI Idle")
+    content, suite_session = enforce_suite_session(content, suite_path)
+    if suite_session:
+        notes.append(f"Session Appium ouverte une fois par suite, {RESET_KEYWORD} entre les tests")
+    content, navigation = use_screen_navigation(content, suite_path)
+    if navigation:
+        notes.append(f"Chaque test démarre sur l'écran '{suite_screen(suite_path)}' ({START_KEYWORD})")
+    return content, notes
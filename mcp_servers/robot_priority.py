@@ -0,0 +1,175 @@
+"""
+Robot Priority — Ordonnancement fail-fast à partir de l'historique
+==================================================================
+Réordonne l'exécution pour que les tests les plus susceptibles d'échouer
+tournent en premier : l'agent reçoit un signal (premier échec) dans la
+première minute au lieu de la fin d'une régression de 20 minutes.
+
+Score d'un test = probabilité d'échec estimée / durée attendue
+(échecs attendus par seconde), avec :
+  • probabilité : échecs récents pondérés (décroissance géométrique) + a priori
+  • locator modifié depuis le dernier PASS du test → probabilité relevée
+  • durée : moyenne mobile des exécutions précédentes
+
+Historique lu dans history_store (base SQLite unique, alimentée par robot_jobs
+à la fin de chaque job) ; l'instantané des locators y est aussi conservé.
+
+L'ordre est appliqué par un pre-run modifier Robot (robot_priority_modifier.py) :
+tests triés dans chaque suite, suites triées par leur meilleur test — les
+setups / teardowns de suite sont conservés.
+
+Usage:
+    plan = prioritize(["tests/suites"])          # [{"key", "score", ...}, ...]
+    args = prerun_args(plan, job_dir)            # --prerunmodifier pour robot
+"""
+
+import json
+import time
+from pathlib import Path
+from typing import Iterable, Optional
+
+from history_store import HistoryStore, test_id
+from robot_impact import ImpactIndex
+from robot_resources import iter_robot_files, list_test_cases
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+MODIFIER_PATH = Path(__file__).resolve().parent / "robot_priority_modifier.py"
+
+HISTORY_LENGTH       = 20     # derniers statuts conservés par test
+RECENCY_DECAY        = 0.7    # poids d'un run par rapport au suivant, plus récent
+PRIOR_FAILURE        = 0.3    # probabilité a priori (test jamais exécuté)
+PRIOR_WEIGHT         = 1.0    # poids de l'a priori, en nombre de runs
+CHANGED_LOCATOR_PROB = 0.8    # plancher si un locator du test a changé depuis son dernier PASS
+DEFAULT_DURATION_S   = 30.0
+MIN_DURATION_S       = 1.0
+DURATION_SMOOTHING   = 0.5
+
+
+# ============================================================================
+# HISTORIQUE
+# ============================================================================
+
+def test_key(source: str, name: str) -> str:
+    """Clé stable d'un test : `chemin/relatif.robot::Nom du test`."""
+    path = Path(source).resolve()
+    try:
+        relative = path.relative_to(PROJECT_ROOT).as_posix()
+    except ValueError:
+        relative = path.as_posix()
+    return f"{relative}::{name}"
+
+
+def _test_history(entry: dict) -> dict:
+    """
+    Historique d'un test (HistoryStore.runs_by_test) → statuts `PFS…`,
+    durée lissée des exécutions non ignorées et date du dernier PASS.
+    """
+    runs, duration = "", None
+    for run in entry.get("runs", []):
+        runs += run["status"][0]
+        if run["status"] == "SKIP" or run["duration_s"] is None:
+            continue
+        duration = round(run["duration_s"] if duration is None else
+                         DURATION_SMOOTHING * run["duration_s"]
+                         + (1 - DURATION_SMOOTHING) * duration, 3)
+    return {"runs": runs, "duration_s": duration, "last_pass": entry.get("last_pass")}
+
+
+def failure_probability(runs: str) -> float:
+    """Échecs récents pondérés (le plus récent pèse 1, puis ×RECENCY_DECAY) lissés par l'a priori."""
+    weight, failures, total = 1.0, 0.0, 0.0
+    for status in reversed(runs.replace("S", "")):
+        failures += weight * (status == "F")
+        total    += weight
+        weight   *= RECENCY_DECAY
+    return (failures + PRIOR_FAILURE * PRIOR_WEIGHT) / (total + PRIOR_WEIGHT)
+
+
+# ============================================================================
+# LOCATORS MODIFIÉS
+# ============================================================================
+
+def _changed_locators(index: ImpactIndex, snapshot: dict, now: float) -> dict[str, float]:
+    """
+    Compare les valeurs actuelles des variables au dernier instantané : une
+    valeur différente est datée de `now`. Retourne {variable: date du changement}.
+    Le premier instantané ne marque rien comme modifié.
+    """
+    first = not snapshot
+    for node, value in index.variables.items():
+        key = test_key(str(node[1]), index.labels[node])
+        if key not in snapshot:
+            snapshot[key] = {"value": value, "changed_at": 0 if first else now}
+        elif snapshot[key]["value"] != value:
+            snapshot[key] = {"value": value, "changed_at": now}
+    return {key: entry["changed_at"] for key, entry in snapshot.items() if entry["changed_at"]}
+
+
+# ============================================================================
+# PLANIFICATION
+# ============================================================================
+
+def prioritize(paths: Iterable, now: Optional[float] = None,
+               persist: bool = True, store: Optional[HistoryStore] = None) -> list[dict]:
+    """
+    Tests sous `paths` triés par score décroissant (échecs attendus / seconde).
+    Met à jour l'instantané des locators dans l'historique ; `persist=False`
+    calcule le même plan sans rien écrire (aperçu en lecture seule).
+    """
+    now   = now or time.time()
+    paths = list(paths)
+    own   = store is None
+    store = store or HistoryStore()
+    try:
+        history  = store.runs_by_test(HISTORY_LENGTH)
+        snapshot = store.locator_snapshot()
+        index    = ImpactIndex(paths)
+        changed  = _changed_locators(index, snapshot, now)
+        if persist:
+            store.save_locator_snapshot(snapshot)
+    finally:
+        if own:
+            store.close()
+
+    # Date du changement le plus récent de chaque locator dont dépend un test
+    touched: dict[str, float] = {}
+    for key, changed_at in changed.items():
+        name = key.split("::", 1)[1]
+        for test in index.impacted_tests(changed_locators=[name]):
+            impacted = test_key(test["file"], test["name"])
+            touched[impacted] = max(touched.get(impacted, 0), changed_at)
+
+    plan = []
+    for file in iter_robot_files(paths):
+        for name in list_test_cases(file):
+            key   = test_key(str(file), name)
+            entry = _test_history(history.get(test_id(name), {}))
+            prob  = failure_probability(entry["runs"])
+            locator_changed = touched.get(key, 0) > (entry["last_pass"] or 0)
+            if locator_changed:
+                prob = max(prob, CHANGED_LOCATOR_PROB)
+            duration = entry["duration_s"] or DEFAULT_DURATION_S
+            plan.append({
+                "key":             key,
+                "file":            str(file),
+                "name":            name,
+                "failure_prob":    round(prob, 3),
+                "locator_changed": locator_changed,
+                "duration_s":      duration,
+                "score":           round(prob / max(duration, MIN_DURATION_S), 5),
+                "history":         entry["runs"],
+            })
+    return sorted(plan, key=lambda t: t["score"], reverse=True)
+
+
+def prerun_args(plan: list[dict], job_dir: Path) -> list[str]:
+    """
+    Écrit les scores dans le dossier du job (supprimés avec lui) et retourne
+    l'option --prerunmodifier associée.
+    """
+    order_file = Path(job_dir) / "priority_order.json"
+    order_file.parent.mkdir(parents=True, exist_ok=True)
+    order_file.write_text(json.dumps({t["key"]: t["score"] for t in plan}, ensure_ascii=False),
+                          encoding="utf-8")
+    return ["--prerunmodifier", f"{MODIFIER_PATH};{order_file}"]
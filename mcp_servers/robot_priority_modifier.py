@@ -0,0 +1,42 @@
+"""
+Robot Priority Modifier — Réordonnancement des tests avant exécution
+====================================================================
+Pre-run modifier Robot Framework utilisé par robot_priority : trie les tests
+de chaque suite par score décroissant, puis les sous-suites par le meilleur
+score qu'elles contiennent. Les tests absents du fichier de scores gardent
+leur ordre relatif, après les tests notés.
+
+Usage:
+    python -m robot --prerunmodifier "robot_priority_modifier.py;order.json" suites/
+"""
+
+import json
+from pathlib import Path
+
+from robot.api import SuiteVisitor
+
+from robot_priority import test_key
+
+
+class RobotPriorityModifier(SuiteVisitor):
+    """Trie tests et suites selon les scores de robot_priority."""
+
+    def __init__(self, order_file: str):
+        self.scores = json.loads(Path(order_file).read_text(encoding="utf-8"))
+
+    def _score(self, test) -> float:
+        return self.scores.get(test_key(str(test.source), test.name), 0.0)
+
+    def _best(self, suite) -> float:
+        return max([self._score(t) for t in suite.all_tests] or [0.0])
+
+    def start_suite(self, suite):
+        suite.tests = sorted(suite.tests, key=self._score, reverse=True)
+        suite.suites = sorted(suite.suites, key=self._best, reverse=True)
+
+    def visit_test(self, test):
+        pass
+
+
+# Nom de module = nom de classe attendu par `--prerunmodifier robot_priority_modifier.py`
+robot_priority_modifier = RobotPriorityModifier
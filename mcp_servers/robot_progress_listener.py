@@ -0,0 +1,77 @@
+"""
+Robot Progress Listener — Événements d'exécution en temps réel
+==============================================================
+Listener Robot Framework (API v3) attaché aux jobs lancés par le serveur MCP.
+Chaque début/fin de suite et de test est ajouté immédiatement (flush) à un
+fichier JSON Lines, lu au fil de l'eau par get_robot_job_status et
+watch_robot_job pour diffuser la progression au client MCP.
+
+Usage:
+    python -m robot --listener "robot_progress_listener.py;events.jsonl" suite.robot
+
+Format d'une ligne :
+    {"event": "end_test", "name": "...", "status": "FAIL", "message": "...",
+     "elapsed_s": 3.2, "time": 1760000000.0, "done": 4, "total": 12}
+"""
+
+import json
+import time
+from pathlib import Path
+
+
+class RobotProgressListener:
+    """Écrit un événement JSON par début/fin de suite et de test."""
+
+    ROBOT_LISTENER_API_VERSION = 3
+
+    def __init__(self, events_file: str):
+        self.path   = Path(events_file)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file  = open(self.path, "a", encoding="utf-8")
+        self._depth = 0
+        self._total = 0
+        self._done  = 0
+
+    def _emit(self, event: str, **fields) -> None:
+        record = {"event": event, "time": round(time.time(), 3),
+                  "done": self._done, "total": self._total, **fields}
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+
+    # ── Suites ────────────────────────────────────────────────────────────
+
+    def start_suite(self, data, result):
+        if self._depth == 0:
+            self._total = data.test_count
+        self._depth += 1
+        self._emit("start_suite", name=data.name, longname=result.full_name,
+                   source=str(data.source or ""))
+
+    def end_suite(self, data, result):
+        self._depth -= 1
+        self._emit("end_suite", name=data.name, longname=result.full_name,
+                   source=str(data.source or ""),
+                   status=result.status, message=result.message,
+                   elapsed_s=round(result.elapsed_time.total_seconds(), 3),
+                   top_level=self._depth == 0)
+
+    # ── Tests ─────────────────────────────────────────────────────────────
+
+    def start_test(self, data, result):
+        self._emit("start_test", name=data.name, longname=result.full_name,
+                   tags=list(data.tags))
+
+    def end_test(self, data, result):
+        self._done += 1
+        self._emit("end_test", name=data.name, longname=result.full_name,
+                   source=str(data.source or ""),
+                   status=result.status, message=result.message,
+                   elapsed_s=round(result.elapsed_time.total_seconds(), 3),
+                   tags=list(result.tags))
+
+    def close(self):
+        self._file.close()
+
+
+# Nom de module = nom de classe attendu par `--listener robot_progress_listener.py`
+robot_progress_listener = RobotProgressListener
@@ -0,0 +1,35 @@
+"""
+Robot Quarantine Modifier — Marquage des tests en quarantaine
+=============================================================
+Pre-run modifier Robot Framework utilisé par failure_classifier : ajoute le
+tag QUARANTINE_TAG aux tests en quarantaine (identité history_store : code
+TC-… ou nom). Associé à `--skiponfailure quarantine`, un test en quarantaine
+tourne toujours mais son échec devient SKIP et ne bloque plus le run.
+
+Usage:
+    python -m robot --prerunmodifier "robot_quarantine_modifier.py;quarantine.json" \
+                    --skiponfailure quarantine suites/
+"""
+
+import json
+from pathlib import Path
+
+from robot.api import SuiteVisitor
+
+from failure_classifier import QUARANTINE_TAG
+from history_store import test_id
+
+
+class RobotQuarantineModifier(SuiteVisitor):
+    """Tague les tests listés dans le fichier de quarantaine."""
+
+    def __init__(self, quarantine_file: str):
+        self.tests = set(json.loads(Path(quarantine_file).read_text(encoding="utf-8")))
+
+    def visit_test(self, test):
+        if test_id(test.name) in self.tests:
+            test.tags.add(QUARANTINE_TAG)
+
+
+# Nom de module = nom de classe attendu par `--prerunmodifier robot_quarantine_modifier.py`
+robot_quarantine_modifier = RobotQuarantineModifier
@@ -0,0 +1,149 @@
+"""
+Robot Resources — Lecture des fichiers .robot / .resource
+==========================================================
+Parseur léger (sans dépendance à Robot Framework) des fichiers Robot :
+  • `*** Variables ***` : chaque variable scalaire avec sa valeur, son fichier
+    et sa ligne, en repérant celles qui contiennent un locator
+  • `*** Test Cases ***` / `*** Keywords ***` : blocs nommés et leurs lignes
+  • `*** Settings ***` : imports et setups / teardowns de suite
+
+Usage:
+    for var in iter_locator_variables(["tests/resources"]):
+        print(var.name, var.locator, f"{var.path}:{var.line}")
+"""
+
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterable, Iterator
+
+ROBOT_SUFFIXES = (".robot", ".resource")
+
+_SECTION        = re.compile(r"^\*{1,3}\s*(\w[\w ]*?)\s*\*{0,3}\s*$")
+_CELL_SEPARATOR = re.compile(r"\s{2,}|\t")
+_SCALAR_NAME    = re.compile(r"^\$\{([^}]+)\}\s*=?$")
+_ROBOT_ESCAPES  = {"n": "\n", "t": "\t", "r": "\r"}
+
+# Préfixes AppiumLibrary qui identifient une valeur comme locator
+_LOCATOR_PREFIXES = ("id=", "accessibility_id=", "accessibility id=", "xpath=",
+                     "android=", "class=", "//", "(//")
+
+
+@dataclass
+class RobotBlock:
+    """Test case ou keyword : nom, ligne de déclaration et lignes du corps (découpées en cellules)."""
+    name: str
+    path: str
+    line: int
+    body: list = field(default_factory=list)   # [(numéro de ligne, [cellules])]
+
+
+@dataclass
+class RobotVariable:
+    """Variable scalaire déclarée dans une section *** Variables ***."""
+    name:  str          # sans ${ }
+    value: str          # valeur brute, telle qu'écrite dans le fichier
+    path:  str
+    line:  int
+
+    @property
+    def locator(self) -> str:
+        """Valeur après interprétation des échappements Robot (`\\n` → saut de ligne)."""
+        return unescape(self.value)
+
+    @property
+    def is_locator(self) -> bool:
+        return self.value.lower().startswith(_LOCATOR_PREFIXES)
+
+
+def unescape(value: str) -> str:
+    """Interprète les séquences d'échappement Robot Framework (`\\n`, `\\t`, `\\\\`…)."""
+    return re.sub(r"\\(.)", lambda m: _ROBOT_ESCAPES.get(m.group(1), m.group(1)), value)
+
+
+def iter_robot_files(paths: Iterable) -> Iterator[Path]:
+    """Fichiers .robot / .resource sous les chemins donnés (ordre trié, sans doublon)."""
+    seen = set()
+    for path in map(Path, paths):
+        files = [path] if path.is_file() else sorted(
+            p for p in path.rglob("*") if p.suffix in ROBOT_SUFFIXES)
+        for file in files:
+            if file.suffix in ROBOT_SUFFIXES and file.resolve() not in seen:
+                seen.add(file.resolve())
+                yield file
+
+
+def _sections(path) -> Iterator[tuple[str, int, str]]:
+    """(section en minuscules, numéro de ligne, ligne) pour chaque ligne du fichier."""
+    section = None
+    for number, raw in enumerate(Path(path).read_text(encoding="utf-8").splitlines(), 1):
+        line = raw.rstrip()
+        if m := _SECTION.match(line):
+            section = m.group(1).strip().lower()
+            continue
+        yield section, number, line
+
+
+def parse_blocks(path, section: str = "test cases") -> list[RobotBlock]:
+    """
+    Blocs nommés d'une section (`test cases`, `tasks` ou `keywords`) :
+    un nom en colonne 0 ouvre un bloc, les lignes indentées forment son corps.
+    Les continuations `...` sont rattachées à la ligne précédente.
+    """
+    aliases = {"test cases": ("test cases", "test case", "tasks", "task"),
+               "keywords":   ("keywords", "keyword")}[section]
+    blocks: list[RobotBlock] = []
+    for current, number, line in _sections(path):
+        if current not in aliases or not line.strip() or line.lstrip().startswith("#"):
+            continue
+        if not line[0].isspace():
+            name = _CELL_SEPARATOR.split(line.strip(), maxsplit=1)[0]
+            blocks.append(RobotBlock(name, str(path), number))
+        elif blocks:
+            cells = [c for c in _CELL_SEPARATOR.split(line.strip()) if c]
+            if cells and cells[0] == "..." and blocks[-1].body:
+                blocks[-1].body[-1][1].extend(cells[1:])
+            else:
+                blocks[-1].body.append((number, cells))
+    return blocks
+
+
+def list_test_cases(path) -> list[str]:
+    """Noms des test cases d'un fichier .robot (ordre du fichier)."""
+    return [block.name for block in parse_blocks(path, "test cases")]
+
+
+def parse_settings(path) -> list[tuple[int, list[str]]]:
+    """Lignes de la section *** Settings *** découpées en cellules (continuations `...` fusionnées)."""
+    settings: list[tuple[int, list[str]]] = []
+    for section, number, line in _sections(path):
+        if section not in ("settings", "setting") or not line.strip() or line.lstrip().startswith("#"):
+            continue
+        cells = [c for c in _CELL_SEPARATOR.split(line.strip()) if c]
+        if cells[0] == "..." and settings:
+            settings[-1][1].extend(cells[1:])
+        else:
+            settings.append((number, cells))
+    return settings
+
+
+def parse_variables(path) -> list[RobotVariable]:
+    """Variables scalaires `${NAME}    valeur` de la section *** Variables ***."""
+    variables = []
+    for section, number, line in _sections(path):
+        if section not in ("variables", "variable") or not line.startswith("${"):
+            continue
+        cells = _CELL_SEPARATOR.split(line.strip(), maxsplit=1)
+        name  = _SCALAR_NAME.match(cells[0].strip())
+        if name and len(cells) == 2:
+            value = cells[1].split("    #")[0].strip()
+            variables.append(RobotVariable(name.group(1), value, str(path), number))
+    return variables
+
+
+def iter_locator_variables(paths: Iterable) -> Iterator[RobotVariable]:
+    """Toutes les variables-locators des fichiers Robot trouvés sous `paths`."""
+    for file in iter_robot_files(paths):
+        for variable in parse_variables(file):
+            if variable.is_locator:
+                yield variable
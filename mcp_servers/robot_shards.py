@@ -0,0 +1,334 @@
+"""
+Robot Shards — Exécution parallèle de la régression sur plusieurs devices
+==========================================================================
+Découpe les suites (ou les tests) en N shards, un par device / endpoint
+Appium, équilibrés par durée historique (LPT : plus long d'abord vers le
+shard le moins chargé). Chaque shard est un job robot_jobs indépendant ;
+quand tous sont terminés, les output.xml sont fusionnés avec rebot et les
+durées mesurées alimentent l'historique pour le prochain découpage.
+
+Devices : liste [{"appium_url": ..., "device_name": ...}] ou variable
+ROBOT_DEVICES="http://127.0.0.1:4723|emulator-5554,http://127.0.0.1:4725|emulator-5556".
+
+  • Registre configuré (device_leases) : chaque shard est lancé sous bail et
+    reçoit le device loué (DEVICE_NAME, UDID, SYSTEM_PORT, APPIUM_URL) ;
+    un shard sans device libre attend son tour
+  • Sinon : le shard i reçoit le device i — `--variable APPIUM_URL:<url>
+    --variable DEVICE_NAME:<serial> --variable UDID:<serial>
+    --variable SYSTEM_PORT:<SYSTEM_PORT_BASE + i>` (et PLATFORM_VERSION si le
+    device est connu de device_discovery)
+  • Ni device ni registre : un seul shard — N sessions sur le même device et
+    le même systemPort se gêneraient
+
+Découpage par test (`split="tests"`) : chaque shard sélectionne ses tests par
+nom long (`--name "Shard i"`, `--test "Shard i.<Suite>.<Test>"`).
+
+Usage:
+    run = start_sharded_run(["tests/suites"], devices, output_path)
+    sharded_run_status(run["run_id"])      # fusion automatique à la fin
+"""
+
+import os
+import json
+import time
+import uuid
+import statistics
+from pathlib import Path
+from typing import Any, Callable, Iterable, Optional
+
+import robot_jobs
+import device_leases
+from robot_resources import iter_robot_files, list_test_cases
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+DURATIONS_FILE = Path(os.getenv(
+    "ROBOT_DURATIONS_FILE", PROJECT_ROOT / "results" / "durations.json"))
+
+# Durée supposée d'un test jamais exécuté (secondes)
+DEFAULT_TEST_SECONDS = float(os.getenv("ROBOT_DEFAULT_TEST_SECONDS", "30"))
+
+# Poids du dernier run dans la moyenne mobile des durées
+DURATION_SMOOTHING = 0.5
+
+
+# ============================================================================
+# HISTORIQUE DES DURÉES
+# ============================================================================
+
+def _relative(path) -> str:
+    path = Path(path).resolve()
+    try:
+        return path.relative_to(PROJECT_ROOT).as_posix()
+    except ValueError:
+        return path.as_posix()
+
+
+def load_durations() -> dict[str, float]:
+    if not DURATIONS_FILE.exists():
+        return {}
+    return json.loads(DURATIONS_FILE.read_text(encoding="utf-8"))
+
+
+def record_durations(events: Iterable[dict]) -> dict[str, float]:
+    """
+    Met à jour l'historique (moyenne mobile) avec les événements du listener :
+    clé `fichier` pour une suite, `fichier::test` pour un test.
+    """
+    durations = load_durations()
+    for event in events:
+        if event["event"] not in ("end_suite", "end_test") or not event.get("source"):
+            continue
+        if not Path(event["source"]).is_file():
+            continue  # suite répertoire : la durée est portée par ses fichiers
+        key = _relative(event["source"])
+        if event["event"] == "end_test":
+            key += f"::{event['name']}"
+        previous = durations.get(key)
+        durations[key] = round(event["elapsed_s"] if previous is None else
+                               DURATION_SMOOTHING * event["elapsed_s"]
+                               + (1 - DURATION_SMOOTHING) * previous, 3)
+    DURATIONS_FILE.parent.mkdir(parents=True, exist_ok=True)
+    DURATIONS_FILE.write_text(json.dumps(durations, indent=2, ensure_ascii=False),
+                              encoding="utf-8")
+    return durations
+
+
+# ============================================================================
+# DÉCOUPAGE
+# ============================================================================
+
+def discover_units(paths: Iterable, split: str = "suites") -> list[dict]:
+    """
+    Unités à répartir : une par fichier de suite (`split="suites"`) ou une
+    par test (`split="tests"`). Les fichiers sans test case sont ignorés.
+    """
+    units = []
+    for file in iter_robot_files(paths):
+        if file.suffix != ".robot":
+            continue
+        tests = list_test_cases(file)
+        if not tests:
+            continue
+        if split == "tests":
+            units += [{"key": f"{_relative(file)}::{t}", "file": str(file), "test": t,
+                       "tests": 1} for t in tests]
+        else:
+            units.append({"key": _relative(file), "file": str(file), "test": None,
+                          "tests": len(tests)})
+    return units
+
+
+def plan_shards(units: list[dict], shard_count: int,
+                durations: Optional[dict[str, float]] = None) -> list[dict]:
+    """
+    Répartition LPT : unités triées par durée estimée décroissante, chacune
+    affectée au shard le moins chargé. Durée inconnue → médiane par test connue
+    (ou DEFAULT_TEST_SECONDS) × nombre de tests.
+    """
+    durations = durations if durations is not None else load_durations()
+    per_test  = [v for k, v in durations.items() if "::" in k]
+    unknown   = statistics.median(per_test) if per_test else DEFAULT_TEST_SECONDS
+
+    for unit in units:
+        unit["estimated_s"] = round(durations.get(unit["key"], unknown * unit["tests"]), 3)
+
+    shards = [{"index": i, "units": [], "estimated_s": 0.0} for i in range(max(1, shard_count))]
+    for unit in sorted(units, key=lambda u: u["estimated_s"], reverse=True):
+        target = min(shards, key=lambda s: s["estimated_s"])
+        target["units"].append(unit)
+        target["estimated_s"] = round(target["estimated_s"] + unit["estimated_s"], 3)
+    return [s for s in shards if s["units"]]
+
+
+def _suite_name(file) -> str:
+    """Nom de suite que Robot dérive d'un fichier (règle de TestSuite.name_from_source)."""
+    name = Path(file).stem
+    if "__" in name:
+        name = name.split("__", 1)[1] or name
+    name = name.replace("_", " ").strip()
+    return name.title() if name.islower() else name
+
+
+def _escape_pattern(name: str) -> str:
+    """Nom littéral pour `--test` (les motifs Robot interprètent * ? et [)."""
+    return "".join(f"[{c}]" if c in "*?[" else c for c in name)
+
+
+def _shard_args(shard: dict, device: Optional[dict], robot_args: list[str]) -> list[str]:
+    """
+    Arguments robot du shard. `device` None : device choisi au lancement
+    (bail device_leases) ou endpoint par défaut des suites.
+    """
+    args = list(robot_args)
+    if device:
+        if device.get("appium_url"):
+            args += ["--variable", f"APPIUM_URL:{device['appium_url']}"]
+        if device.get("device_name"):
+            # UiAutomator2 choisit le device par `udid` ; un systemPort par session parallèle
+            args += ["--variable", f"DEVICE_NAME:{device['device_name']}",
+                     "--variable", f"UDID:{device['device_name']}"]
+        if device.get("system_port"):
+            args += ["--variable", f"SYSTEM_PORT:{device['system_port']}"]
+        if device.get("platform_version"):
+            args += ["--variable", f"PLATFORM_VERSION:{device['platform_version']}"]
+    files = list(dict.fromkeys(unit["file"] for unit in shard["units"]))
+    if any(unit["test"] for unit in shard["units"]):
+        # Sélection par nom long : un test homonyme d'un autre fichier du shard
+        # n'est pas embarqué (il tourne déjà dans un autre shard)
+        top = f"Shard {shard['index']}"
+        args += ["--name", top]
+        for unit in shard["units"]:
+            parts = [top] + ([_suite_name(unit["file"])] if len(files) > 1 else []) + [unit["test"]]
+            args += ["--test", _escape_pattern(".".join(parts))]
+    return args + files
+
+
+# ============================================================================
+# PERSISTANCE DES RUNS
+# ============================================================================
+
+def _run_file(run_id: str) -> Path:
+    return robot_jobs.JOBS_DIR / "runs" / f"{run_id}.json"
+
+
+def _save_run(run: dict) -> None:
+    path = _run_file(run["run_id"])
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(run, indent=2, ensure_ascii=False), encoding="utf-8")
+
+
+def _load_run(run_id: str) -> Optional[dict]:
+    path = _run_file(run_id)
+    if not path.exists() or "/" in run_id or "\\" in run_id:
+        return None
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+# ============================================================================
+# API
+# ============================================================================
+
+def start_sharded_run(paths: Iterable, devices: Optional[list], output_path: Path,
+                      workers: Optional[int] = None, split: str = "suites",
+                      robot_args: Optional[list[str]] = None,
+                      timeout: int = robot_jobs.DEFAULT_JOB_TIMEOUT,
+                      job_args: Optional[Callable[[Path], list[str]]] = None) -> dict[str, Any]:
+    """
+    Lance un job robot par shard, tous en parallèle.
+    Nombre de shards = nombre de devices ; sans device explicite, `workers`
+    (ou la taille du registre) shards sous bail device_leases. Sans device
+    distinct ni registre, un seul shard (`workers` ignoré, `warning`). Si tous
+    les devices demandés sont dans le registre, chaque shard loue le sien.
+    `job_args` : arguments construits dans le dossier de chaque shard (robot_jobs.start_job).
+    """
+    devices  = device_leases.parse_devices(devices)
+    units    = discover_units(paths, split)
+    if not units:
+        return {"success": False, "error": "Aucun test case trouvé"}
+
+    registry = {d["serial"] for d in device_leases.registry()}
+    leased   = bool(registry) and all(d.get("device_name") in registry for d in devices)
+    warning  = None
+    if devices:
+        shard_count = len(devices)
+    elif leased:
+        shard_count = workers or len(registry)
+    else:
+        # Un seul device (valeurs par défaut des suites) : des shards parallèles
+        # ouvriraient leur session sur le même udid et le même systemPort
+        shard_count = 1
+        if (workers or 1) > 1:
+            warning = (f"workers={workers} ignoré : aucun device distinct "
+                       f"(devices, ROBOT_DEVICES ou registre device_leases) — 1 shard")
+    shards      = plan_shards(units, shard_count)
+    run_id      = time.strftime("%Y%m%d-%H%M%S-run-") + uuid.uuid4().hex[:6]
+    run_dir     = Path(output_path) / run_id
+
+    run = {
+        "run_id":      run_id,
+        "started_at":  time.time(),
+        "split":       split,
+        "leased":      leased,
+        "warning":     warning,
+        "output_dir":  str(run_dir),
+        "merged":      None,
+        "shards":      [],
+    }
+    for shard in shards:
+        label  = f"{run_id}/shard-{shard['index']}"
+        device = None
+        if devices and not leased:
+            device = {**devices[shard["index"]],
+                      "system_port": device_leases.SYSTEM_PORT_BASE + shard["index"]}
+        job    = robot_jobs.start_job(
+            ["--nostatusrc", *_shard_args(shard, device, robot_args or [])],
+            run_dir, timeout=timeout, cwd=PROJECT_ROOT, label=label,
+            lease_owner=label if leased else None, job_args=job_args,
+        )
+        run["shards"].append({
+            "index":       shard["index"],
+            "job_id":      job["job_id"],
+            "device":      device,
+            "estimated_s": shard["estimated_s"],
+            "units":       [u["key"] for u in shard["units"]],
+        })
+    _save_run(run)
+    return sharded_run_status(run_id)
+
+
+def sharded_run_status(run_id: str) -> dict[str, Any]:
+    """
+    Statut agrégé des shards. Quand tous sont terminés : fusion rebot des
+    output.xml et mise à jour de l'historique des durées (une seule fois).
+    """
+    run = _load_run(run_id)
+    if run is None:
+        return {"success": False, "error": f"Run inconnu: {run_id}"}
+
+    statuses = [robot_jobs.job_status(s["job_id"]) for s in run["shards"]]
+    done     = all(s.get("done") for s in statuses)
+
+    if done and run["merged"] is None:
+        outputs = [s["output_xml"] for s in statuses if Path(s["output_xml"]).exists()]
+        run["merged"] = (robot_jobs.rebot(outputs, Path(run["output_dir"]) / "merged",
+                                          name="Regression")
+                         if outputs else {"error": "Aucun output.xml"})
+        for shard in run["shards"]:
+            record_durations(robot_jobs.read_events(shard["job_id"])[0])
+        run["finished_at"] = time.time()
+        _save_run(run)
+
+    totals = {k: sum(s.get(k, 0) for s in statuses) for k in ("total", "passed", "failed", "skipped")}
+    return {
+        "success":    True,
+        "run_id":     run_id,
+        "done":       done,
+        "status":     ("running" if not done else
+                       "passed" if all(s["status"] == "passed" for s in statuses) else "failed"),
+        "elapsed_s":  round((run.get("finished_at") or time.time()) - run["started_at"], 1),
+        **totals,
+        "all_passed": done and all(s["status"] == "passed" for s in statuses),
+        "shards": [
+            {**shard, "status": st.get("status"), "elapsed_s": st.get("elapsed_s"),
+             "total": st.get("total", 0), "failed": st.get("failed", 0)}
+            for shard, st in zip(run["shards"], statuses)
+        ],
+        "failed_tests": [
+            {**t, "shard": shard["index"]}
+            for shard, st in zip(run["shards"], statuses)
+            for t in st.get("tests", []) if t["status"] == "FAIL"
+        ],
+        "merged": run["merged"],
+        **({"warning": run["warning"]} if run.get("warning") else {}),
+    }
+
+
+def cancel_sharded_run(run_id: str) -> dict[str, Any]:
+    """Annule tous les shards encore en cours."""
+    run = _load_run(run_id)
+    if run is None:
+        return {"success": False, "error": f"Run inconnu: {run_id}"}
+    cancelled = [s["job_id"] for s in run["shards"]
+                 if robot_jobs.cancel_job(s["job_id"]).get("success")]
+    return {"success": True, "run_id": run_id, "cancelled_jobs": cancelled}
@@ -0,0 +1,191 @@
+"""
+Robot Timing Listener — Profil de temps par keyword et par locator
+==================================================================
+Listener Robot Framework (API v3, keywords : Robot Framework 7+) attaché aux
+jobs lancés par le serveur MCP.
+Mesure le temps de chaque appel de keyword (perf_counter, aucune écriture
+pendant l'exécution) et écrit en fin d'exécution :
+
+  • <profil>.json   : agrégats par keyword (appels, temps total, temps propre
+    hors sous-keywords, max) et par locator (`${HOME_SEARCH_BAR}` → valeur)
+  • <profil>.folded : piles « Suite;Test;Keyword;Sous-keyword µs » (format
+    replié de flamegraph.pl / speedscope / inferno)
+
+Le locator est le premier argument des keywords de bibliothèque dont le
+premier paramètre s'appelle `locator` (signature Python) ; à défaut, les
+keywords AppiumLibrary / SeleniumLibrary reconnus à leur nom.
+
+Usage:
+    python -m robot --listener "robot_timing_listener.py;results/keyword_profile" suite.robot
+    python robot_timing_listener.py results/keyword_profile.json --by locator
+"""
+
+import re
+import json
+import time
+import inspect
+import importlib
+from pathlib import Path
+from typing import Optional
+
+# Bibliothèques dont les keywords prennent un locator
+LOCATOR_LIBRARIES = {"AppiumLibrary", "SeleniumLibrary"}
+
+# Repli quand la signature de la bibliothèque n'est pas accessible
+_LOCATOR_KEYWORD = re.compile(
+    r"element|^click|^tap|^long press|^input (text|password|value)|^clear text|^get text"
+    r"|^get (element )?attribute|^scroll|^swipe by|^capture element", re.IGNORECASE)
+
+# Keywords conservés dans le profil JSON (les piles repliées sont complètes)
+TOP_KEYWORDS = 100
+TOP_LOCATORS = 100
+
+
+def _snake(name: str) -> str:
+    return re.sub(r"\W+", "_", name.strip()).lower()
+
+
+class RobotTimingListener:
+    """Chronomètre chaque keyword et agrège par keyword, locator et pile d'appels."""
+
+    ROBOT_LISTENER_API_VERSION = 3
+
+    def __init__(self, profile_path: str = "keyword_profile"):
+        base = Path(profile_path)
+        self.json_path   = base.with_suffix(".json")
+        self.folded_path = base.with_suffix(".folded")
+        self._names: list[str] = []                 # pile suite;test;keywords
+        self._frames: list[list] = []               # [début, temps des enfants, locator]
+        self._keywords: dict[tuple, list] = {}      # (owner, nom) → [appels, total, propre, max]
+        self._locators: dict[str, dict] = {}
+        self._folded: dict[str, float] = {}
+        self._locator_arg: dict[tuple, bool] = {}
+        self._started = time.perf_counter()
+
+    # ── Suites / tests : racines des piles ───────────────────────────────
+
+    def start_suite(self, data, result):
+        self._names.append(data.name)
+
+    def end_suite(self, data, result):
+        self._names.pop()
+
+    def start_test(self, data, result):
+        self._names.append(data.name)
+
+    def end_test(self, data, result):
+        self._names.pop()
+
+    # ── Keywords ─────────────────────────────────────────────────────────
+
+    def _takes_locator(self, owner: Optional[str], name: str) -> bool:
+        key = (owner, name)
+        if key not in self._locator_arg:
+            takes = False
+            if owner in LOCATOR_LIBRARIES:
+                try:
+                    module = importlib.import_module(owner)
+                    method = getattr(getattr(module, owner, module), _snake(name))
+                    params = [p for p in inspect.signature(method).parameters if p != "self"]
+                    takes  = bool(params) and "locator" in params[0]
+                except (ImportError, AttributeError, TypeError, ValueError):
+                    takes = bool(_LOCATOR_KEYWORD.search(name))
+            self._locator_arg[key] = takes
+        return self._locator_arg[key]
+
+    def _locator(self, data, result) -> Optional[tuple[str, str]]:
+        if not data.args or not self._takes_locator(result.owner, data.name):
+            return None
+        written = str(data.args[0])
+        try:
+            from robot.libraries.BuiltIn import BuiltIn
+            value = str(BuiltIn().replace_variables(written))
+        except Exception:          # variable inconnue : le keyword échouera de lui-même
+            value = written
+        return written, value
+
+    def start_keyword(self, data, result):
+        self._names.append(f"{result.owner}.{data.name}" if result.owner else data.name)
+        self._frames.append([time.perf_counter(), 0.0, self._locator(data, result)])
+
+    def end_keyword(self, data, result):
+        start, children, locator = self._frames.pop()
+        elapsed = time.perf_counter() - start
+        own     = max(elapsed - children, 0.0)
+        if self._frames:
+            self._frames[-1][1] += elapsed
+
+        stats = self._keywords.setdefault((result.owner, data.name), [0, 0.0, 0.0, 0.0])
+        stats[0] += 1
+        stats[1] += elapsed
+        stats[2] += own
+        stats[3]  = max(stats[3], elapsed)
+
+        if locator:
+            written, value = locator
+            entry = self._locators.setdefault(value, {"locator": value, "written_as": set(),
+                                                      "keywords": {}, "calls": 0, "total_s": 0.0})
+            entry["written_as"].add(written)
+            entry["keywords"][data.name] = entry["keywords"].get(data.name, 0) + 1
+            entry["calls"]   += 1
+            entry["total_s"] += elapsed
+
+        stack = ";".join(n.replace(";", ",") for n in self._names)
+        self._folded[stack] = self._folded.get(stack, 0.0) + own
+        self._names.pop()
+
+    # ── Écriture du profil ───────────────────────────────────────────────
+
+    def profile(self) -> dict:
+        keywords = sorted(
+            ({"keyword": name, "owner": owner, "calls": calls, "total_s": round(total, 3),
+              "self_s": round(own, 3), "max_s": round(peak, 3),
+              "avg_s": round(total / calls, 4)}
+             for (owner, name), (calls, total, own, peak) in self._keywords.items()),
+            key=lambda k: k["self_s"], reverse=True)
+        locators = sorted(
+            ({**entry, "written_as": sorted(entry["written_as"]), "total_s": round(entry["total_s"], 3),
+              "avg_s": round(entry["total_s"] / entry["calls"], 4)}
+             for entry in self._locators.values()),
+            key=lambda l: l["total_s"], reverse=True)
+        return {"generated": time.time(),
+                "wall_s": round(time.perf_counter() - self._started, 3),
+                "keyword_s": round(sum(self._folded.values()), 3),
+                "keywords": keywords[:TOP_KEYWORDS], "locators": locators[:TOP_LOCATORS],
+                "folded": str(self.folded_path)}
+
+    def close(self):
+        self.json_path.parent.mkdir(parents=True, exist_ok=True)
+        self.json_path.write_text(json.dumps(self.profile(), indent=2, ensure_ascii=False),
+                                  encoding="utf-8")
+        lines = [f"{stack} {round(seconds * 1e6)}" for stack, seconds in self._folded.items()
+                 if seconds > 0]
+        self.folded_path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+def hotspots(profile_file, by: str = "keyword", top: int = 20) -> list[dict]:
+    """Points chauds d'un profil écrit par le listener (`keyword` : temps propre, `locator` : total)."""
+    profile = json.loads(Path(profile_file).read_text(encoding="utf-8"))
+    return profile["locators" if by == "locator" else "keywords"][:top]
+
+
+# Nom de module = nom de classe attendu par `--listener robot_timing_listener.py`
+robot_timing_listener = RobotTimingListener
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Points chauds d'un profil de keywords Robot")
+    parser.add_argument("profile", help="Fichier keyword_profile.json")
+    parser.add_argument("--by", choices=["keyword", "locator"], default="keyword")
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args()
+
+    for row in hotspots(args.profile, args.by, args.top):
+        if args.by == "locator":
+            print(f"{row['total_s']:>9.3f}s  {row['calls']:>5}×  {row['locator']}  "
+                  f"({', '.join(row['written_as'])})")
+        else:
+            name = f"{row['owner']}.{row['keyword']}" if row["owner"] else row["keyword"]
+            print(f"{row['self_s']:>9.3f}s  {row['calls']:>5}×  max {row['max_s']:.3f}s  {name}")
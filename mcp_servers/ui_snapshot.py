@@ -0,0 +1,349 @@
+"""
+UI Snapshot — Résolution locale des locators
+=============================================
+Résout les locators Appium (resource-id, accessibility id, classe, texte, XPath)
+contre un page source capturé UNE fois, sans aller-retour vers le device.
+
+  • lxml + cache des XPath compilés (fallback ElementTree si lxml absent)
+  • Tables de hachage id / text / content-desc / classe construites en une passe
+    (LocatorIndex) → nombre exact de matchs d'un locator en O(1)
+  • Sélecteurs `android=new UiSelector()...` évalués localement (sous-ensemble)
+  • Cache des snapshots par empreinte du page source (LRU)
+
+Usage:
+    snapshot = get_snapshot(driver.page_source)
+    nodes    = snapshot.find_all("resource_id", "com.example.app:id/btn_login")
+    details  = element_details(nodes[0])
+"""
+
+import re
+import hashlib
+import xml.etree.ElementTree as ET
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Optional
+
+# ============================================================================
+# IMPORT LXML  (graceful degradation → ElementTree si absent)
+# ============================================================================
+try:
+    from lxml import etree as LET
+    LXML_AVAILABLE = True
+except ImportError:
+    LXML_AVAILABLE = False
+
+# Stratégies supportées (mêmes noms que find_element_by_strategies)
+STRATEGIES = ("resource_id", "text", "content_desc", "class_name", "xpath", "uiautomator")
+
+# Attribut XML indexé pour chaque stratégie « simple »
+_STRATEGY_ATTRIBUTES = {
+    "resource_id":  "resource-id",
+    "text":         "text",
+    "content_desc": "content-desc",
+    "class_name":   "class",
+}
+
+SNAPSHOT_CACHE_SIZE = 8
+
+
+@lru_cache(maxsize=256)
+def _compile_xpath(expression: str):
+    """Compile une expression XPath une seule fois (réutilisée entre snapshots)."""
+    return LET.XPath(expression)
+
+
+def _node_class(node) -> str:
+    """Classe Android d'un nœud (attribut `class`, sinon nom de balise)."""
+    return node.get("class") or (node.tag if isinstance(node.tag, str) else "")
+
+
+# ============================================================================
+# SNAPSHOT
+# ============================================================================
+
+class UiSnapshot:
+    """
+    Page source parsé une fois, interrogeable localement en quelques millisecondes.
+    Lève ET.ParseError si le XML est invalide (même contrat que ET.fromstring).
+    """
+
+    def __init__(self, page_source: str):
+        self.page_source = page_source
+        self.fingerprint = fingerprint(page_source)
+
+        if LXML_AVAILABLE:
+            try:
+                self.root = LET.fromstring(page_source.encode("utf-8"))
+            except LET.XMLSyntaxError as e:
+                raise ET.ParseError(str(e)) from e
+            self.nodes = list(self.root.iter(LET.Element))
+        else:
+            self.root  = ET.fromstring(page_source)
+            self.nodes = list(self.root.iter())
+
+        self._index: Optional[LocatorIndex] = None
+
+    @property
+    def index(self) -> "LocatorIndex":
+        """Tables de hachage du snapshot, construites en une passe au premier usage."""
+        if self._index is None:
+            self._index = LocatorIndex(self.nodes)
+        return self._index
+
+    def find_all(self, strategy: str, value: str) -> list:
+        """
+        Retourne tous les nœuds correspondant au locator (ordre du document).
+        Lève ValueError si la stratégie est inconnue ou l'XPath invalide.
+        """
+        if strategy in _STRATEGY_ATTRIBUTES:
+            return list(self.index.maps[strategy].get(value, []))
+        if strategy == "xpath":
+            return self._find_xpath(value)
+        if strategy == "uiautomator":
+            return _match_uiselector(self.nodes, value)
+        raise ValueError(f"Stratégie inconnue : {strategy}")
+
+    def find_first(self, strategy: str, value: str) -> Optional[Any]:
+        """Premier nœud correspondant, ou None."""
+        matches = self.find_all(strategy, value)
+        return matches[0] if matches else None
+
+    def _find_xpath(self, expression: str) -> list:
+        if LXML_AVAILABLE:
+            try:
+                result = _compile_xpath(expression)(self.root)
+            except (LET.XPathSyntaxError, LET.XPathEvalError) as e:
+                raise ValueError(f"XPath invalide '{expression}': {e}") from e
+            if not isinstance(result, list):
+                return []
+            return [n for n in result if isinstance(getattr(n, "tag", None), str)]
+
+        # ElementTree : sous-ensemble XPath, uniquement les chemins `//...`
+        if not expression.startswith("//"):
+            raise ValueError(f"XPath non supporté sans lxml : {expression}")
+        try:
+            return self.root.findall("." + expression)
+        except (SyntaxError, KeyError) as e:
+            raise ValueError(f"XPath non supporté sans lxml '{expression}': {e}") from e
+
+    def count(self, locator: str) -> int:
+        """Nombre exact de nœuds correspondant à un locator Robot Framework."""
+        count = self.index.count(locator)
+        if count is not None:
+            return count
+        strategy, value = parse_locator(locator)
+        return len(self.find_all(strategy, value))
+
+
+# ============================================================================
+# INDEX DES LOCATORS  (une seule passe sur l'arbre)
+# ============================================================================
+
+# XPath générés par _build_rf_locators → résolus par table de hachage
+_XPATH_TEXT          = re.compile(r"^//\*\[@text='([^']*)'\]$")
+_XPATH_TEXT_CONTAINS = re.compile(r"^//\*\[contains\(@text,\s*'([^']*)'\)\]$")
+_XPATH_DESC          = re.compile(r"^//\*\[@content-desc='([^']*)'\]$")
+_XPATH_ID            = re.compile(r"^//\*\[@resource-id='([^']*)'\]$")
+_XPATH_CLASS_TEXT    = re.compile(r"^//([\w.$]+)\[@text='([^']*)'\]$")
+_XPATH_CLASS         = re.compile(r"^//([\w.$]+)$")
+
+
+class LocatorIndex:
+    """
+    Tables de hachage construites en UNE passe sur les nœuds :
+    resource-id, text, content-desc, classe et (classe, text).
+    Donne le nombre exact de matchs d'un locator sans évaluer d'XPath.
+    """
+
+    def __init__(self, nodes):
+        self.maps: dict[str, dict] = {
+            "resource_id":  {},
+            "text":         {},
+            "content_desc": {},
+            "class_name":   {},
+            "class_text":   {},
+        }
+        rid_map, text_map, desc_map, cls_map, cls_text_map = self.maps.values()
+        for node in nodes:
+            cls  = _node_class(node)
+            text = node.get("text", "")
+            rid  = node.get("resource-id", "")
+            desc = node.get("content-desc", "")
+            if rid:
+                rid_map.setdefault(rid, []).append(node)
+            if text:
+                text_map.setdefault(text, []).append(node)
+                cls_text_map.setdefault((cls, text), []).append(node)
+            if desc:
+                desc_map.setdefault(desc, []).append(node)
+            if cls:
+                cls_map.setdefault(cls, []).append(node)
+
+    def _len(self, strategy: str, key) -> int:
+        return len(self.maps[strategy].get(key, ()))
+
+    def count(self, locator: str) -> Optional[int]:
+        """
+        Nombre exact de matchs pour un locator RF (`id=`, `accessibility_id=`,
+        `class=`, XPath simples générés par l'agent).
+        Retourne None si le locator exige une vraie évaluation XPath.
+        """
+        strategy, value = parse_locator(locator)
+        if strategy in _STRATEGY_ATTRIBUTES:
+            return self._len(strategy, value)
+        if strategy != "xpath":
+            return None
+
+        if m := _XPATH_TEXT.match(value):
+            return self._len("text", m.group(1))
+        if m := _XPATH_TEXT_CONTAINS.match(value):
+            needle = m.group(1)
+            return sum(len(nodes) for text, nodes in self.maps["text"].items() if needle in text)
+        if m := _XPATH_DESC.match(value):
+            return self._len("content_desc", m.group(1))
+        if m := _XPATH_ID.match(value):
+            return self._len("resource_id", m.group(1))
+        if m := _XPATH_CLASS_TEXT.match(value):
+            return self._len("class_text", (m.group(1), m.group(2)))
+        if m := _XPATH_CLASS.match(value):
+            return self._len("class_name", m.group(1))
+        return None
+
+
+# ============================================================================
+# UISELECTOR  (sous-ensemble évalué localement)
+# ============================================================================
+
+_UISELECTOR_CALL = re.compile(r'\.(\w+)\(\s*("(?:[^"\\]|\\.)*"|\d+|true|false)\s*\)')
+
+# Méthode UiSelector → prédicat (nœud, argument)
+_UISELECTOR_PREDICATES = {
+    "text":                lambda n, v: n.get("text", "") == v,
+    "textContains":        lambda n, v: v in n.get("text", ""),
+    "textStartsWith":      lambda n, v: n.get("text", "").startswith(v),
+    "textMatches":         lambda n, v: re.fullmatch(v, n.get("text", "")) is not None,
+    "resourceId":          lambda n, v: n.get("resource-id", "") == v,
+    "resourceIdMatches":   lambda n, v: re.fullmatch(v, n.get("resource-id", "")) is not None,
+    "className":           lambda n, v: _node_class(n) == v,
+    "classNameMatches":    lambda n, v: re.fullmatch(v, _node_class(n)) is not None,
+    "description":         lambda n, v: n.get("content-desc", "") == v,
+    "descriptionContains": lambda n, v: v in n.get("content-desc", ""),
+    "descriptionMatches":  lambda n, v: re.fullmatch(v, n.get("content-desc", "")) is not None,
+    "clickable":           lambda n, v: (n.get("clickable", "false") == "true") == v,
+    "enabled":             lambda n, v: (n.get("enabled", "true") == "true") == v,
+    "index":               lambda n, v: n.get("index", "") == str(v),
+}
+
+
+def _parse_uiselector_argument(raw: str):
+    if raw.startswith('"'):
+        return re.sub(r'\\(.)', r'\1', raw[1:-1])
+    if raw in ("true", "false"):
+        return raw == "true"
+    return int(raw)
+
+
+def _match_uiselector(nodes, expression: str) -> list:
+    """
+    Évalue `new UiSelector().text("OK").instance(1)` sur les nœuds du snapshot.
+    `instance(n)` sélectionne le n-ième match (0-based, ordre du document).
+    Lève ValueError pour une méthode non supportée (childSelector, fromParent…).
+    """
+    body = expression.strip().removeprefix("new UiSelector()").strip().rstrip(";")
+    calls = _UISELECTOR_CALL.findall(body)
+    if "".join(f".{m}({a})" for m, a in calls).replace(" ", "") != body.replace(" ", ""):
+        raise ValueError(f"UiSelector non supporté : {expression}")
+
+    instance   = None
+    predicates = []
+    for method, raw in calls:
+        argument = _parse_uiselector_argument(raw)
+        if method == "instance":
+            instance = argument
+        elif method in _UISELECTOR_PREDICATES:
+            predicates.append((_UISELECTOR_PREDICATES[method], argument))
+        else:
+            raise ValueError(f"Méthode UiSelector non supportée : {method}")
+
+    matches = [n for n in nodes if all(pred(n, arg) for pred, arg in predicates)]
+    if instance is not None:
+        return matches[instance:instance + 1]
+    return matches
+
+
+# ============================================================================
+# HELPERS
+# ============================================================================
+
+# Préfixes AppiumLibrary → stratégie du snapshot
+_LOCATOR_PREFIXES = {
+    "id":               "resource_id",
+    "identifier":       "resource_id",
+    "accessibility_id": "content_desc",
+    "accessibility id": "content_desc",
+    "class":            "class_name",
+    "class name":       "class_name",
+    "xpath":            "xpath",
+    "android":          "uiautomator",
+    "-android uiautomator": "uiautomator",
+}
+
+
+def parse_locator(locator: str) -> tuple[str, str]:
+    """
+    Décompose un locator Robot Framework / AppiumLibrary en (stratégie, valeur).
+      "id=pkg:id/btn"          → ("resource_id", "pkg:id/btn")
+      "accessibility_id=All"   → ("content_desc", "All")
+      "xpath=//a" ou "//a"     → ("xpath", "//a")
+      "android=new UiSelector().text(\"OK\")" → ("uiautomator", "new UiSelector()...")
+    Sans préfixe connu, la valeur est traitée comme un resource-id.
+    """
+    locator = locator.strip()
+    if locator.startswith(("//", "(//")):
+        return "xpath", locator
+    separators = [i for i in (locator.find("="), locator.find(":")) if i > 0]
+    if separators:
+        cut    = min(separators)
+        prefix = locator[:cut].strip().lower()
+        if prefix in _LOCATOR_PREFIXES:
+            return _LOCATOR_PREFIXES[prefix], locator[cut + 1:].strip()
+    return "resource_id", locator
+
+
+def fingerprint(page_source: str) -> str:
+    """Empreinte SHA-1 du page source (clé du cache de snapshots)."""
+    return hashlib.sha1(page_source.encode("utf-8")).hexdigest()
+
+
+def element_details(node) -> dict:
+    """Attributs d'un nœud au format `element_details` de find_element_by_strategies."""
+    return {
+        "resource_id":  node.get("resource-id", ""),
+        "text":         node.get("text", ""),
+        "content_desc": node.get("content-desc", ""),
+        "class":        _node_class(node),
+        "bounds":       node.get("bounds", ""),
+        "enabled":      node.get("enabled", "true") == "true",
+        "displayed":    node.get("displayed", "true") == "true",
+    }
+
+
+_SNAPSHOT_CACHE: "OrderedDict[str, UiSnapshot]" = OrderedDict()
+
+
+def get_snapshot(page_source: str) -> UiSnapshot:
+    """
+    Retourne le snapshot associé à ce page source (parsé une seule fois).
+    Les SNAPSHOT_CACHE_SIZE derniers écrans sont conservés en mémoire.
+    """
+    key      = fingerprint(page_source)
+    snapshot = _SNAPSHOT_CACHE.get(key)
+    if snapshot is not None:
+        _SNAPSHOT_CACHE.move_to_end(key)
+        return snapshot
+
+    snapshot = UiSnapshot(page_source)
+    _SNAPSHOT_CACHE[key] = snapshot
+    while len(_SNAPSHOT_CACHE) > SNAPSHOT_CACHE_SIZE:
+        _SNAPSHOT_CACHE.popitem(last=False)
+    return snapshot
@@ -0,0 +1,52 @@
+"""
+AppSessionLibrary — Une session Appium par suite
+================================================
+Ouvrir une session Appium coûte environ 5 s (création de la session,
+démarrage d'UiAutomator2). Les suites ouvrent donc l'application une fois
+(`Suite Setup`) et remettent l'application dans son état de départ entre
+les tests avec `Reset App State` : arrêt puis relance de l'application
+dans la session existante (~1 s).
+
+Usage (.robot):
+    Library           libraries/AppSessionLibrary.py
+    Suite Setup       Open Application For Tests
+    Suite Teardown    Close Application
+    Test Setup        Reset App State
+"""
+
+import time
+
+from robot.api import logger
+from robot.api.deco import keyword, library
+from robot.libraries.BuiltIn import BuiltIn
+
+
+@library(scope="GLOBAL", auto_keywords=False)
+class AppSessionLibrary:
+    """Remise à zéro rapide de l'application dans la session courante (AppiumLibrary)."""
+
+    def __init__(self, appium_library="AppiumLibrary"):
+        self.appium_library = appium_library
+
+    def _driver(self):
+        return BuiltIn().get_library_instance(self.appium_library)._current_application()
+
+    @keyword("Reset App State")
+    def reset_app_state(self, app_package=None) -> float:
+        """
+        Arrête puis relance l'application (`app_package`, par défaut celle
+        de la session) sans recréer la session Appium.
+        Retourne la durée de la remise à zéro en secondes.
+        """
+        driver  = self._driver()
+        package = (app_package or driver.capabilities.get("appPackage")
+                   or driver.capabilities.get("appium:appPackage"))
+        if not package:
+            raise AssertionError("Reset App State : appPackage absent de la session, "
+                                 "le passer en argument")
+        start = time.monotonic()
+        driver.terminate_app(package)
+        driver.activate_app(package)
+        elapsed = time.monotonic() - start
+        logger.info(f"{package} relancée en {elapsed:.2f}s (session conservée)")
+        return round(elapsed, 3)
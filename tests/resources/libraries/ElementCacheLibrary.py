@@ -0,0 +1,130 @@
+"""
+ElementCacheLibrary — Éléments résolus une fois par écran
+=========================================================
+Librairie de keywords Robot Framework qui garde les WebElement déjà trouvés
+pour l'écran courant : une suite de lectures ou d'actions sur le même
+locator ne refait pas un `find_element` (aller-retour device) à chaque pas.
+
+Le cache est vidé automatiquement (la librairie est aussi son propre
+listener v3, Robot Framework 7+) après chaque keyword qui change l'état de
+l'écran : clic, saisie (dont `Fill Form`), swipe/scroll, retour,
+ouverture/fermeture d'application… Un élément servi depuis le cache est
+d'abord vérifié par un `is_displayed()` : détaché (écran changé sans action
+connue), il est résolu de nouveau.
+
+Les keywords AppiumLibrary acceptent un WebElement à la place du locator :
+
+Usage (.robot):
+    Library    libraries/ElementCacheLibrary.py
+    ${field}=    Wait Until Cached Element Is Visible    ${SIGNUP_INPUT_EMAIL}    10s
+    Clear Text    ${field}
+    Input Text    ${field}    user@test.com
+    ${value}=    Get Cached Element Attribute    ${SIGNUP_INPUT_EMAIL}    text
+"""
+
+import re
+import time
+
+from robot.api import logger
+from robot.api.deco import keyword, library
+from robot.libraries.BuiltIn import BuiltIn
+from robot.utils import timestr_to_secs
+
+try:
+    from selenium.common.exceptions import StaleElementReferenceException
+except ImportError:                     # selenium est installé avec AppiumLibrary
+    class StaleElementReferenceException(Exception):
+        pass
+
+# Keywords après lesquels l'écran peut avoir changé
+_STATE_CHANGING = re.compile(
+    r"^(click|tap|long press|input|fill|clear text|swipe|scroll|press keycode|go back|go to"
+    r"|hide keyboard|drag|pinch|zoom|flick|shake|lock|unlock|background|rotate|reset"
+    r"|(open|close|launch|activate|terminate|quit|switch)\b.*application|execute)",
+    re.IGNORECASE)
+
+
+@library(scope="GLOBAL", auto_keywords=False)
+class ElementCacheLibrary:
+    """Cache des éléments résolus, invalidé par les actions sur l'écran."""
+
+    ROBOT_LISTENER_API_VERSION = 3
+
+    def __init__(self, timeout="10s", interval="0.2s", appium_library="AppiumLibrary"):
+        self.timeout        = timestr_to_secs(timeout)
+        self.interval       = timestr_to_secs(interval)
+        self.appium_library = appium_library
+        self.ROBOT_LIBRARY_LISTENER = self
+        self._elements: dict[str, object] = {}
+        self.hits = self.misses = 0
+
+    def _appium(self):
+        return BuiltIn().get_library_instance(self.appium_library)
+
+    # ── Listener : invalidation après une action ─────────────────────────
+
+    def end_keyword(self, data, result):
+        if self._elements and result.owner != "BuiltIn" and _STATE_CHANGING.match(result.name):
+            logger.debug(f"Cache d'éléments vidé après '{result.name}' "
+                         f"({len(self._elements)} élément(s))")
+            self._elements.clear()
+
+    # ── Résolution ───────────────────────────────────────────────────────
+
+    def _resolve(self, locator: str, timeout: float, visible: bool):
+        element = self._elements.get(locator)
+        if element is not None:
+            # Vérification légère : un élément détaché (écran changé sans action
+            # connue) ou masqué alors qu'on l'attend visible est résolu de nouveau
+            try:
+                valid = element.is_displayed() or not visible
+            except StaleElementReferenceException:
+                valid = False
+            if valid:
+                self.hits += 1
+                return element
+            del self._elements[locator]
+        self.misses += 1
+
+        deadline = time.monotonic() + timeout
+        while True:
+            sampled_at = time.monotonic()
+            for candidate in self._appium().get_webelements(locator):
+                try:
+                    if not visible or candidate.is_displayed():
+                        self._elements[locator] = candidate
+                        return candidate
+                except StaleElementReferenceException:
+                    continue
+            if sampled_at >= deadline:
+                state = "visible" if visible else "présent"
+                raise AssertionError(f"Élément '{locator}' non {state} après {timeout:.1f}s")
+            time.sleep(max(0.0, self.interval - (time.monotonic() - sampled_at)))
+
+    @keyword("Wait Until Cached Element Is Visible")
+    def wait_until_cached_element_is_visible(self, locator, timeout=None):
+        """
+        Attend que `locator` soit visible et retourne le WebElement.
+        Déjà résolu sur cet écran : retourné sans aller-retour device.
+        """
+        timeout = timestr_to_secs(timeout) if timeout else self.timeout
+        return self._resolve(locator, timeout, visible=True)
+
+    @keyword("Get Cached Element")
+    def get_cached_element(self, locator):
+        """Retourne le WebElement de `locator` (trouvé une fois par écran, sans attente)."""
+        return self._resolve(locator, 0, visible=False)
+
+    @keyword("Get Cached Element Attribute")
+    def get_cached_element_attribute(self, locator, attribute):
+        """Attribut de l'élément mis en cache ; résolu de nouveau si l'élément a disparu."""
+        try:
+            return self._resolve(locator, 0, visible=False).get_attribute(attribute)
+        except StaleElementReferenceException:
+            self._elements.pop(locator, None)
+            return self._resolve(locator, self.timeout, visible=False).get_attribute(attribute)
+
+    @keyword("Invalidate Element Cache")
+    def invalidate_element_cache(self):
+        """Vide le cache (changement d'écran non provoqué par un keyword AppiumLibrary)."""
+        self._elements.clear()
@@ -0,0 +1,149 @@
+"""
+NavigationLibrary — Accès direct aux écrans
+===========================================
+Librairie de keywords Robot Framework qui amène l'application sur un écran
+en un appel, au lieu de cliquer depuis l'écran de lancement à chaque test.
+
+Les écrans sont déclarés dans `tests/resources/screens.json` :
+
+    "signup": {
+      "deep_link": "foodapp://signup",          (optionnel, mobile: deepLink)
+      "activity":  ".SignUpActivity",           (optionnel, mobile: startActivity)
+      "extras":    [["s", "tab", "signup"]],    (optionnel, extras de l'intent)
+      "from":      "home",                      (écran de départ du chemin)
+      "path":      ["accessibility_id=Login\\nTab 2 of 2"],   (clics enregistrés)
+      "ready":     ["accessibility_id=Join Us"]                (écran atteint)
+    }
+
+Ordre d'essai : lien profond → activité → chemin de clics. La stratégie qui
+a fonctionné est retenue pour les appels suivants sur le même écran. Les
+locators peuvent utiliser des variables Robot (`${HOME_NAV_LOGIN}`).
+
+Usage (.robot):
+    Library    libraries/NavigationLibrary.py
+    Go To Screen       signup
+    Start On Screen    menu          # Reset App State + Go To Screen
+"""
+
+import json
+import time
+from pathlib import Path
+
+from robot.api import logger
+from robot.api.deco import keyword, library
+from robot.libraries.BuiltIn import BuiltIn
+from robot.utils import timestr_to_secs
+
+SCREENS_FILE = Path(__file__).resolve().parent.parent / "screens.json"
+
+# Stratégies dans l'ordre d'essai (du plus rapide au plus sûr)
+STRATEGIES = ("deep_link", "activity", "path")
+
+
+def load_screens(path=SCREENS_FILE) -> dict:
+    """Registre des écrans ({} si le fichier est absent)."""
+    path = Path(path)
+    return json.loads(path.read_text(encoding="utf-8")) if path.exists() else {}
+
+
+@library(scope="GLOBAL", auto_keywords=False)
+class NavigationLibrary:
+    """Navigation directe vers un écran déclaré (AppiumLibrary + UiSyncLibrary)."""
+
+    def __init__(self, screens=None, timeout="10s", jump_timeout="3s",
+                 appium_library="AppiumLibrary"):
+        self.screens        = load_screens(screens or SCREENS_FILE)
+        self.timeout        = timestr_to_secs(timeout)
+        self.jump_timeout   = timestr_to_secs(jump_timeout)
+        self.appium_library = appium_library
+        self._preferred: dict[str, str] = {}
+
+    def _driver(self):
+        return BuiltIn().get_library_instance(self.appium_library)._current_application()
+
+    def _screen(self, name: str) -> dict:
+        if name not in self.screens:
+            raise AssertionError(f"Écran '{name}' non déclaré (connus : {', '.join(sorted(self.screens))})")
+        return self.screens[name]
+
+    def _locators(self, locators) -> list[str]:
+        return [str(BuiltIn().replace_variables(locator)) for locator in locators]
+
+    def _package(self, screen: dict) -> str:
+        capabilities = self._driver().capabilities
+        return (screen.get("package") or capabilities.get("appPackage")
+                or capabilities.get("appium:appPackage"))
+
+    def _reached(self, screen: dict, timeout: float) -> bool:
+        ready = self._locators(screen.get("ready", []))
+        if not ready:
+            BuiltIn().run_keyword("Wait For UI Idle", f"timeout={timeout}")
+            return True
+        return BuiltIn().run_keyword_and_return_status(
+            "Elements Should Be Visible", *ready, f"timeout={timeout}")
+
+    # ── Stratégies ───────────────────────────────────────────────────────
+
+    def _via_deep_link(self, screen: dict):
+        self._driver().execute_script("mobile: deepLink", {
+            "url": BuiltIn().replace_variables(screen["deep_link"]),
+            "package": self._package(screen)})
+
+    def _via_activity(self, screen: dict):
+        activity = screen["activity"]
+        package  = self._package(screen)
+        intent   = activity if "/" in activity else f"{package}/{activity}"
+        arguments = {"intent": intent}
+        if screen.get("extras"):
+            arguments["extras"] = screen["extras"]
+        self._driver().execute_script("mobile: startActivity", arguments)
+
+    def _via_path(self, screen: dict):
+        if screen.get("from"):
+            self.go_to_screen(screen["from"])
+        for locator in self._locators(screen.get("path", [])):
+            BuiltIn().run_keyword("Wait Until Element Is Visible", locator, self.timeout)
+            BuiltIn().run_keyword("Click Element", locator)
+
+    # ── Keywords ─────────────────────────────────────────────────────────
+
+    @keyword("Go To Screen")
+    def go_to_screen(self, name, timeout=None) -> str:
+        """
+        Amène l'application sur l'écran `name` et retourne la stratégie
+        utilisée (`already`, `deep_link`, `activity` ou `path`).
+        Échoue si aucune stratégie n'atteint l'écran.
+        """
+        timeout = timestr_to_secs(timeout) if timeout else self.timeout
+        screen  = self._screen(name)
+        if screen.get("ready") and self._reached(screen, 0):
+            logger.info(f"Déjà sur l'écran '{name}'")
+            return "already"
+
+        available = [s for s in STRATEGIES if s == "path" or screen.get(s)]
+        preferred = self._preferred.get(name)
+        if preferred in available:
+            available.remove(preferred)
+            available.insert(0, preferred)
+
+        errors = []
+        for strategy in available:
+            start = time.monotonic()
+            try:
+                getattr(self, f"_via_{strategy}")(screen)
+                reached = self._reached(screen, timeout if strategy == "path" else self.jump_timeout)
+            except Exception as e:          # stratégie non supportée par l'app ou le driver
+                errors.append(f"{strategy}: {e}")
+                continue
+            if reached:
+                self._preferred[name] = strategy
+                logger.info(f"Écran '{name}' atteint par {strategy} en {time.monotonic() - start:.2f}s")
+                return strategy
+            errors.append(f"{strategy}: écran non atteint")
+        raise AssertionError(f"Écran '{name}' non atteint — " + " ; ".join(errors))
+
+    @keyword("Start On Screen")
+    def start_on_screen(self, name, timeout=None) -> str:
+        """Début de test : `Reset App State` (AppSessionLibrary) puis `Go To Screen`."""
+        BuiltIn().run_keyword("Reset App State")
+        return self.go_to_screen(name, timeout)
@@ -0,0 +1,308 @@
+"""
+UiSyncLibrary — Synchronisation et vérifications sur le page source
+===================================================================
+Librairie de keywords Robot Framework qui interroge l'écran par son page
+source (un aller-retour device) plutôt qu'élément par élément :
+
+  • Wait For UI Idle : remplace les `Sleep` fixes. Empreinte relevée toutes
+    les `interval` : activité courante + IDLE_MAX_NODES premiers nœuds du page
+    source (blake2b) ; le page source n'est pas lu tant que l'activité change.
+    L'interface est au repos quand `stable_samples` empreintes consécutives sont
+    identiques ; un écran animé en continu est abandonné après
+    IDLE_MAX_WINDOWS × `stable_samples` relevés (ou `timeout`)
+  • Elements Should Be Visible : N locators vérifiés localement sur le même
+    page source (ui_snapshot) à chaque relevé, au lieu de N attentes
+    successives ; tous les éléments manquants sont signalés. Seuls `id=` (id
+    complet), `accessibility_id=`, `class=`, `xpath=` et `android=` sont
+    évalués localement, les autres locators via find_elements sur le device
+  • Fill Form : champs attendus sur un page source, résolus par un seul
+    `find_elements` par classe (identité de chaque champ contrôlée par ses
+    bounds), saisis à la suite ; clavier masqué une fois
+
+Usage (.robot):
+    Library    libraries/UiSyncLibrary.py    timeout=10s    stable_samples=3
+    Wait For UI Idle
+    Wait For UI Idle    timeout=20s    fail_on_timeout=${True}
+    Elements Should Be Visible    ${HOME_NAV_MENU}    ${HOME_NAV_LOGIN}    timeout=10s
+    Fill Form    ${SIGNUP_INPUT_EMAIL}    user@test.com    ${SIGNUP_INPUT_PHONE}    0600000000
+"""
+
+import re
+import sys
+import time
+import hashlib
+from itertools import islice
+from pathlib import Path
+
+from robot.api import logger
+from robot.api.deco import keyword, library
+from robot.libraries.BuiltIn import BuiltIn
+from robot.utils import is_truthy, timestr_to_secs
+
+# Résolution locale des locators (mcp_servers/ui_snapshot.py)
+sys.path.insert(0, str(Path(__file__).resolve().parents[3] / "mcp_servers"))
+from ui_snapshot import UiSnapshot, parse_locator  # noqa: E402
+
+# Stratégie Appium pour résoudre tous les champs d'une même classe
+CLASS_NAME = "class name"
+
+_BOUNDS = re.compile(r"\[(-?\d+),(-?\d+)\]\[(-?\d+),(-?\d+)\]")
+
+# Empreinte de repos : nœuds (balises ouvrantes) pris en compte en tête du page source
+IDLE_MAX_NODES   = 300
+# Écran animé en continu : abandon après ce nombre de fenêtres de `stable_samples` relevés
+IDLE_MAX_WINDOWS = 5
+_OPEN_TAG = re.compile(r"<[A-Za-z][^>]*>")
+
+# Préfixes AppiumLibrary auxquels le snapshot répond exactement ; les autres
+# (`name=`, `text=`, sans préfixe…) sont résolus sur le device
+_SNAPSHOT_PREFIX = re.compile(r"^(id|identifier|accessibility_id|class|xpath|android)\s*=",
+                              re.IGNORECASE)
+
+
+def _snapshot_locator(locator: str):
+    """
+    (stratégie, valeur) si le snapshot peut évaluer ce locator, sinon None.
+    Un id court (`id=btn_login`) est complété par le package côté device :
+    seul un resource-id complet (`pkg:id/btn_login`) est comparé localement.
+    """
+    locator = locator.strip()
+    if not locator.startswith(("//", "(//")) and not _SNAPSHOT_PREFIX.match(locator):
+        return None
+    strategy, value = parse_locator(locator)
+    if strategy == "resource_id" and ":id/" not in value:
+        return None
+    return strategy, value
+
+
+def _displayed(node) -> bool:
+    """Nœud affiché (`displayed`) avec une surface non nulle à l'écran."""
+    if node.get("displayed", "true") != "true":
+        return False
+    bounds = _BOUNDS.match(node.get("bounds", ""))
+    if bounds is None:
+        return True
+    left, top, right, bottom = map(int, bounds.groups())
+    return right > left and bottom > top
+
+
+def _same_element(element, node) -> bool:
+    """Le WebElement est-il le nœud du snapshot ? (bounds, sinon resource-id)"""
+    attribute = "bounds" if node.get("bounds") else "resource-id"
+    try:
+        return (element.get_attribute(attribute) or "") == node.get(attribute, "")
+    except Exception:          # élément détaché
+        return False
+
+
+@library(scope="GLOBAL", auto_keywords=False)
+class UiSyncLibrary:
+    """Attente de stabilité de l'interface (AppiumLibrary)."""
+
+    def __init__(self, timeout="10s", stable_samples=3, interval="0.2s",
+                 appium_library="AppiumLibrary"):
+        self.timeout        = timestr_to_secs(timeout)
+        self.stable_samples = int(stable_samples)
+        self.interval       = timestr_to_secs(interval)
+        self.appium_library = appium_library
+
+    def _driver(self):
+        return BuiltIn().get_library_instance(self.appium_library)._current_application()
+
+    def _page_source(self) -> str:
+        return self._driver().page_source
+
+    def _appium(self):
+        return BuiltIn().get_library_instance(self.appium_library)
+
+    def _activity(self) -> str:
+        return self._driver().current_activity or ""
+
+    def _fingerprint(self, activity: str) -> str:
+        """Activité + IDLE_MAX_NODES premières balises du page source (coût borné)."""
+        digest = hashlib.blake2b(activity.encode("utf-8"), digest_size=16)
+        for tag in islice(_OPEN_TAG.finditer(self._page_source()), IDLE_MAX_NODES):
+            digest.update(tag.group().encode("utf-8"))
+        return digest.hexdigest()
+
+    @keyword("Wait For UI Idle")
+    def wait_for_ui_idle(self, timeout=None, stable_samples=None, interval=None,
+                         fail_on_timeout=False) -> float:
+        """
+        Attend que l'empreinte de l'écran (activité + premiers nœuds du page
+        source) soit identique sur `stable_samples` relevés consécutifs espacés
+        d'au moins `interval`. Tant que l'activité change, le page source n'est
+        pas lu.
+
+        Retourne la durée d'attente en secondes. Au-delà de `timeout` ou de
+        IDLE_MAX_WINDOWS × `stable_samples` relevés, l'interface est considérée
+        comme animée en continu : avertissement (ou échec si `fail_on_timeout`)
+        et le test continue.
+        """
+        timeout     = timestr_to_secs(timeout) if timeout else self.timeout
+        required    = int(stable_samples) if stable_samples else self.stable_samples
+        interval    = timestr_to_secs(interval) if interval else self.interval
+        max_samples = IDLE_MAX_WINDOWS * required
+
+        start    = time.monotonic()
+        previous = activity = None
+        stable   = samples = sources = 0
+        while True:
+            sampled_at = time.monotonic()
+            current_activity = self._activity()
+            current = None
+            if current_activity == activity:
+                current  = self._fingerprint(current_activity)
+                sources += 1
+            activity = current_activity
+            samples += 1
+            stable   = stable + 1 if current is not None and current == previous else 1
+            previous = current
+            elapsed  = time.monotonic() - start
+            if stable >= required:
+                logger.info(f"UI stable après {elapsed:.2f}s ({samples} relevés, "
+                            f"{sources} page sources)")
+                return round(elapsed, 3)
+            if elapsed >= timeout or samples >= max_samples:
+                message = (f"UI toujours en mouvement après {elapsed:.2f}s "
+                           f"({samples} relevés, {stable}/{required} identiques)")
+                if is_truthy(fail_on_timeout):
+                    raise AssertionError(message)
+                logger.warn(message)
+                return round(elapsed, 3)
+            time.sleep(max(0.0, interval - (time.monotonic() - sampled_at)))
+
+    def _visible_on_device(self, locator: str) -> bool:
+        """Repli pour un locator non évaluable sur le snapshot : find_elements sur le device."""
+        try:
+            elements = self._appium().get_webelements(locator)
+            return bool(elements) and elements[0].is_displayed()
+        except Exception:          # élément disparu entre les deux appels
+            return False
+
+    def _visible_node(self, snapshot: UiSnapshot, locator: str):
+        """Premier nœud affiché du locator, ou None (ValueError si non évaluable)."""
+        parsed = _snapshot_locator(locator)
+        if parsed is None:
+            raise ValueError(f"Locator non évaluable sur le page source : {locator}")
+        return next((node for node in snapshot.find_all(*parsed) if _displayed(node)), None)
+
+    def _missing(self, snapshot: UiSnapshot, locators) -> list[str]:
+        missing = []
+        for locator in locators:
+            try:
+                visible = self._visible_node(snapshot, locator) is not None
+            except ValueError:
+                visible = self._visible_on_device(locator)
+            if not visible:
+                missing.append(locator)
+        return missing
+
+    @keyword("Elements Should Be Visible")
+    def elements_should_be_visible(self, *locators, timeout=None, interval=None) -> float:
+        """
+        Attend que tous les `locators` soient visibles, en vérifiant l'ensemble
+        sur un seul page source à chaque relevé (un aller-retour par relevé
+        au lieu d'un par locator).
+
+        Échoue après `timeout` en listant chaque locator encore absent.
+        Retourne la durée d'attente en secondes.
+        """
+        elapsed, _ = self._wait_visible(locators, timeout, interval)
+        return elapsed
+
+    def _wait_visible(self, locators, timeout=None, interval=None) -> tuple[float, UiSnapshot]:
+        """Attend la visibilité de tous les locators ; retourne (durée, dernier snapshot)."""
+        timeout  = timestr_to_secs(timeout) if timeout else self.timeout
+        interval = timestr_to_secs(interval) if interval else self.interval
+
+        start   = time.monotonic()
+        samples = 0
+        while True:
+            sampled_at = time.monotonic()
+            snapshot   = UiSnapshot(self._page_source())
+            missing    = self._missing(snapshot, locators)
+            samples   += 1
+            elapsed    = time.monotonic() - start
+            if not missing:
+                logger.info(f"{len(locators)} élément(s) visibles après {elapsed:.2f}s "
+                            f"({samples} relevés)")
+                return round(elapsed, 3), snapshot
+            if elapsed >= timeout:
+                raise AssertionError(
+                    f"{len(missing)}/{len(locators)} élément(s) non visibles après {elapsed:.2f}s :\n"
+                    + "\n".join(f"  • {locator}" for locator in missing))
+            time.sleep(max(0.0, interval - (time.monotonic() - sampled_at)))
+
+    # ── Saisie groupée ───────────────────────────────────────────────────
+
+    def _form_elements(self, snapshot: UiSnapshot, locators) -> dict:
+        """
+        WebElement de chaque champ : position du nœud parmi ceux de sa classe
+        dans le snapshot → un seul `find_elements` par classe. Chaque élément
+        ainsi obtenu est contrôlé (bounds, à défaut resource-id du nœud) avant
+        usage ; s'il ne correspond pas (écran modifié, ordre différent sur le
+        device), le champ est résolu par son propre locator.
+        """
+        nodes, positions, by_class = {}, {}, {}
+        for locator in locators:
+            try:
+                node = self._visible_node(snapshot, locator)
+            except ValueError:
+                node = None
+            if node is None:
+                continue
+            cls = node.get("class") or node.tag
+            if cls not in by_class:
+                by_class[cls] = [n for n in snapshot.nodes if (n.get("class") or n.tag) == cls]
+            nodes[locator]     = node
+            positions[locator] = (cls, by_class[cls].index(node))
+
+        driver, handles, elements = self._driver(), {}, {}
+        for locator in locators:
+            if locator in positions:
+                cls, index = positions[locator]
+                if cls not in handles:
+                    handles[cls] = driver.find_elements(CLASS_NAME, cls)
+                if (len(handles[cls]) == len(by_class[cls])
+                        and _same_element(handles[cls][index], nodes[locator])):
+                    elements[locator] = handles[cls][index]
+                    continue
+            found = self._appium().get_webelements(locator)
+            if not found:
+                raise AssertionError(f"Champ '{locator}' introuvable")
+            elements[locator] = found[0]
+        return elements
+
+    @keyword("Fill Form")
+    def fill_form(self, *fields, timeout=None, hide_keyboard=True) -> int:
+        """
+        Remplit un formulaire en une passe. `fields` : paires `locator    valeur`
+        ou un dictionnaire {locator: valeur}.
+
+        Les champs sont attendus sur un même page source, résolus par un
+        `find_elements` par classe de champ, puis effacés et saisis à la suite ;
+        le clavier n'est masqué qu'à la fin. Retourne le nombre de champs saisis.
+        """
+        if len(fields) == 1 and isinstance(fields[0], dict):
+            form = dict(fields[0])
+        elif len(fields) % 2 == 0:
+            form = dict(zip(fields[::2], fields[1::2]))
+        else:
+            raise ValueError("Fill Form attend des paires 'locator    valeur' ou un dictionnaire")
+
+        start       = time.monotonic()
+        _, snapshot = self._wait_visible(list(form), timeout)
+        elements    = self._form_elements(snapshot, list(form))
+        for locator, value in form.items():
+            element = elements[locator]
+            element.clear()
+            element.send_keys(str(value))
+
+        if is_truthy(hide_keyboard):
+            try:
+                self._driver().hide_keyboard()
+            except Exception:          # clavier déjà masqué
+                pass
+        logger.info(f"{len(form)} champ(s) saisis en {time.monotonic() - start:.2f}s")
+        return len(form)
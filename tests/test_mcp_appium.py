@@ -7,6 +7,7 @@ Fonctionne même SANS Appium installé grâce au mode simulation.
 import os
 import sys
 from pathlib import Path
+from unittest.mock import patch
 from dotenv import load_dotenv
 
 # ============================================================================
@@ -106,6 +107,12 @@ mcp_appium  = import_module("mcp_appium_server", appium_file)
 if mcp_appium is None:
     sys.exit(1)
 
+mcp_appium_postprocess = import_module("robot_postprocess", mcp_servers_dir / "robot_postprocess.py")
+
+# Historique d'exécution écrit hors du dépôt pendant les tests
+import tempfile
+mcp_appium.robot_jobs.JOBS_DIR = Path(tempfile.mkdtemp()) / "jobs"
+
 # Extraire les fonctions
 try:
     get_ui_hierarchy            = mcp_appium.get_ui_hierarchy
@@ -205,6 +212,8 @@ def test_get_page_source():
     return result["success"]
 
 
+# ---- Recherche d'éléments ----
+
 def test_find_element_by_resource_id():
     """Test 3a: Recherche par resource-id"""
     print("\n" + "="*60)
@@ -276,6 +285,207 @@ def test_find_element_not_found():
     return result["success"]
 
 
+def test_find_element_snapshot_xpath():
+    """Test 3d: Résolution locale (snapshot) d'un XPath + classe"""
+    print("\n" + "="*60)
+    print("TEST 3d: find_element_by_strategies (snapshot xpath / class_name)")
+    print("="*60)
+
+    result = find_element_by_strategies(
+        xpath="//android.widget.EditText[@content-desc='Champ mot de passe']",
+        class_name="android.widget.CheckBox",
+    )
+
+    assert result["success"], result.get("error")
+
+    found    = result.get("found", False)
+    strategy = result.get("strategy_used")
+    print(f"{'✅' if found else '⚠'} Stratégie: {strategy} | "
+          f"Résolution: {result.get('resolution')} | {result.get('lookup_ms')} ms")
+
+    if result.get("simulation"):
+        # La cascade garde l'ordre : class_name est tentée avant xpath
+        assert found and strategy == "class_name" and result.get("match_count") == 1
+
+
+def test_find_element_race_mode():
+    """Test 3e: Mode course — toutes les stratégies sur chaque page source"""
+    print("\n" + "="*60)
+    print("TEST 3e: find_element_by_strategies (race=True)")
+    print("="*60)
+
+    result = find_element_by_strategies(
+        resource_id="id_qui_nexiste_pas_xyz",
+        text="Se connecter",
+        race=True,
+        timeout=2,
+    )
+
+    assert result["success"], result.get("error")
+
+    timings = result.get("strategy_timings", {})
+    print(f"{'✅' if result.get('found') else '⚠'} Stratégie: {result.get('strategy_used')} | "
+          f"Polls: {result.get('polls')}")
+    for name, timing in timings.items():
+        print(f"  {name:<14} eval={timing['evaluations']}  avg={timing['avg_ms']} ms  "
+              f"hit_at={timing['hit_at_ms']}")
+
+    if result.get("simulation"):
+        assert (result.get("found") and result.get("strategy_used") == "text"
+                and timings.get("resource_id", {}).get("hit_at_ms") is None)
+    else:
+        assert set(timings) == {"resource_id", "text"}
+
+
+def test_find_element_live_state_error():
+    """Test 3e bis: Échec de l'état live remonté (live_state_error), sans repli simulé"""
+    print("\n" + "="*60)
+    print("TEST 3e bis: find_element_by_strategies (live_state, requête device en échec)")
+    print("="*60)
+
+    class FakeDriver:
+        page_source = mcp_appium._get_mock_page_source()
+
+        def find_element(self, *locator):
+            raise RuntimeError("StaleElementReferenceException")
+
+        def quit(self):
+            pass
+
+    with patch.object(mcp_appium, "APPIUM_AVAILABLE", True), \
+         patch.object(mcp_appium, "_get_driver", lambda *a, **k: FakeDriver()):
+        result = find_element_by_strategies(text="Se connecter", live_state=True)
+    print(f"  found={result.get('found')}  simulation={result['simulation']}  "
+          f"live_state={result.get('live_state')}  erreur={result.get('live_state_error')}")
+
+    assert (result["success"] and result["found"] and not result["simulation"]
+            and result["live_state"] is False
+            and "StaleElementReferenceException" in result["live_state_error"])
+
+
+# ---- Qualité des locators ----
+
+def test_locator_uniqueness():
+    """Test 3f: Comptage des matchs et rétrogradation des locators ambigus"""
+    print("\n" + "="*60)
+    print("TEST 3f: unicité des locators (_extract_enriched_elements)")
+    print("="*60)
+
+    import xml.etree.ElementTree as ET
+    xml = """<hierarchy>
+      <android.widget.Button class="android.widget.Button" resource-id="pkg:id/btn_add" text="Ajouter"/>
+      <android.widget.Button class="android.widget.Button" resource-id="pkg:id/btn_add" text="Ajouter"/>
+      <android.widget.Button class="android.widget.Button" resource-id="pkg:id/btn_pay" text="Payer"/>
+    </hierarchy>"""
+    elements = mcp_appium._extract_enriched_elements(ET.fromstring(xml))
+    by_id    = {}
+    for elem in elements:
+        by_id.setdefault(elem["short_id"], elem)
+        matches = {k: v["count"] for k, v in elem["locator_matches"].items()}
+        print(f"  {elem['short_id']:<10} quality={elem['locator_quality']:<8} "
+              f"ambiguous={elem['ambiguous']}  matches={matches}")
+
+    add, pay = by_id["btn_add"], by_id["btn_pay"]
+    assert (add["locator_quality"] == "fragile" and add["ambiguous"]
+            and add["locator_matches"]["by_id"] == {"count": 2, "unique": False}
+            and pay["locator_quality"] == "robust"
+            and pay["locator_matches"]["by_class_text"]["count"] == 1)
+
+
+def test_locator_synthesizer():
+    """Test 3g: Locator unique le moins coûteux (LocatorSynthesizer)"""
+    print("\n" + "="*60)
+    print("TEST 3g: synthèse du locator unique le moins coûteux")
+    print("="*60)
+
+    from ui_snapshot import UiSnapshot, parse_locator
+    from locator_synthesizer import LocatorSynthesizer
+
+    xml = """<hierarchy>
+      <android.widget.ScrollView class="android.widget.ScrollView" resource-id="pkg:id/form">
+        <android.view.View class="android.view.View" content-desc="First Name"/>
+        <android.widget.EditText class="android.widget.EditText"/>
+        <android.view.View class="android.view.View" content-desc="Last Name"/>
+        <android.widget.EditText class="android.widget.EditText"/>
+      </android.widget.ScrollView>
+      <android.widget.Button class="android.widget.Button" resource-id="pkg:id/btn_add" text="Ajouter"/>
+      <android.widget.Button class="android.widget.Button" resource-id="pkg:id/btn_add" text="Retirer"/>
+      <android.widget.Button class="android.widget.Button" resource-id="pkg:id/btn_pay" text="Payer"/>
+      <android.widget.ImageView class="android.widget.ImageView"/>
+    </hierarchy>"""
+    snapshot = UiSnapshot(xml)
+    synth    = LocatorSynthesizer.from_snapshot(snapshot)
+
+    expected = {
+        "btn_pay":  "id",
+        "Ajouter":  "uiautomator",
+        "EditText": "xpath",
+        "ImageView": "xpath",
+    }
+    seen = {}
+    ok   = True
+    for node in snapshot.nodes[1:]:
+        best    = synth.synthesize(node)
+        matches = snapshot.find_all(*parse_locator(best["locator"]))
+        unique  = len(matches) == 1 and matches[0] is node
+        ok      = ok and unique
+        print(f"  {node.get('class').split('.')[-1]:<10} {best['strategy']:<16} "
+              f"unique={unique}  {best['locator']}")
+        for key in (node.get("resource-id", "").split("/")[-1], node.get("text"),
+                    node.get("class").split(".")[-1]):
+            if key in expected:
+                seen.setdefault(key, best["strategy"])
+
+    assert ok and seen == expected
+
+
+def test_profile_robot_locators():
+    """Test 3h: Profil de latence des locators des ressources Robot"""
+    print("\n" + "="*60)
+    print("TEST 3h: profile_robot_locators (stand-in WebDriver)")
+    print("="*60)
+
+    import tempfile
+    xml = """<hierarchy>
+      <android.widget.ScrollView class="android.widget.ScrollView">
+        <android.view.View class="android.view.View" content-desc="First Name"/>
+        <android.widget.EditText class="android.widget.EditText"/>
+        <android.view.View class="android.view.View" content-desc="Last Name"/>
+        <android.widget.EditText class="android.widget.EditText"/>
+      </android.widget.ScrollView>
+    </hierarchy>"""
+    with tempfile.NamedTemporaryFile("w", suffix=".xml", delete=False) as f:
+        f.write(xml)
+
+    result = mcp_appium.profile_robot_locators(
+        resources="tests/resources/AppVariables.robot", iterations=3,
+        page_source_file=f.name, top=100)
+    # XPath ancré sur le label : jamais remplacé par un instance(n) global
+    anchored = Path(tempfile.mkdtemp()) / "anchored.robot"
+    anchored.write_text(
+        "*** Variables ***\n${FIRSTNAME}    "
+        "xpath=//*[@content-desc='First Name']/following-sibling::android.widget.EditText[1]\n",
+        encoding="utf-8")
+    anchored_row = mcp_appium.profile_robot_locators(
+        resources=str(anchored), iterations=1, page_source_file=f.name)["locators"][0]
+    os.unlink(f.name)
+    assert result["success"], result.get("error")
+
+    rows = {r["name"]: r for r in result["locators"]}
+    for row in result["locators"][:5]:
+        print(f"  {row['name']:<26} p95={row['p95_ms']}ms  matchs={row['match_count']}  "
+              f"→ {row['suggestion']}")
+
+    first = rows["SIGNUP_INPUT_FIRSTNAME"]
+    assert (result["backend"] == "snapshot"
+            and first["match_count"] == 1
+            and first["suggestion"] == 'android=new UiSelector().className("android.widget.EditText").instance(0)'
+            and first["suggestion_positional"]
+            and anchored_row["match_count"] == 1 and anchored_row["suggestion"] is None
+            and rows["SIGNUP_LABEL_FIRSTNAME"]["suggestion"] is None
+            and rows["HOME_CATEGORY_ALL"]["match_count"] == 0)
+
+
 def test_suggest_alternative_locators():
     """Test 4: Self-healing — suggestions de locators alternatifs"""
     print("\n" + "="*60)
@@ -314,6 +524,8 @@ def test_suggest_alternative_locators():
     return result["success"]
 
 
+# ---- Capture d'écran ----
+
 def test_take_screenshot():
     """Test 5: Capture d'écran"""
     print("\n" + "="*60)
@@ -348,6 +560,8 @@ def test_take_screenshot():
     return result["success"]
 
 
+# ---- Exécution Robot Framework ----
+
 def test_execute_robot_test():
     """Test 6: Exécution d'un test Robot Framework"""
     print("\n" + "="*60)
@@ -373,6 +587,989 @@ def test_execute_robot_test():
 
     print(f"⚠ Résultat: {result.get('error', 'Inconnu')} — peut être normal si RF non installé")
     return True  # Non bloquant
+    # Non bloquant
+
+
+def test_robot_job_lifecycle():
+    """Test 6b: Job Robot en arrière-plan — progression (listener) puis annulation"""
+    print("\n" + "="*60)
+    print("TEST 6b: execute_robot_test → get_robot_job_status → cancel_robot_job")
+    print("="*60)
+
+    import tempfile
+    import time
+    tmp = Path(tempfile.mkdtemp())
+    with patch.object(mcp_appium.robot_jobs, "JOBS_DIR", tmp / "jobs"):
+        suite = tmp / "slow.robot"
+        suite.write_text("*** Test Cases ***\nQuick\n    Log    ok\nSlow\n    Sleep    60s\n",
+                         encoding="utf-8")
+
+        started = execute_robot_test(test_file=str(suite), output_dir=str(tmp / "results"))
+        assert started["success"] and started["status"] == "running", f"Job non démarré: {started}"
+        job_id = started["job_id"]
+        print(f"  Job lancé : {job_id}")
+
+        status = mcp_appium.get_robot_job_status(job_id)
+        for _ in range(40):
+            if status["tests"]:
+                break
+            time.sleep(0.25)
+            status = mcp_appium.get_robot_job_status(job_id)
+        print(f"  Statut    : {status['status']}  tests terminés={[t['name'] for t in status['tests']]}"
+              f"  en cours={status['running_test']}  attendus={status['expected_total']}")
+
+        cancelled = mcp_appium.cancel_robot_job(job_id)
+        final     = mcp_appium.get_robot_job_status(job_id)
+        print(f"  Annulation: {cancelled['status']}  → statut final {final['status']}")
+
+        assert (status["status"] == "running"
+                and [t["name"] for t in status["tests"]] == ["Quick"]
+                and status["running_test"] == "Slow.Slow" and status["expected_total"] == 2
+                and cancelled["success"] and final["status"] == "cancelled" and final["done"])
+
+
+def test_plan_shards():
+    """Test 6c: Découpage LPT des suites par durée historique"""
+    print("\n" + "="*60)
+    print("TEST 6c: robot_shards.plan_shards (équilibrage par durée)")
+    print("="*60)
+
+    units = [{"key": k, "file": k, "test": None, "tests": n}
+             for k, n in [("a.robot", 4), ("b.robot", 2), ("c.robot", 2), ("d.robot", 1), ("e.robot", 3)]]
+    durations = {"a.robot": 120.0, "b.robot": 60.0, "c.robot": 50.0, "d.robot::T1": 10.0}
+    shards = mcp_appium.robot_shards.plan_shards(units, 2, durations)
+    for shard in shards:
+        print(f"  shard {shard['index']} : {shard['estimated_s']:>6}s  {[u['key'] for u in shard['units']]}")
+
+    loads = sorted(shard["estimated_s"] for shard in shards)
+
+    # Sans registre : device i → udid + systemPort propres au shard
+    robot_shards = mcp_appium.robot_shards
+    args = robot_shards._shard_args(shards[0], {"device_name": "emulator-5556", "system_port": 8201}, [])
+    print(f"  Arguments shard 0 : {args[:8]}")
+
+    # Registre configuré : chaque shard loue son device au lancement
+    import tempfile
+    import time
+    tmp = Path(tempfile.mkdtemp())
+    env = {"ROBOT_DEVICES": "http://127.0.0.1:4723|emulator-5554,http://127.0.0.1:4725|emulator-5556",
+           "ADB_PATH": str(tmp / "absent"), "DEVICE_LEASES_FILE": str(tmp / "leases.json")}
+    for name in ("one", "two"):
+        (tmp / f"{name}.robot").write_text(
+            f"*** Test Cases ***\n{name}\n    Should Be Equal    ${{UDID}}    ${{DEVICE_NAME}}\n"
+            "    Log To Console    shard=${UDID}:${SYSTEM_PORT}\n", encoding="utf-8")
+    with patch.dict(os.environ, env), \
+         patch.object(mcp_appium.device_discovery, "ADB_PATH", env["ADB_PATH"]), \
+         patch.object(mcp_appium.device_leases, "DEVICE_LEASES_FILE", Path(env["DEVICE_LEASES_FILE"])), \
+         patch.object(mcp_appium.robot_jobs, "JOBS_DIR", tmp / "jobs"), \
+         patch.object(robot_shards, "DURATIONS_FILE", tmp / "durations.json"):
+        run = robot_shards.start_sharded_run([tmp], None, tmp / "results")
+        for _ in range(120):
+            if run.get("done"):
+                break
+            time.sleep(0.25)
+            run = robot_shards.sharded_run_status(run["run_id"])
+        consoles = [mcp_appium.robot_jobs.job_status(s["job_id"], include_console=True).get("console", "")
+                    for s in run["shards"]]
+    seen = sorted(line.split("shard=")[1].strip() for c in consoles for line in c.splitlines()
+                  if "shard=" in line)
+    print(f"  Run sous bail : {run['status']}  devices={seen}")
+
+    # Sans device ni registre : `workers` ignoré, un seul shard
+    with patch.object(mcp_appium.robot_jobs, "JOBS_DIR", tmp / "jobs"), \
+         patch.object(robot_shards, "DURATIONS_FILE", tmp / "durations.json"):
+        single = robot_shards.start_sharded_run([tmp / "one.robot"], None, tmp / "single", workers=3)
+        mcp_appium.robot_jobs.wait_job(single["shards"][0]["job_id"], 30)
+    print(f"  workers=3 sans device : {len(single['shards'])} shard ({single.get('warning')})")
+
+    # Découpage par test : un homonyme d'un autre fichier du shard n'est pas embarqué
+    (tmp / "a.robot").write_text("*** Test Cases ***\nOther\n    No Operation\nSmoke\n    No Operation\n",
+                                 encoding="utf-8")
+    (tmp / "b.robot").write_text("*** Test Cases ***\nSmoke\n    No Operation\n", encoding="utf-8")
+    shard = {"index": 0, "units": [{"file": str(tmp / "a.robot"), "test": "Other"},
+                                   {"file": str(tmp / "b.robot"), "test": "Smoke"}]}
+    import subprocess
+    dry = subprocess.run([sys.executable, "-m", "robot", "--dryrun", "--output", "NONE", "--log", "NONE",
+                          "--report", "NONE", *robot_shards._shard_args(shard, None, [])],
+                         capture_output=True, text=True)
+    selected = [line.split("|")[0].strip() for line in dry.stdout.splitlines() if line.endswith("| PASS |")]
+    print(f"  Shard par test : {selected}")
+
+    # d.robot et e.robot (inconnus) = médiane par test connue (10s) × nombre de tests
+    assert (loads == [130.0, 140.0] and len(shards) == 2
+            and "UDID:emulator-5556" in args and "SYSTEM_PORT:8201" in args
+            and run["done"] and run["status"] == "passed" and len(run["shards"]) == 2
+            and seen == ["emulator-5554:8200", "emulator-5556:8201"])
+    assert len(single["shards"]) == 1 and "workers=3" in single["warning"]
+    assert selected == ["Other", "Shard 0.A", "Smoke", "Shard 0.B", "Shard 0"]
+
+
+def test_parse_robot_output():
+    """Test 6d: Lecture en flux de output.xml (tests, keywords, durées)"""
+    print("\n" + "="*60)
+    print("TEST 6d: get_robot_results (iterparse output.xml)")
+    print("="*60)
+
+    import subprocess
+    import tempfile
+    tmp   = Path(tempfile.mkdtemp())
+    suite = tmp / "results.robot"
+    suite.write_text(
+        "*** Test Cases ***\n"
+        "Passe\n    [Tags]    smoke\n    Log    ok\n"
+        "Echoue\n    Verifier    2\n"
+        "Ignore\n    Skip    pas de device\n"
+        "*** Keywords ***\n"
+        "Verifier\n    [Arguments]    ${n}\n    Should Be Equal    1    ${n}    msg=boom\n",
+        encoding="utf-8")
+    subprocess.run([sys.executable, "-m", "robot", "--nostatusrc", "--outputdir", str(tmp),
+                    "--log", "NONE", "--report", "NONE", str(suite)], capture_output=True)
+
+    results = mcp_appium.get_robot_results(str(tmp / "output.xml"), keyword_depth=1)
+    assert results["success"], results["error"]
+    failed = next(t for t in results["tests"] if t["status"] == "FAIL")
+    print(f"  Stats          : {results['stats']}")
+    print(f"  Échec          : {failed['longname']} — {failed['message']}")
+    print(f"  Keyword fautif : {failed['failed_keyword']['path']} {failed['failed_keyword']['args']}")
+
+    only_failed = mcp_appium.get_robot_results(str(tmp / "output.xml"), failed_only=True)
+    assert (results["stats"] == {"total": 3, "passed": 1, "failed": 1, "skipped": 1}
+            and failed["failed_keyword"]["path"] == "Verifier > Should Be Equal"
+            and failed["keywords"][0]["args"] == ["2"]
+            and results["tests"][0]["tags"] == ["smoke"]
+            and [t["name"] for t in only_failed["tests"]] == ["Echoue", "Ignore"])
+
+
+def test_impacted_tests():
+    """Test 6e: Sélection des tests impactés (locator → keywords → tests)"""
+    print("\n" + "="*60)
+    print("TEST 6e: select_impacted_tests + execute_robot_test(impacted_by)")
+    print("="*60)
+
+    selection = mcp_appium.select_impacted_tests(["${HOME_CATEGORY_PIZZA}"])
+    for test in selection["tests"]:
+        print(f"  {test['name'][:45]:<45} ← {' > '.join(test['via'][:-1])}")
+    names = [t["name"].split(" :")[0] for t in selection["tests"]]
+
+    import tempfile
+    tmp = Path(tempfile.mkdtemp())
+    with patch.object(mcp_appium.robot_jobs, "JOBS_DIR", tmp / "jobs"):
+        (tmp / "page.resource").write_text(
+            "*** Variables ***\n${BTN_OK}    id=btn_ok\n${BTN_KO}    id=btn_ko\n"
+            "*** Keywords ***\nClick Ok\n    Log    ${BTN_OK}\nClick Ko\n    Log    ${BTN_KO}\n",
+            encoding="utf-8")
+        (tmp / "suite.robot").write_text(
+            "*** Settings ***\nResource    page.resource\n"
+            "*** Test Cases ***\nUses Ok\n    Click Ok\nUses Ko\n    Click Ko\n",
+            encoding="utf-8")
+        run = execute_robot_test(test_file=str(tmp / "suite.robot"), output_dir=str(tmp / "results"),
+                                 wait_seconds=30, impacted_by=["btn_ko"])
+        nothing = execute_robot_test(test_file=str(tmp / "suite.robot"), output_dir=str(tmp / "results"),
+                                     impacted_by=["btn_absent"])
+        print(f"  Exécutés      : {[t['name'] for t in run.get('tests', [])]}")
+        print(f"  Sans impact   : {nothing['status']}  all_passed={nothing['all_passed']}")
+
+        assert (names == ["TC-HOME-003", "TC-HOME-008"]
+                and run["status"] == "passed" and [t["name"] for t in run["tests"]] == ["Uses Ko"]
+                and nothing["nothing_to_run"] and nothing["all_passed"] is None)
+
+
+def test_rerun_failed():
+    """Test 6f: Rejeu des seuls tests en échec + fusion et tentatives par test"""
+    print("\n" + "="*60)
+    print("TEST 6f: execute_robot_test(rerun_failed=job_id)")
+    print("="*60)
+
+    import tempfile
+    tmp    = Path(tempfile.mkdtemp())
+    marker = tmp / "marker"
+    with patch.object(mcp_appium.robot_jobs, "JOBS_DIR", tmp / "jobs"):
+        suite = tmp / "flaky.robot"
+        suite.write_text(
+            "*** Settings ***\nLibrary    OperatingSystem\n"
+            "*** Test Cases ***\nStable\n    Log    ok\n"
+            f"Flaky\n    ${{ok}}=    Run Keyword And Return Status    File Should Exist    {marker.as_posix()}\n"
+            f"    Create File    {marker.as_posix()}\n    Should Be True    ${{ok}}\n",
+            encoding="utf-8")
+        first = execute_robot_test(test_file=str(suite), output_dir=str(tmp / "results"), wait_seconds=30)
+        rerun = execute_robot_test(test_file=str(suite), output_dir=str(tmp / "results"), wait_seconds=30,
+                                   rerun_failed=first["job_id"])
+        attempts = {t["name"]: t["attempts"] for t in rerun.get("tests", [])}
+        print(f"  1re passe : {first['passed']}/{first['total']}  → rejeu : {rerun['passed']}/{rerun['total']}")
+        print(f"  Tentatives: {attempts}")
+
+        assert (first["failed"] == 1 and rerun["status"] == "passed" and rerun["total"] == 2
+                and attempts == {"Stable": 1, "Flaky": 2} and rerun["retries"] == {"Flaky.Flaky": 1})
+
+
+def test_prioritized_execution():
+    """Test 6g: Ordre fail-fast (historique d'échecs + locator modifié)"""
+    print("\n" + "="*60)
+    print("TEST 6g: execute_robot_test(prioritize=True)")
+    print("="*60)
+
+    import tempfile
+    tmp = Path(tempfile.mkdtemp())
+    with patch.object(mcp_appium.robot_jobs, "JOBS_DIR", tmp / "jobs"):
+        (tmp / "page.resource").write_text("*** Variables ***\n${BTN}    id=btn_ok\n", encoding="utf-8")
+        suite = tmp / "order.robot"
+        suite.write_text(
+            "*** Settings ***\nResource    page.resource\n"
+            "*** Test Cases ***\nStable\n    Log    ok\nUses Button\n    Log    ${BTN}\n"
+            "Broken\n    Fail    boom\n",
+            encoding="utf-8")
+
+        jobs = []
+
+        def order(**kwargs):
+            run = execute_robot_test(test_file=str(suite), output_dir=str(tmp / "results"),
+                                     wait_seconds=30, **kwargs)
+            jobs.append(run["job_id"])
+            return [t["name"] for t in run["tests"]]
+
+        first = order(prioritize=True)         # pas d'historique : ordre du fichier
+        second = order(prioritize=True)        # Broken a échoué → en tête
+        (tmp / "page.resource").write_text("*** Variables ***\n${BTN}    id=btn_new\n", encoding="utf-8")
+        history = mcp_appium.history_store.history_db()
+        store   = mcp_appium.history_store.HistoryStore()
+        before  = store.locator_snapshot()
+        preview = mcp_appium.get_test_priorities(paths=[str(suite)])   # lecture seule
+        untouched = store.locator_snapshot() == before
+        store.close()
+        third = order(prioritize=True)         # locator modifié depuis le dernier PASS → en tête
+        print(f"  Sans historique : {first}")
+        print(f"  Après 1 run     : {second}")
+        print(f"  Aperçu          : {[t['name'] for t in preview['tests']]}")
+        print(f"  Locator modifié : {third}")
+
+        assert (first == ["Stable", "Uses Button", "Broken"]
+                and second[0] == "Broken" and third[0] == "Uses Button")
+        assert history.parent == tmp / "jobs"
+        assert (untouched and preview["tests"][0]["name"] == "Uses Button"
+                and preview["locator_changes"] == 1)
+        # Fichier d'ordre dans le dossier de chaque job, rien ne s'accumule à côté
+        assert (all((tmp / "jobs" / job / "priority_order.json").exists() for job in jobs)
+                and not (tmp / "jobs" / "priority").exists())
+
+
+def test_history_store():
+    """Test 6h: Historique SQLite (Allure + output.xml, chargement incrémental)"""
+    print("\n" + "="*60)
+    print("TEST 6h: HistoryStore / query_test_history")
+    print("="*60)
+
+    import shutil
+    import tempfile
+    allure = Path(__file__).resolve().parent.parent / "agents" / "output" / "allure"
+    if not allure.exists():
+        print("  ⚠️  agents/output/allure absent — test ignoré")
+        return
+    tmp = Path(tempfile.mkdtemp())
+    shutil.copytree(allure, tmp / "allure")
+
+    store  = mcp_appium.history_store.HistoryStore(tmp / "history.db")
+    first  = store.ingest([tmp / "allure"])
+    second = store.ingest([tmp / "allure"])
+    trend  = store.duration_trend("TC-MENU-03")
+    setup  = store.failures(phase="setup")
+    store.close()
+    print(f"  1er chargement : {first}")
+    print(f"  2e chargement  : {second}")
+    print(f"  TC-MENU-03     : {[t['duration_s'] for t in trend]}")
+    print(f"  Échecs setup   : {len(setup)}")
+
+    query = mcp_appium.query_test_history(query="failures", phase="setup", limit=5)
+    print(f"  Outil MCP      : {query['count']} lignes en {query['query_ms']} ms")
+
+    assert (first["files"] > 0 and first["results"] > 0 and second["files"] == 0
+            and len(trend) > 0 and [t["start"] for t in trend] == sorted(t["start"] for t in trend)
+            and len(setup) > 0 and all("Setup failed" in f["message"] for f in setup)
+            and query["success"])
+
+
+def test_failure_classifier():
+    """Test 6i: Classement des échecs (flaky / infrastructure / réel)"""
+    print("\n" + "="*60)
+    print("TEST 6i: FailureClassifier")
+    print("="*60)
+
+    import json
+    import tempfile
+    tmp = Path(tempfile.mkdtemp())
+    device = ("Setup failed:\nWebDriverException: Message: Unable to find an active device "
+              "or emulator with OS 13.0. The following are available: 82403e660602 (12)")
+    runs = {
+        "TC-DEMO-01 Flaky":  ["passed", "failed", "passed", "failed", "passed", "failed"],
+        "TC-DEMO-02 Real":   ["passed", "passed", "failed", "failed", "failed", "failed"],
+        "TC-DEMO-03 Device": ["passed", "passed", "passed", "passed", "passed", "failed"],
+    }
+    for name, statuses in runs.items():
+        for i, status in enumerate(statuses):
+            message = (device if "Device" in name else "Element 'id=btn_ok' not visible")
+            result  = {"name": name, "status": status, "uuid": f"{name[:10]}-{i}",
+                       "statusDetails": {"message": message if status == "failed" else ""},
+                       "start": 1_700_000_000_000 + i * 60_000,
+                       "stop":  1_700_000_000_000 + i * 60_000 + 5_000}
+            (tmp / f"{name[:10]}-{i}-result.json").write_text(json.dumps(result), encoding="utf-8")
+
+    store = mcp_appium.history_store.HistoryStore(tmp / "history.db")
+    store.ingest([tmp])
+    classifier = mcp_appium.FailureClassifier(store)
+    verdicts   = {v["test_id"]: v for v in classifier.classify_latest()}
+    quarantined = store.quarantined()
+    store.close()
+    for test, verdict in sorted(verdicts.items()):
+        print(f"  {test}: {verdict['category']:<14} → {verdict['action']:<10} ({verdict['reason']})")
+    print(f"  Quarantaine : {sorted(quarantined)}")
+
+    assert (verdicts["TC-DEMO-01"]["category"] == "flaky"
+            and verdicts["TC-DEMO-01"]["action"] == "quarantine"
+            and verdicts["TC-DEMO-02"]["category"] == "real"
+            and verdicts["TC-DEMO-03"]["category"] == "infrastructure"
+            and list(quarantined) == ["TC-DEMO-01"])
+
+    # En quarantaine : le test tourne, son échec devient SKIP ; ses PASS l'en font sortir
+    with patch.object(mcp_appium.robot_jobs, "JOBS_DIR", tmp / "jobs"):
+        store = mcp_appium.history_store.HistoryStore()
+        store.quarantine("TC-DEMO-01", "flaky chronique")
+        store.close()
+        suite = tmp / "quarantine.robot"
+        suite.write_text("*** Test Cases ***\nTC-DEMO-01 Flaky\n    Fail    boom\n"
+                         "TC-DEMO-02 Real\n    Log    ok\n", encoding="utf-8")
+        failing = execute_robot_test(test_file=str(suite), output_dir=str(tmp / "results"),
+                                     wait_seconds=30)
+        suite.write_text("*** Test Cases ***\nTC-DEMO-01 Flaky\n    Log    ok\n", encoding="utf-8")
+        streak = [execute_robot_test(test_file=str(suite), output_dir=str(tmp / "results"),
+                                     wait_seconds=30)["passed"]
+                  for _ in range(5)]                              # QUARANTINE_RELEASE_PASSES
+        store = mcp_appium.history_store.HistoryStore()
+        released = "TC-DEMO-01" not in store.quarantined()
+        store.close()
+    print(f"  Quarantaine → failed={failing['failed']} skipped={failing['skipped']}, "
+          f"libéré après {len(streak)} PASS : {released}")
+
+    assert failing["failed"] == 0 and failing["skipped"] == 1 and failing["passed"] == 1
+    assert ((tmp / "jobs" / failing["job_id"] / "quarantine.json").exists()
+            and not (tmp / "jobs" / "quarantine").exists())
+    assert streak == [1] * len(streak) and released
+
+
+def test_keyword_profile():
+    """Test 6j: Profil de temps par keyword (listener de chronométrage)"""
+    print("\n" + "="*60)
+    print("TEST 6j: robot_timing_listener → get_keyword_profile")
+    print("="*60)
+
+    import tempfile
+    tmp = Path(tempfile.mkdtemp())
+    with patch.object(mcp_appium.robot_jobs, "JOBS_DIR", tmp / "jobs"):
+        suite = tmp / "timed.robot"
+        suite.write_text(
+            "*** Keywords ***\nWait For Page Load\n    Sleep    0.2s\n"
+            "*** Test Cases ***\nNavigate\n    Log    start\n    Wait For Page Load\n"
+            "    Wait For Page Load\n",
+            encoding="utf-8")
+
+        run = execute_robot_test(test_file=str(suite), output_dir=str(tmp / "results"), wait_seconds=30)
+        profile = mcp_appium.get_keyword_profile(job_id=run["job_id"], top=3)
+        assert profile["success"], profile["error"]
+        for row in profile["hotspots"]:
+            print(f"  {row['self_s']:>6.3f}s  {row['calls']}×  {row['owner'] or ''}  {row['keyword']}")
+        folded = Path(profile["folded"]).read_text(encoding="utf-8").splitlines()
+        print(f"  Piles     : {folded[:2]}")
+
+        sleep = profile["hotspots"][0]
+        takes = mcp_appium.robot_timing_listener.RobotTimingListener(str(tmp / "p"))._takes_locator
+        assert (sleep["keyword"] == "Sleep" and sleep["calls"] == 2 and sleep["self_s"] >= 0.4
+                and any(line.startswith("Timed;Navigate;Wait For Page Load;BuiltIn.Sleep ")
+                        for line in folded)
+                and takes("AppiumLibrary", "Wait Until Element Is Visible")
+                and not takes("BuiltIn", "Sleep"))
+
+
+# ---- Librairies de keywords Robot ----
+
+def test_wait_for_ui_idle():
+    """Test 6k: Wait For UI Idle (UiSyncLibrary) + remplacement des Sleep générés"""
+    print("\n" + "="*60)
+    print("TEST 6k: UiSyncLibrary.Wait For UI Idle / robot_postprocess")
+    print("="*60)
+
+    libraries = Path(__file__).resolve().parent / "resources" / "libraries"
+    ui_sync   = import_module("UiSyncLibrary", libraries / "UiSyncLibrary.py")
+
+    reads = []
+
+    def waiter(sources, activities=(".Main",)):
+        library = ui_sync.UiSyncLibrary(timeout="2s", stable_samples=3, interval="0.01s")
+        frames, screens = iter(sources), iter(activities)
+        library._activity    = lambda: next(screens, activities[-1])
+        library._page_source = lambda: reads.append(1) or next(frames, sources[-1])
+        return library
+
+    # Animation sur 4 relevés puis écran figé : attente courte
+    settling = waiter(["<a/>", "<b/>", "<c/>", "<d/>", "<e/>"])
+    waited   = settling.wait_for_ui_idle()
+    print(f"  Écran qui se stabilise : {waited:.2f}s")
+
+    # Changement d'activité en cours : le page source n'est pas lu
+    reads.clear()
+    waiter(["<a/>"], activities=(".Splash", ".Login", ".Home", ".Home")).wait_for_ui_idle()
+    print(f"  Transition d'activité  : {len(reads)} page sources lus")
+
+    # Écran animé en continu : abandon après IDLE_MAX_WINDOWS × stable_samples relevés,
+    # bien avant le timeout ; échec si demandé
+    import itertools
+    counter = itertools.count()
+    endless = ui_sync.UiSyncLibrary(timeout="10s", stable_samples=3, interval="0.01s")
+    endless._activity    = lambda: ".Main"
+    endless._page_source = lambda: f"<frame n='{next(counter)}'/>"
+    timed_out = endless.wait_for_ui_idle()
+    try:
+        endless.wait_for_ui_idle(fail_on_timeout=True)
+        strict_failed = False
+    except AssertionError:
+        strict_failed = True
+    print(f"  Écran animé            : {timed_out:.2f}s (échec strict : {strict_failed})")
+
+    suite = Path(__file__).resolve().parent.parent / "agents" / "tests" / "suites" / "menu" / "generated.robot"
+    content, notes = mcp_appium_postprocess.postprocess_suite(
+        "*** Settings ***\nLibrary    AppiumLibrary\n\n*** Test Cases ***\nT\n    Click Element    id=ok\n"
+        "    Sleep    2s\n", suite)
+    print(f"  Post-traitement        : {notes}")
+
+    assert (waited < 1.0 and len(reads) == 3 and timed_out < 1.0 and strict_failed
+            and "Sleep" not in content and "    Wait For UI Idle\n" in content
+            and "Library           ../../../../tests/resources/libraries/UiSyncLibrary.py" in content)
+
+
+def test_elements_should_be_visible():
+    """Test 6l: Elements Should Be Visible — N locators vérifiés sur un seul page source"""
+    print("\n" + "="*60)
+    print("TEST 6l: UiSyncLibrary.Elements Should Be Visible")
+    print("="*60)
+
+    libraries = Path(__file__).resolve().parent / "resources" / "libraries"
+    ui_sync   = import_module("UiSyncLibrary", libraries / "UiSyncLibrary.py")
+
+    screen = ("<hierarchy>"
+              "<android.widget.EditText text='Search' bounds='[0,100][1080,200]'/>"
+              "<android.view.View content-desc='All' bounds='[0,300][200,400]'/>"
+              "<android.view.View content-desc='Menu&#10;Tab 1 of 2' bounds='[0,2000][540,2200]'/>"
+              "<android.view.View content-desc='Pizza' displayed='false' bounds='[0,300][200,400]'/>"
+              "<android.view.View content-desc='Pasta' bounds='[0,0][0,0]'/>"
+              "<android.widget.Button resource-id='com.example:id/btn_login' bounds='[0,500][200,600]'/>"
+              "</hierarchy>")
+    library = ui_sync.UiSyncLibrary(timeout="0.2s", interval="0.02s")
+    fetches = []
+    library._page_source = lambda: fetches.append(1) or screen
+
+    waited  = library.elements_should_be_visible(
+        "xpath=//android.widget.EditText", "accessibility_id=All", "accessibility_id=Menu\nTab 1 of 2")
+    visible_fetches = len(fetches)
+    print(f"  3 éléments visibles    : {waited:.2f}s ({visible_fetches} page source)")
+
+    try:
+        library.elements_should_be_visible(
+            "accessibility_id=All", "accessibility_id=Pizza", "accessibility_id=Pasta", "id=absent")
+        message = ""
+    except AssertionError as e:
+        message = str(e)
+    print(f"  Manquants signalés     : {message.splitlines()[0] if message else '—'}")
+
+    # Stratégies sans équivalent exact sur le snapshot : vérifiées sur le device
+    on_device = []
+    library._visible_on_device = lambda locator: on_device.append(locator) or True
+    library.elements_should_be_visible(
+        "id=com.example:id/btn_login", "id=btn_login", "name=Search", "text=Search", "Search")
+    print(f"  Résolus sur le device  : {on_device}")
+
+    assert (visible_fetches == 1 and message.startswith("3/4")
+            and all(loc in message for loc in ("accessibility_id=Pizza", "accessibility_id=Pasta", "id=absent"))
+            and "accessibility_id=All" not in message
+            and on_device == ["id=btn_login", "name=Search", "text=Search", "Search"])
+
+
+def test_element_cache():
+    """Test 6m: ElementCacheLibrary — une résolution par écran, vidée après une action"""
+    print("\n" + "="*60)
+    print("TEST 6m: ElementCacheLibrary")
+    print("="*60)
+
+    from types import SimpleNamespace
+    libraries = Path(__file__).resolve().parent / "resources" / "libraries"
+    cache_lib = import_module("ElementCacheLibrary", libraries / "ElementCacheLibrary.py")
+
+    lookups = []
+
+    class FakeElement:
+        stale = False
+
+        def is_displayed(self):
+            if self.stale:
+                raise cache_lib.StaleElementReferenceException()
+            return True
+
+        def get_attribute(self, name):
+            return "valeur"
+
+    class FakeAppium:
+        def get_webelements(self, locator):
+            lookups.append(locator)
+            return [FakeElement()]
+
+    library = cache_lib.ElementCacheLibrary(timeout="0.2s", interval="0.01s")
+    library._appium = lambda: FakeAppium()
+
+    def action(name, owner="AppiumLibrary"):
+        library.end_keyword(None, SimpleNamespace(name=name, owner=owner))
+
+    # Wait + Clear + Input + lecture sur le même écran : une seule résolution
+    field = library.wait_until_cached_element_is_visible("id=email")
+    same  = library.get_cached_element("id=email") is field
+    value = library.get_cached_element_attribute("id=email", "text")
+    before_action = len(lookups)
+
+    action("Should Be Equal", owner="BuiltIn")        # lecture : cache conservé
+    library.get_cached_element("id=email")
+    kept = len(lookups) == before_action
+
+    action("Input Text")                              # action : cache vidé
+    cached = library.get_cached_element("id=email")
+    after_action = len(lookups)
+
+    cached.stale = True                               # écran changé hors keyword connu
+    fresh = library.wait_until_cached_element_is_visible("id=email")
+    print(f"  Résolutions : {len(lookups)} (hits {library.hits}, misses {library.misses})")
+
+    assert (same and value == "valeur" and before_action == 1 and kept
+            and after_action == 2 and library.hits == 3)
+    assert fresh is not cached and len(lookups) == 3 and library.misses == 3
+
+
+def test_fill_form():
+    """Test 6n: Fill Form — champs résolus depuis un page source, saisis en lot"""
+    print("\n" + "="*60)
+    print("TEST 6n: UiSyncLibrary.Fill Form")
+    print("="*60)
+
+    libraries = Path(__file__).resolve().parent / "resources" / "libraries"
+    ui_sync   = import_module("UiSyncLibrary", libraries / "UiSyncLibrary.py")
+
+    fields = ["First", "Last", "Email", "Password", "Phone"]
+    screen = ("<hierarchy><android.widget.ScrollView bounds='[0,0][1080,2000]'>"
+              + "".join(f"<android.widget.EditText class='android.widget.EditText' "
+                        f"bounds='[0,{i * 200}][1080,{i * 200 + 150}]'/>" for i in range(len(fields)))
+              + "</android.widget.ScrollView></hierarchy>")
+    calls = []
+
+    class FakeField:
+        def __init__(self, name, index):
+            self.name, self.value = name, None
+            self.bounds = f"[0,{index * 200}][1080,{index * 200 + 150}]"
+
+        def get_attribute(self, name):
+            return self.bounds if name == "bounds" else None
+
+        def clear(self):
+            calls.append(("clear", self.name))
+
+        def send_keys(self, value):
+            self.value = value
+
+    elements = [FakeField(name, i) for i, name in enumerate(fields)]
+    device_order = list(elements)
+
+    class FakeDriver:
+        page_source = screen
+
+        def find_elements(self, by, value):
+            calls.append(("find_elements", value))
+            return device_order
+
+        def hide_keyboard(self):
+            calls.append(("hide_keyboard", None))
+
+    class FakeAppium:
+        def get_webelements(self, locator):
+            calls.append(("get_webelements", locator))
+            return [elements[int(locator.rsplit("[", 1)[1].rstrip("]")) - 1]]
+
+    library = ui_sync.UiSyncLibrary(timeout="0.5s", interval="0.01s")
+    library._driver = lambda: FakeDriver()
+    library._appium = lambda: FakeAppium()
+
+    pairs = []
+    for index, name in enumerate(fields, 1):
+        pairs += [f"xpath=//android.widget.ScrollView/android.widget.EditText[{index}]", name.lower()]
+    filled = library.fill_form(*pairs)
+
+    finds = [c for c in calls if c[0] == "find_elements"]
+    hides = [c for c in calls if c[0] == "hide_keyboard"]
+    print(f"  {filled} champs : {len(finds)} find_elements, {len(hides)} hide_keyboard")
+
+    try:
+        library.fill_form("xpath=//android.widget.EditText[1]")
+        odd_rejected = False
+    except ValueError:
+        odd_rejected = True
+
+    assert (filled == 5 and len(finds) == 1 and len(hides) == 1 and calls[-1][0] == "hide_keyboard"
+            and [e.value for e in elements] == [n.lower() for n in fields] and odd_rejected)
+
+    # Ordre différent sur le device : aucun champ saisi à la place d'un autre
+    calls.clear()
+    device_order.reverse()
+    library.fill_form(*[v.upper() if i % 2 else v for i, v in enumerate(pairs)])
+    fallbacks = [c for c in calls if c[0] == "get_webelements"]
+    print(f"  Ordre inversé : {len(fallbacks)} champs résolus par leur locator")
+
+    assert ([e.value for e in elements] == [n.upper() for n in fields]
+            and len(fallbacks) == len(fields) - 1)
+
+
+def test_screen_navigation():
+    """Test 6p: NavigationLibrary — lien profond / activité / chemin de clics enregistré"""
+    print("\n" + "="*60)
+    print("TEST 6p: NavigationLibrary.Go To Screen")
+    print("="*60)
+
+    import json
+    import tempfile
+    libraries  = Path(__file__).resolve().parent / "resources" / "libraries"
+    navigation = import_module("NavigationLibrary", libraries / "NavigationLibrary.py")
+
+    screens = {
+        "home":    {"ready": ["id=home"]},
+        "signup":  {"from": "home", "path": ["id=tab_login"], "ready": ["id=join_us"]},
+        "details": {"deep_link": "foodapp://details", "activity": ".DetailsActivity",
+                    "from": "home", "path": ["id=item"], "ready": ["id=details"]},
+    }
+    registry = Path(tempfile.mkdtemp()) / "screens.json"
+    registry.write_text(json.dumps(screens), encoding="utf-8")
+
+    class FakeApp:
+        """Écran courant ; le lien profond n'est pas supporté, l'activité l'est."""
+        screen, scripts, clicks = "home", [], []
+        capabilities = {"appPackage": "com.example.mobile_app"}
+
+        def execute_script(self, script, arguments):
+            FakeApp.scripts.append(script)
+            if script == "mobile: deepLink":
+                raise RuntimeError("deep link non déclaré par l'application")
+            FakeApp.screen = "details"
+
+    visible = {"home": "id=home", "signup": "id=join_us", "details": "id=details"}
+    targets = {"id=tab_login": "signup", "id=item": "details"}
+
+    class FakeBuiltIn:
+        def replace_variables(self, value):
+            return value
+
+        def run_keyword(self, name, *args):
+            if name == "Click Element":
+                FakeApp.clicks.append(args[0])
+                FakeApp.screen = targets[args[0]]
+
+        def run_keyword_and_return_status(self, name, *args):
+            return visible[FakeApp.screen] in args
+
+    with patch.object(navigation, "BuiltIn", FakeBuiltIn):
+        library = navigation.NavigationLibrary(screens=str(registry))
+        library._driver = lambda: FakeApp()
+        by_path = library.go_to_screen("signup")
+        FakeApp.screen = "home"
+        by_jump = library.go_to_screen("details")
+        again   = library.go_to_screen("details")
+        FakeApp.screen = "home"
+        library.go_to_screen("details")
+
+    print(f"  signup : {by_path} ({FakeApp.clicks}) ; details : {by_jump}, puis {again} ; "
+          f"scripts : {FakeApp.scripts}")
+
+    suite = Path(__file__).resolve().parent.parent / "agents" / "tests" / "suites" / "menu" / "test_menu.robot"
+    content, changed = mcp_appium_postprocess.use_screen_navigation(
+        "*** Settings ***\nLibrary           AppiumLibrary\nTest Setup        Reset App State\n", suite)
+
+    assert (by_path == "path" and FakeApp.clicks == ["id=tab_login"]
+            and by_jump == "activity" and again == "already"
+            and FakeApp.scripts == ["mobile: deepLink", "mobile: startActivity", "mobile: startActivity"]
+            and changed and "Test Setup        Start On Screen    menu\n" in content
+            and "NavigationLibrary.py" in content and "UiSyncLibrary.py" in content)
+
+
+# ---- Outillage des suites Robot ----
+
+def test_suite_session_postprocess():
+    """Test 6o: session Appium par suite dans les suites générées + Reset App State"""
+    print("\n" + "="*60)
+    print("TEST 6o: robot_postprocess.enforce_suite_session / AppSessionLibrary")
+    print("="*60)
+
+    suite = Path(__file__).resolve().parent.parent / "agents" / "tests" / "suites" / "menu" / "generated.robot"
+    per_test_setup = ("*** Settings ***\nLibrary           AppiumLibrary\n"
+                      "Test Setup        Open Application For Tests\nTest Teardown     Close Application\n\n"
+                      "*** Test Cases ***\nT1\n    [Tags]    a\n    Click Element    id=ok\n")
+    inline_open = ("*** Settings ***\nLibrary           AppiumLibrary\n\n*** Test Cases ***\n"
+                   "T1\n    [Tags]    a\n    Open Application For Tests\n    Click Element    id=ok\n"
+                   "    [Teardown]    Close Application\n"
+                   "T2\n    Open Application For Tests\n    Click Element    id=ko\n"
+                   "    [Teardown]    Close Application\n")
+
+    fixed, changed = mcp_appium_postprocess.enforce_suite_session(per_test_setup, suite)
+    inlined, inline_changed = mcp_appium_postprocess.enforce_suite_session(inline_open, suite)
+    again, again_changed = mcp_appium_postprocess.enforce_suite_session(fixed, suite)
+    print(f"  Test Setup → Suite Setup : {changed} ; ouverture dans les tests : {inline_changed} ; "
+          f"idempotent : {again == fixed and not again_changed}")
+
+    expected = ("Suite Setup       Open Application For Tests\n", "Suite Teardown    Close Application\n",
+                "Test Setup        Reset App State\n",
+                "Library           ../../../../tests/resources/libraries/AppSessionLibrary.py\n")
+
+    libraries = Path(__file__).resolve().parent / "resources" / "libraries"
+    session   = import_module("AppSessionLibrary", libraries / "AppSessionLibrary.py")
+    calls     = []
+
+    class FakeDriver:
+        capabilities = {"appPackage": "com.example.mobile_app"}
+
+        def terminate_app(self, package):
+            calls.append(("terminate", package))
+
+        def activate_app(self, package):
+            calls.append(("activate", package))
+
+    library = session.AppSessionLibrary()
+    library._driver = lambda: FakeDriver()
+    library.reset_app_state()
+
+    assert (changed and inline_changed and again == fixed and not again_changed
+            and all(line in fixed and line in inlined for line in expected)
+            and "Test Teardown" not in fixed and "Open Application For Tests" not in inlined.split("*** Test Cases ***")[1]
+            and "[Teardown]" not in inlined
+            and calls == [("terminate", "com.example.mobile_app"), ("activate", "com.example.mobile_app")])
+
+
+def test_robot_lint():
+    """Test 6q: lint_robot_suites — anti-patterns de performance + autofix"""
+    print("\n" + "="*60)
+    print("TEST 6q: lint_robot_suites")
+    print("="*60)
+
+    import tempfile
+    folder = Path(tempfile.mkdtemp())
+    suite  = folder / "test_slow.robot"
+    suite.write_text(
+        "*** Settings ***\nLibrary           AppiumLibrary\n"
+        "Test Setup        Open Application For Tests\nTest Teardown     Capture Page Screenshot\n\n"
+        "*** Variables ***\n${LOC_OK}    xpath=//*[@content-desc='OK']\n\n"
+        "*** Test Cases ***\n"
+        "T1\n    Wait Until Element Is Visible    ${LOC_OK}    10s\n"
+        "    Element Should Be Visible    ${LOC_OK}\n    Sleep    2s\n"
+        "T2\n    Click Element    xpath=//*[contains(@text, 'Valider')]\n    Sleep    500ms\n", encoding="utf-8")
+
+    report = mcp_appium.lint_robot_suites(paths=[str(folder)])
+    rules  = report.get("by_rule", {})
+    print(f"  Coût estimé : {report.get('total_cost_s')}s — "
+          + ", ".join(f"{rule} ×{entry['count']}" for rule, entry in rules.items()))
+
+    fixed = mcp_appium.lint_robot_suites(paths=[str(folder)], fix=True)
+    after = mcp_appium.lint_robot_suites(paths=[str(folder)])
+    content = suite.read_text(encoding="utf-8")
+
+    # Navigation (« Open Mapping Page ») ≠ session ; keyword maison qui appelle Open Application = session
+    navigation = Path(tempfile.mkdtemp()) / "test_navigation.robot"
+    navigation.write_text(
+        "*** Test Cases ***\nT1\n    Open Mapping Page\n    Log    a\nT2\n    Open Mapping Page\n    Log    b\n"
+        "T3\n    Start Session\n    Log    c\nT4\n    Start Session\n    Log    d\n"
+        "*** Keywords ***\nStart Session\n    Open Application    ${APPIUM_URL}\n", encoding="utf-8")
+    sessions = [f for f in mcp_appium.lint_robot_suites(paths=[str(navigation)])["findings"]
+                if f["rule"] == "per-test-session"]
+    print(f"  Ouvertures de session : lignes {[f['line'] for f in sessions]}")
+    print(f"  Corrigés : {fixed.get('fixed')} ; restants : {len(after.get('findings', []))}")
+
+    assert (report.get("success") and set(rules) == {"fixed-sleep", "per-test-session",
+                                                     "redundant-visibility", "xpath-wildcard",
+                                                     "screenshot-teardown"}
+            and rules["fixed-sleep"]["cost_s"] == 2.5 and rules["per-test-session"]["cost_s"] == 5.0
+            and fixed.get("fixed") == len(report["findings"]) and after.get("findings") == []
+            and "Suite Setup       Open Application For Tests" in content
+            and "Run Keyword If Test Failed    Capture Page Screenshot" in content
+            and 'android=new UiSelector().textContains("Valider")' in content
+            and "accessibility_id=OK" in content and "Element Should Be Visible" not in content
+            and len(sessions) == 1 and "dans 2 tests" in sessions[0]["message"])
+
+
+def test_xpath_rewriter():
+    """Test 6r: rewrite_xpath_locators — XPath positionnels → UiSelector vérifiés sur snapshots"""
+    print("\n" + "="*60)
+    print("TEST 6r: rewrite_xpath_locators")
+    print("="*60)
+
+    import tempfile
+    node = '<{0} class="{0}" bounds="[0,{1}][100,{2}]" displayed="true" {3}/>'
+    home = ('<hierarchy><android.widget.FrameLayout class="android.widget.FrameLayout" bounds="[0,0][100,900]">'
+            + node.format("android.widget.EditText", 0, 50, 'text=""')
+            + node.format("android.widget.Button", 50, 100, 'text="Go" content-desc="go"')
+            + "</android.widget.FrameLayout></hierarchy>")
+    signup = ('<hierarchy><android.widget.FrameLayout class="android.widget.FrameLayout" bounds="[0,0][100,900]">'
+              + node.format("android.widget.Button", 0, 50, 'text="Go"')
+              + node.format("android.view.View", 50, 100, 'content-desc="go"')
+              + '<android.widget.ScrollView class="android.widget.ScrollView" bounds="[0,100][100,900]">'
+              + "".join(node.format("android.widget.EditText", 100 + 60 * i, 150 + 60 * i, 'text=""')
+                        for i in range(5))
+              + "</android.widget.ScrollView></android.widget.FrameLayout></hierarchy>")
+    folder = Path(tempfile.mkdtemp())
+    (folder / "home.xml").write_text(home, encoding="utf-8")
+    (folder / "signup.xml").write_text(signup, encoding="utf-8")
+    variables = folder / "AppVariables.robot"
+    variables.write_text(
+        "*** Variables ***\n"
+        "${LASTNAME}    xpath=//android.widget.ScrollView/android.widget.EditText[2]    # Nom\n"
+        "${GO}          xpath=//android.widget.Button[@text='Go']\n"
+        "${MISSING}     xpath=//android.widget.Switch\n"
+        "${NATIVE}      accessibility_id=go\n", encoding="utf-8")
+
+    report = mcp_appium.rewrite_xpath_locators(str(variables), snapshots=[str(folder)], write=True)
+    rows   = {row["name"]: row for row in report.get("locators", [])}
+    for name, row in rows.items():
+        print(f"  ${{{name}}} [{row['status']}] → {row.get('replacement', '-')}")
+    content = variables.read_text(encoding="utf-8")
+
+    assert (report.get("success") and report.get("xpath") == 3
+            and rows["LASTNAME"].get("replacement")
+                == 'android=new UiSelector().className("android.widget.EditText").instance(1)'
+            and rows["MISSING"]["status"] == "not_matched"
+            and rows["GO"]["status"] == "verified"
+            and rows["GO"].get("replacement") == 'android=new UiSelector().text("Go")'
+            and rows["GO"]["locator"] == 'android=new UiSelector().text("Go")'
+            and rows["GO"]["original"].startswith("xpath=")
+            and any(r.startswith("accessibility_id=go") for r in rows["GO"].get("rejected", []))
+            and 'className(\\"android.widget.EditText\\")' not in content
+            and 'instance(1)    # Nom' in content
+            and "${NATIVE}      accessibility_id=go" in content)
+
+
+# ---- Devices ----
+
+def test_device_preflight():
+    """Test 6s: discover_devices — cache adb + capabilities corrigées avant session"""
+    print("\n" + "="*60)
+    print("TEST 6s: discover_devices / preflight")
+    print("="*60)
+
+    import tempfile
+    discovery = mcp_appium.device_discovery
+    folder    = Path(tempfile.mkdtemp())
+    calls     = folder / "calls.log"
+    listing   = folder / "devices.txt"
+    adb       = folder / "adb"
+    adb.write_text(
+        "#!/bin/sh\n"
+        f'echo "$@" >> "{calls}"\n'
+        'case "$*" in\n'
+        f'  "devices -l") echo "List of devices attached"; cat "{listing}" ;;\n'
+        '  *shell*) printf "12\\n31\\nM2101K6G\\n" ;;\n'
+        "esac\n", encoding="utf-8")
+    adb.chmod(0o755)
+    listing.write_text("82403e660602   device usb:1-1 model:M2101K6G\n"
+                       "emulator-5556  unauthorized\n", encoding="utf-8")
+
+    with patch.object(discovery, "ADB_PATH", str(adb)), \
+         patch.object(discovery, "DEVICE_CACHE_FILE", folder / "devices.json"):
+        check   = discovery.preflight("emulator-5554", "13.0")
+        queries = len(calls.read_text().splitlines())
+        cached  = mcp_appium.discover_devices()
+        reused  = len(calls.read_text().splitlines()) == queries
+        print(f"  Corrections : {check['corrections']}")
+        print(f"  Cache : {cached['source']} ({'réutilisé' if reused else 'adb rappelé'})")
+
+        listing.write_text("82403e660602   unauthorized\n", encoding="utf-8")
+        blocked = discovery.preflight("82403e660602", "12", refresh=True)
+        run     = mcp_appium.execute_robot_test(test_file=str(adb))
+        missing = mcp_appium.execute_robot_test(test_file="tests_inexistants/fake_test.robot")
+        print(f"  Sans device prêt : {blocked.get('error')}")
+
+    with patch.object(discovery, "ADB_PATH", str(folder / "absent")), \
+         patch.object(discovery, "DEVICE_CACHE_FILE", folder / "none.json"), \
+         patch.dict(os.environ, {"ROBOT_DEVICES": ""}):
+        remote  = discovery.preflight("emulator-5554", "13.0")
+        no_adb  = mcp_appium._preflight_robot()
+
+    assert (check["ok"] and check["capabilities"]["deviceName"] == "82403e660602"
+            and check["capabilities"]["platformVersion"] == "12" and len(check["corrections"]) == 2
+            and "PLATFORM_VERSION:12" in discovery.robot_variables(check)
+            and "UDID:82403e660602" in discovery.robot_variables(check)
+            and cached.get("source") == "cache" and reused and cached["devices"][1]["state"] == "unauthorized"
+            and not blocked["ok"] and run.get("success") is False and "Preflight" in run.get("error", "")
+            and "introuvable" in missing.get("error", "")
+            and no_adb == (None, [], False)
+            and remote["ok"] and not remote["validated"]
+            and remote["capabilities"]["platformVersion"] == "13.0"
+            and discovery.robot_variables(remote) == [])
+
+
+def test_device_leases():
+    """Test 6t: device_leases — baux exclusifs, file d'attente, job Robot sous bail"""
+    print("\n" + "="*60)
+    print("TEST 6t: device_leases")
+    print("="*60)
+
+    import subprocess
+    import tempfile
+    import threading
+    import time
+    leases = mcp_appium.device_leases
+    folder = Path(tempfile.mkdtemp())
+    env    = {"ROBOT_DEVICES": "http://127.0.0.1:4723|emulator-5554,http://127.0.0.1:4725|emulator-5556",
+              "ADB_PATH": str(folder / "absent"), "DEVICE_CACHE_FILE": str(folder / "devices.json"),
+              "DEVICE_LEASES_FILE": str(folder / "leases.json")}
+
+    with patch.dict(os.environ, {"ROBOT_DEVICES": env["ROBOT_DEVICES"]}), \
+         patch.object(leases.device_discovery, "ADB_PATH", env["ADB_PATH"]), \
+         patch.object(leases, "DEVICE_LEASES_FILE", Path(env["DEVICE_LEASES_FILE"])), \
+         patch.object(leases, "LEASE_POLL_SECONDS", 0.1):
+        first  = leases.acquire("suite-a", wait=0)
+        second = leases.acquire("suite-b", wait=0)
+        try:
+            leases.acquire("suite-c", wait=0)
+            refused = False
+        except TimeoutError as e:
+            refused = True
+            print(f"  Sans device libre : {e}")
+
+        queued = {}
+        waiter = threading.Thread(target=lambda: queued.update(leases.acquire("suite-c", wait=5)))
+        waiter.start()
+        time.sleep(0.5)
+        waiting = len(mcp_appium.get_device_leases()["queue"])
+        leases.release(first["lease_id"])
+        waiter.join()
+        print(f"  En file : {waiting} ; suite-c obtient {queued.get('serial')}")
+
+        dead = subprocess.Popen([sys.executable, "-c", "pass"])
+        dead.wait()
+        leases.release(second["lease_id"])
+        orphan    = leases.acquire("crashed", wait=0, prefer="emulator-5556", pid=dead.pid)
+        reclaimed = leases.acquire("suite-d", wait=0)
+        released  = mcp_appium.release_device_lease(reclaimed["lease_id"])["success"]
+        leases.release(queued["lease_id"])
+
+    suite = folder / "device.robot"
+    suite.write_text("*** Test Cases ***\nDevice\n    Should Be Equal    ${DEVICE_NAME}    emulator-5554\n"
+                     "    Should Be Equal    ${UDID}    emulator-5554\n"
+                     "    Should Be Equal    ${APPIUM_URL}    http://127.0.0.1:4723\n"
+                     "    Should Be Equal    ${SYSTEM_PORT}    8200\n", encoding="utf-8")
+    run = subprocess.run([sys.executable, str(Path(leases.__file__)), "robot", "--owner", "test", "--",
+                          "--output", "NONE", "--log", "NONE", "--report", "NONE", str(suite)],
+                         capture_output=True, text=True, env={**os.environ, **env},
+                         cwd=str(Path(leases.__file__).parent))
+    print(f"  Job Robot sous bail : code {run.returncode}")
+
+    assert (first["serial"] != second["serial"] and {first["system_port"], second["system_port"]} == {8200, 8201}
+            and refused and waiting == 1 and queued.get("serial") == first["serial"]
+            and orphan["serial"] == "emulator-5556" and reclaimed["serial"] == "emulator-5556"
+            and released and run.returncode == 0 and "loué à test" in run.stdout)
 
 
 # ============================================================================
@@ -417,16 +1614,47 @@ def run_all_tests():
         ("Find Element (resource_id)",   test_find_element_by_resource_id),
         ("Find Element (text)",          test_find_element_by_text),
         ("Find Element (not found)",     test_find_element_not_found),
+        ("Find Element (snapshot)",      test_find_element_snapshot_xpath),
+        ("Find Element (race)",          test_find_element_race_mode),
+        ("Find Element (live error)",    test_find_element_live_state_error),
+        ("Locator Uniqueness",           test_locator_uniqueness),
+        ("Locator Synthesizer",          test_locator_synthesizer),
+        ("Locator Profiler",             test_profile_robot_locators),
         ("Self-Healing Locators",        test_suggest_alternative_locators),
         ("Screenshot",                   test_take_screenshot),
         ("Execute Robot Test",           test_execute_robot_test),
+        ("Robot Job Lifecycle",          test_robot_job_lifecycle),
+        ("Sharding Plan",                test_plan_shards),
+        ("Robot Output Parser",          test_parse_robot_output),
+        ("Impacted Tests",               test_impacted_tests),
+        ("Rerun Failed",                 test_rerun_failed),
+        ("Prioritized Execution",        test_prioritized_execution),
+        ("Test History Store",           test_history_store),
+        ("Failure Classifier",           test_failure_classifier),
+        ("Keyword Profile",              test_keyword_profile),
+        ("Wait For UI Idle",             test_wait_for_ui_idle),
+        ("Elements Should Be Visible",   test_elements_should_be_visible),
+        ("Element Cache",                test_element_cache),
+        ("Fill Form",                    test_fill_form),
+        ("Suite Session Reuse",          test_suite_session_postprocess),
+        ("Screen Navigation",            test_screen_navigation),
+        ("Robot Lint",                   test_robot_lint),
+        ("XPath Rewriter",               test_xpath_rewriter),
+        ("Device Preflight",             test_device_preflight),
+        ("Device Leases",                test_device_leases),
     ]
 
     results = []
     for test_name, test_func in tests:
         try:
-            success = test_func()
+            # Les tests récents vérifient par `assert` (None = succès)
+            success = test_func() is not False
             results.append((test_name, success))
+        except AssertionError as e:
+            print(f"\n❌ Vérification échouée dans {test_name}: {e}")
+            import traceback
+            traceback.print_exc()
+            results.append((test_name, False))
         except Exception as e:
             print(f"\n❌ Exception dans {test_name}: {str(e)}")
             import traceback